@@ -1,19 +1,18 @@
-import base64
 import copy
 import json
 import os
 import re
-import smtplib
-import ssl
 import time as systime
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, time, timedelta
-from email.mime.application import MIMEApplication
-from email.mime.image import MIMEImage
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from itertools import islice
 
 import certifi
+import httplib2
+import matplotlib
+
+# 렌더링 스테이지가 작업 스레드에서 pyplot을 쓰므로 GUI 백엔드 대신 항상 Agg 사용
+matplotlib.use("Agg")
 import matplotlib.dates as mdates
 import matplotlib.font_manager as fm
 import matplotlib.pyplot as plt
@@ -25,12 +24,57 @@ import seaborn as sns
 from backoff import expo, on_exception  # 지수 백오프 추가
 from bs4 import BeautifulSoup
 from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
+from matplotlib.collections import LineCollection
 from matplotlib.patches import Patch
 from oauth2client.service_account import ServiceAccountCredentials
 
+from api_metrics import InstrumentedHttpRequest, print_api_summary, record_retry, write_api_metrics
+from dashboard import build_dashboard_payload, build_summary_email_body, write_dashboard
+from github_publisher import publish_files
+from mailer import EmailTooLargeError, build_email, send_email
+from nan_history import (
+    RESULTS_FORMATS,
+    aggregate_history,
+    compute_heatmap_matrices,
+    monthly_variant,
+    render_heatmaps,
+    weekly_variant,
+    write_results_file,
+)
+from order_result import (
+    CATEGORIES,
+    CATEGORY_INDEX,
+    ELEC,
+    MECH,
+    PARTNER_TYPES,
+    TMS,
+    OrderResult,
+    sum_counts,
+)
+from pipeline import run_pipeline, stage
+from run_journal import append_journal, journal_path, load_journal
+from sharding import merge_partials, partial_path, select_shard
+from sheet_metadata import load_metadata, make_entry, revalidate, save_metadata
+from tracing import (
+    print_trace_summary,
+    set_attributes,
+    span,
+    traced,
+    traced_sleep,
+    write_trace,
+)
+from worksheet_layout import (
+    column_ranges,
+    load_layouts,
+    resolve_columns,
+    save_layouts,
+    sheet_name_of,
+)
+
 # 환경변수 로딩
 try:
     from dotenv import load_dotenv
@@ -73,6 +117,10 @@ EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS") or os.getenv("SMTP_USER")
 EMAIL_PASS = os.getenv("EMAIL_PASS") or os.getenv("SMTP_PASSWORD")
 RECEIVER_EMAIL = os.getenv("RECEIVER_EMAIL")
 
+# 이메일 크기 예산 (bytes, 인코딩 후 기준)과 인라인 그래프 최대 너비 (px)
+EMAIL_MAX_BYTES = int(os.getenv("EMAIL_MAX_BYTES", str(10 * 1024 * 1024)))
+EMAIL_IMAGE_MAX_WIDTH = int(os.getenv("EMAIL_IMAGE_MAX_WIDTH", "1200"))
+
 # 이메일 설정 검증 (선택사항)
 email_configured = EMAIL_ADDRESS and EMAIL_PASS and RECEIVER_EMAIL
 if not email_configured:
@@ -84,9 +132,66 @@ if not email_configured:
 else:
     print(f"✅ 이메일 설정이 완료되었습니다.")
 
+# 결과 JSON 저장 포맷: "json"(기존 indent JSON) 또는 "ndjson.gz"(gzip 압축 NDJSON)
+RESULTS_FORMAT = os.getenv("RESULTS_FORMAT", "json").lower()
+if RESULTS_FORMAT not in RESULTS_FORMATS:
+    print(f"⚠️ 알 수 없는 RESULTS_FORMAT '{RESULTS_FORMAT}', 기본값 json을 사용합니다.")
+    RESULTS_FORMAT = "json"
+
+# 히스토리 JSON 로컬 캐시 폴더 (Drive의 과거 결과 파일은 변경되지 않으므로 재다운로드 생략, 빈 값이면 비활성화)
+HISTORY_CACHE_DIR = os.getenv("HISTORY_CACHE_DIR", "output/history_cache") or None
+
+# 스프레드시트 구조 캐시 폴더 (템플릿별 WORKSHEET 열 위치, 빈 값이면 실행 간 재사용 안 함)
+SHEET_CACHE_DIR = os.getenv("SHEET_CACHE_DIR", "output/sheet_cache") or None
+# 주문 스프레드시트 메타데이터(제목, sheetId, 행 수) 캐시 유효 시간 - Drive 수정 시각이 같아도 이 시간이 지나면 재조회
+SHEET_METADATA_TTL_HOURS = float(os.getenv("SHEET_METADATA_TTL_HOURS", "168"))
+
+# 실행 트레이스(Chrome Trace Event JSON) 저장 경로
+TRACE_OUTPUT = os.getenv("TRACE_OUTPUT", "output/trace.json")
+
+# API 사용량 집계 저장 폴더 (api_metrics.prom, api_metrics.json)
+API_METRICS_DIR = os.getenv("API_METRICS_DIR", "output")
+
+# Google API 백엔드: "live"(서비스 계정), "fake"(오프라인 벤치마크용 대역, fake_google.py),
+# "record"(실제 응답을 CASSETTE_PATH에 녹화), "replay"(녹화된 응답만으로 오프라인 실행)
+GOOGLE_BACKEND = os.getenv("GOOGLE_BACKEND", "live").lower()
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "output/cassette.json.gz")
+# 오프라인 백엔드에서는 외부 알림/업로드(이메일, 카카오톡, GitHub)를 보내지 않음
+OFFLINE_BACKEND = GOOGLE_BACKEND in ("fake", "replay")
+
+# Rate Limit 방지용 고정 대기 배율 (벤치마크에서는 0으로 대기 생략)
+PACING_SCALE = float(os.getenv("PACING_SCALE", "1"))
+
+# 주문 처리 체크포인트 저널: 같은 실행 ID로 재실행하면 완료된 주문은 건너뜀
+# (RUN_ID 미설정 시 GitHub Actions의 GITHUB_RUN_ID 사용, 둘 다 없으면 저널 비활성화)
+RUN_ID = os.getenv("RUN_ID") or os.getenv("GITHUB_RUN_ID")
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "output/journal")
+
+# 샤드 실행: SHARD_COUNT개 러너가 각자 SHARD_INDEX 샤드만 수집해 SHARD_DIR에 부분 결과 저장,
+# SHARD_MERGE=true 실행이 부분 결과를 합쳐 저장/히트맵/리포트/알림을 한 번만 수행
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_MERGE = os.getenv("SHARD_MERGE", "false").lower() == "true"
+SHARD_DIR = os.getenv("SHARD_DIR", "output/shards")
+if SHARD_COUNT < 1 or not 0 <= SHARD_INDEX < SHARD_COUNT:
+    raise ValueError(f"잘못된 샤드 설정: SHARD_INDEX={SHARD_INDEX}, SHARD_COUNT={SHARD_COUNT}")
+SHARDED = SHARD_COUNT > 1 and not SHARD_MERGE
+
+# 대시보드 모드: "html"(기존 단일 HTML) 또는 "data"(정적 셸 + 압축 JSON 데이터, 이메일은 요약만)
+DASHBOARD_MODE = os.getenv("DASHBOARD_MODE", "html").lower()
+if DASHBOARD_MODE not in ("html", "data"):
+    print(f"⚠️ 알 수 없는 DASHBOARD_MODE '{DASHBOARD_MODE}', 기본값 html을 사용합니다.")
+    DASHBOARD_MODE = "html"
+
 # Sheet Range Settings
+# WORKSHEET은 시트 이름만 사용: 필요한 4개 열만 헤더 행부터 시트 마지막 행(gridProperties.rowCount)까지 요청
 WORKSHEET_RANGE = os.getenv("WORKSHEET_RANGE", "'WORKSHEET'!A1:Z100")
+WORKSHEET_SHEET_NAME = sheet_name_of(WORKSHEET_RANGE)
+WORKSHEET_HEADER_ROW = int(os.getenv("WORKSHEET_HEADER_ROW", "7"))
+# 이보다 행이 많은 WORKSHEET은 이 행 수 단위로 나눠 조회하며 묶음별로 집계 (메모리/응답 크기 제한)
+WORKSHEET_CHUNK_ROWS = max(int(os.getenv("WORKSHEET_CHUNK_ROWS", "1000")), 1)
 INFO_RANGE = os.getenv("INFO_RANGE", "정보판!A1:Z100")
+TARGET_SHEET_NAME = os.getenv("TARGET_SHEET_NAME", "출하예정리스트(TEST)")
 
 # API 키들 - 환경변수에서 로드
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
@@ -94,6 +199,17 @@ REST_API_KEY = os.getenv("KAKAO_REST_API_KEY")
 KAKAO_ACCESS_TOKEN = os.getenv("KAKAO_ACCESS_TOKEN")
 REFRESH_TOKEN = os.getenv("KAKAO_REFRESH_TOKEN")
 
+# 카카오 액세스 토큰 캐시 (만료 전까지 재사용, 아티팩트로 업로드되지 않도록 output/ 밖에 저장)
+KAKAO_TOKEN_CACHE = os.getenv(
+    "KAKAO_TOKEN_CACHE", os.path.expanduser("~/.cache/pda_partner/kakao_token.json")
+)
+
+# 알림/업로드용 공유 HTTP 세션 (keep-alive 연결 재사용)
+http_session = requests.Session()
+http_session.mount(
+    "https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+)
+
 if not GITHUB_TOKEN or not REST_API_KEY:
     print("⚠️ 일부 API 키가 설정되지 않았습니다. 해당 기능이 제한될 수 있습니다.")
 
@@ -102,9 +218,22 @@ if not KAKAO_ACCESS_TOKEN or not REFRESH_TOKEN:
         "⚠️ 카카오톡 토큰이 설정되지 않았습니다. 카카오톡 알림 기능이 제한될 수 있습니다."
     )
 
-# 서비스 계정 키 파일 경로
-sheets_json_key_path = os.getenv("SHEETS_KEY_PATH")
-drive_json_key_path = os.getenv("DRIVE_KEY_PATH")
+# 서비스 계정 키 파일 경로 (샤드별 키 SHEETS_KEY_PATH_<샤드번호>가 있으면 우선 사용)
+shard_sheets_key_path = os.getenv(f"SHEETS_KEY_PATH_{SHARD_INDEX}") if SHARDED else None
+sheets_json_key_path = shard_sheets_key_path or os.getenv("SHEETS_KEY_PATH")
+drive_json_key_path = (
+    os.getenv(f"DRIVE_KEY_PATH_{SHARD_INDEX}") if SHARDED else None
+) or os.getenv("DRIVE_KEY_PATH")
+
+if SHARDED:
+    print(f"🧩 샤드 실행: {SHARD_INDEX + 1}/{SHARD_COUNT}번째 샤드")
+    if not shard_sheets_key_path:
+        # 같은 서비스 계정의 할당량을 나눠 쓰므로 샤드 합계가 단일 실행 속도를 넘지 않도록 대기 배율 확대
+        PACING_SCALE *= SHARD_COUNT
+        print(
+            f"⚠️ 샤드 전용 키(SHEETS_KEY_PATH_{SHARD_INDEX})가 없어 할당량을 공유합니다. "
+            f"대기 배율을 {PACING_SCALE:g}배로 조정합니다."
+        )
 spreadsheet_id = os.getenv(
     "SPREADSHEET_ID", "19dkwKNW6VshCg3wTemzmbbQlbATfq6brAWluaps1Rm0"
 )
@@ -113,35 +242,91 @@ folder_id = DRIVE_FOLDER_ID
 SCOPES_SHEETS = ["https://www.googleapis.com/auth/spreadsheets"]
 SCOPES_DRIVE = ["https://www.googleapis.com/auth/drive"]
 
-# 서비스 계정 인증 및 서비스 초기화 (에러 처리 강화)
-try:
-    if not sheets_json_key_path:
-        raise ValueError("SHEETS_KEY_PATH 환경변수가 설정되지 않았습니다.")
-    if not drive_json_key_path:
-        raise ValueError("DRIVE_KEY_PATH 환경변수가 설정되지 않았습니다.")
-    if not os.path.exists(sheets_json_key_path):
-        raise FileNotFoundError(
-            f"Sheets 서비스 계정 키 파일을 찾을 수 없습니다: {sheets_json_key_path}"
-        )
-    if not os.path.exists(drive_json_key_path):
-        raise FileNotFoundError(
-            f"Drive 서비스 계정 키 파일을 찾을 수 없습니다: {drive_json_key_path}"
-        )
-
-    sheets_credentials = Credentials.from_service_account_file(
-        sheets_json_key_path, scopes=SCOPES_SHEETS
+if GOOGLE_BACKEND == "fake":
+    # 자격 증명 없이 합성 주문/히스토리 데이터를 제공하는 오프라인 대역 (benchmark_pipeline.py에서 사용)
+    from fake_google import build_fake_services
+
+    sheets_service, drive_service = build_fake_services(
+        orders=int(os.getenv("FAKE_ORDERS", "10")),
+        latency=float(os.getenv("FAKE_LATENCY_MS", "0")) / 1000,
+        history_files=int(os.getenv("FAKE_HISTORY_FILES", "14")),
+        worksheet_rows=int(os.getenv("FAKE_WORKSHEET_ROWS", "0")) or None,
+        json_folder_id=JSON_DRIVE_FOLDER_ID,
+        ledger_sheet=TARGET_SHEET_NAME,
+    )
+    print("🧪 GOOGLE_BACKEND=fake: 오프라인 Google API 대역 사용")
+elif GOOGLE_BACKEND == "replay":
+    # 녹화된 응답을 재생하는 http로 실제와 같은 요청/집계 경로를 오프라인 실행 (정적 discovery 사용)
+    from cassette import ReplayHttp
+
+    replay_http = ReplayHttp(CASSETTE_PATH)
+    sheets_service = build(
+        "sheets", "v4", http=replay_http, requestBuilder=InstrumentedHttpRequest
     )
-    drive_credentials = Credentials.from_service_account_file(
-        drive_json_key_path, scopes=SCOPES_DRIVE
+    drive_service = build(
+        "drive", "v3", http=replay_http, requestBuilder=InstrumentedHttpRequest
     )
+    print(f"📼 GOOGLE_BACKEND=replay: {CASSETTE_PATH}의 녹화된 응답 사용")
+else:
+    # 서비스 계정 인증 및 서비스 초기화 (에러 처리 강화)
+    try:
+        if not sheets_json_key_path:
+            raise ValueError("SHEETS_KEY_PATH 환경변수가 설정되지 않았습니다.")
+        if not drive_json_key_path:
+            raise ValueError("DRIVE_KEY_PATH 환경변수가 설정되지 않았습니다.")
+        if not os.path.exists(sheets_json_key_path):
+            raise FileNotFoundError(
+                f"Sheets 서비스 계정 키 파일을 찾을 수 없습니다: {sheets_json_key_path}"
+            )
+        if not os.path.exists(drive_json_key_path):
+            raise FileNotFoundError(
+                f"Drive 서비스 계정 키 파일을 찾을 수 없습니다: {drive_json_key_path}"
+            )
 
-    sheets_service = build("sheets", "v4", credentials=sheets_credentials)
-    drive_service = build("drive", "v3", credentials=drive_credentials)
+        sheets_credentials = Credentials.from_service_account_file(
+            sheets_json_key_path, scopes=SCOPES_SHEETS
+        )
+        drive_credentials = Credentials.from_service_account_file(
+            drive_json_key_path, scopes=SCOPES_DRIVE
+        )
+
+        # 모든 API 요청 실행(execute)을 트레이스 span + 엔드포인트별 집계로 기록
+        if GOOGLE_BACKEND == "record":
+            # 인증된 http를 감싸 모든 응답을 cassette로 녹화 (종료 시 저장)
+            from cassette import CassetteRecorder
+
+            recorder = CassetteRecorder(CASSETTE_PATH)
+            sheets_service = build(
+                "sheets",
+                "v4",
+                http=recorder.wrap(AuthorizedHttp(sheets_credentials, http=httplib2.Http())),
+                requestBuilder=InstrumentedHttpRequest,
+            )
+            drive_service = build(
+                "drive",
+                "v3",
+                http=recorder.wrap(AuthorizedHttp(drive_credentials, http=httplib2.Http())),
+                requestBuilder=InstrumentedHttpRequest,
+            )
+            print(f"📼 GOOGLE_BACKEND=record: 응답을 {CASSETTE_PATH}에 녹화합니다.")
+        else:
+            sheets_service = build(
+                "sheets",
+                "v4",
+                credentials=sheets_credentials,
+                requestBuilder=InstrumentedHttpRequest,
+            )
+            drive_service = build(
+                "drive",
+                "v3",
+                credentials=drive_credentials,
+                requestBuilder=InstrumentedHttpRequest,
+            )
 
-    print("✅ Google API 서비스 초기화 완료")
-except Exception as e:
-    print(f"❌ Google API 서비스 초기화 실패: {e}")
-    raise
+        print("✅ Google API 서비스 초기화 완료")
+    except Exception as e:
+        print(f"❌ Google API 서비스 초기화 실패: {e}")
+        raise
 
 # Font Setting
 font_paths = [
@@ -191,50 +376,103 @@ else:
 plt.rcParams["axes.unicode_minus"] = False
 
 
-# 백오프 데코레이터 설정 - 429 (Rate Limit) 에러도 재시도하도록 수정
-@on_exception(expo, HttpError, max_tries=10, max_time=300, giveup=lambda e: getattr(e, "response", None) and e.response.status_code not in [429, 503, 500, 502, 504])  # type: ignore
+def _http_status(e):
+    return int(getattr(e.resp, "status", 0) or 0)
+
+
+# 백오프 데코레이터 설정 - 429 (Rate Limit)와 5xx만 재시도 (404 등은 바로 실패)
+@on_exception(expo, HttpError, max_tries=10, max_time=300, giveup=lambda e: _http_status(e) not in [429, 503, 500, 502, 504], on_backoff=record_retry)  # type: ignore
 def api_call_with_backoff(func, *args, **kwargs):
     try:
         return func(*args, **kwargs)
     except HttpError as e:
-        if getattr(e, "response", None) and e.response.status_code == 429:
+        if _http_status(e) == 429:
             print(f"⚠️ [Rate Limit] API 할당량 초과, 백오프 재시도: {e}")
         else:
             print(f"⚠️ [Retrying] API 호출 실패: {e}")
         raise
 
 
+def execute_with_backoff(request):
+    """
+    요청 실행(execute) 자체를 백오프로 감싸 429/5xx 응답을 재시도합니다.
+    (요청 생성만 감싸면 실제 호출 오류는 재시도되지 않고 재시도 집계에도 잡히지 않음)
+    """
+    return api_call_with_backoff(request.execute)
+
+
+def pace(seconds, reason):
+    """Rate Limit 방지용 고정 대기 (PACING_SCALE 배율 적용, 대기 구간은 트레이스에 기록)"""
+    traced_sleep(seconds * PACING_SCALE, reason)
+
+
 # --------------------------
-# 함수: 시트 이름으로 sheetId 가져오기
-def get_sheet_id_by_name(spreadsheet_id, sheet_name):
-    metadata = api_call_with_backoff(
-        sheets_service.spreadsheets().get, spreadsheetId=spreadsheet_id
-    ).execute()
+# 대상 시트(TARGET_SHEET_NAME) 시작 시 1회 조회: sheetId, 연결된 주문 스프레드시트 ID, 표시 값 행
+SPREADSHEET_ID_PATTERN = re.compile(r"/d/([a-zA-Z0-9-_]+)")
+
+
+def _linked_spreadsheet_id(cell):
+    """셀의 링크(서식 있는 텍스트 링크 포함) 또는 =HYPERLINK( 수식에서 스프레드시트 ID 추출"""
+    formula = cell.get("userEnteredValue", {}).get("formulaValue", "")
+    for source in (cell.get("hyperlink"), formula if formula.startswith("=HYPERLINK(") else None):
+        match = SPREADSHEET_ID_PATTERN.search(source or "")
+        if match:
+            return match.group(1)
+    return None
+
+
+def _row_values(row_data):
+    """rowData 한 행 -> values.get과 같은 표시 값 목록 (뒤쪽 빈 칸 제거)"""
+    row = [cell.get("formattedValue", "") for cell in row_data.get("values", [])]
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+def fetch_target_sheet(spreadsheet_id, sheet_name):
+    """
+    대상 시트를 spreadsheets.get 한 번으로 읽어 (sheetId, 연결된 스프레드시트 ID 목록, 표시 값 행 목록)을 반환합니다.
+    연결 ID는 A열 셀의 링크/HYPERLINK 수식에서, 표시 값 행은 A:AA의 formattedValue에서 만듭니다.
+    """
+    metadata = execute_with_backoff(
+        sheets_service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            ranges=[f"'{sheet_name}'!A:AA"],
+            fields=(
+                "sheets(properties(sheetId,title),data.rowData.values("
+                "formattedValue,hyperlink,userEnteredValue.formulaValue))"
+            ),
+        )
+    )
     for sheet in metadata.get("sheets", []):
-        if sheet["properties"]["title"] == sheet_name:
-            return sheet["properties"]["sheetId"]
+        if sheet["properties"]["title"] != sheet_name:
+            continue
+        row_data = [
+            row for grid in sheet.get("data", []) for row in grid.get("rowData", [])
+        ]
+        linked_ids = []
+        for row in row_data:
+            first_cell = (row.get("values") or [{}])[0]
+            linked_id = _linked_spreadsheet_id(first_cell)
+            if linked_id:
+                linked_ids.append(linked_id)
+        sheet_values = [_row_values(row) for row in row_data]
+        while sheet_values and not sheet_values[-1]:
+            sheet_values.pop()
+        return sheet["properties"]["sheetId"], linked_ids, sheet_values
     raise ValueError(f"시트 '{sheet_name}'을(를) 찾을 수 없습니다.")
 
 
-# 환경변수에서 TARGET_SHEET_NAME 읽기
-TARGET_SHEET_NAME = os.getenv("TARGET_SHEET_NAME", "출하예정리스트(TEST)")
 print(f"📋 사용할 시트 이름: {TARGET_SHEET_NAME}")
-TARGET_SHEET_ID = get_sheet_id_by_name(spreadsheet_id, TARGET_SHEET_NAME)
+TARGET_SHEET_ID, linked_spreadsheet_ids, target_sheet_values = fetch_target_sheet(
+    spreadsheet_id, TARGET_SHEET_NAME
+)
+print(
+    f"추출된 스프레드시트 ID들: {linked_spreadsheet_ids[:5]}{'...' if len(linked_spreadsheet_ids) > 5 else ''} (총 {len(linked_spreadsheet_ids)}개)"
+)
 # --------------------------
 
 
-# 함수: 전체 시트 데이터 한 번만 가져오기 (TARGET_SHEET_NAME!A:AA)
-def fetch_entire_sheet_values(spreadsheet_id, sheet_range=None):
-    if sheet_range is None:
-        sheet_range = f"'{TARGET_SHEET_NAME}'!A:AA"
-    result = api_call_with_backoff(
-        sheets_service.spreadsheets().values().get,
-        spreadsheetId=spreadsheet_id,
-        range=sheet_range,
-    ).execute()
-    return result.get("values", [])
-
-
 # HTML & Drive Upload Functions
 def generate_html_from_content(html_content, output_filename="index.html"):
     styled_html = f"""
@@ -274,6 +512,7 @@ def generate_html_from_content(html_content, output_filename="index.html"):
         return None, None
 
 
+@traced("upload")
 def upload_to_drive(file_path, drive_service_param=None):
     import os
 
@@ -310,15 +549,15 @@ def upload_to_drive(file_path, drive_service_param=None):
         # drive_service 파라미터 우선 사용, 없으면 전역 변수 사용
         service = drive_service_param if drive_service_param else drive_service
 
-        file = api_call_with_backoff(
-            service.files().create, body=file_metadata, media_body=media, fields="id"
-        ).execute()
+        file = execute_with_backoff(
+            service.files().create(body=file_metadata, media_body=media, fields="id")
+        )
         file_id = file.get("id")
-        api_call_with_backoff(
-            service.permissions().create,
-            fileId=file_id,
-            body={"type": "anyone", "role": "reader"},
-        ).execute()
+        execute_with_backoff(
+            service.permissions().create(
+                fileId=file_id, body={"type": "anyone", "role": "reader"}
+            )
+        )
         image_url = f"https://drive.google.com/uc?export=view&id={file_id}"
         print(f"✅ Drive 업로드 완료: {file_name} -> {image_url}")
         return image_url
@@ -328,13 +567,19 @@ def upload_to_drive(file_path, drive_service_param=None):
 
 
 # Spreadsheet Functions with Batch Processing and reduced read calls
+# 스프레드시트 ID별 제목 - WORKSHEET 행 수 조회(또는 메타데이터 캐시)에서 함께 수집되어 get_spreadsheet_title에서 사용
+spreadsheet_titles = {}
+
+
 def get_spreadsheet_title(spreadsheet_id):
+    if spreadsheet_id in spreadsheet_titles:
+        return spreadsheet_titles[spreadsheet_id]
     try:
-        info = api_call_with_backoff(
-            sheets_service.spreadsheets().get,
-            spreadsheetId=spreadsheet_id,
-            fields="properties.title",
-        ).execute()
+        info = execute_with_backoff(
+            sheets_service.spreadsheets().get(
+                spreadsheetId=spreadsheet_id, fields="properties.title"
+            )
+        )
         return info["properties"]["title"]
     except Exception as e:
         print(f"❌ [오류] 스프레드시트 제목 가져오기 실패: {spreadsheet_id} -> {e}")
@@ -345,40 +590,6 @@ def get_order_no(spreadsheet_id):
     return get_spreadsheet_title(spreadsheet_id)
 
 
-def get_linked_spreadsheet_ids(spreadsheet_id):
-    """하이퍼링크에서 스프레드시트 ID 추출 (Rate Limit 방지)"""
-    import time
-
-    pmmd_hyperlink_range = f"'{TARGET_SHEET_NAME}'!A:A"
-    print(f"🔍 스프레드시트 ID 추출 중... (Rate Limit 방지를 위해 천천히 진행)")
-
-    # Rate Limit 방지를 위한 지연
-    time.sleep(2)
-
-    result = api_call_with_backoff(
-        sheets_service.spreadsheets().values().get,
-        spreadsheetId=spreadsheet_id,
-        range=pmmd_hyperlink_range,
-        valueRenderOption="FORMULA",
-    ).execute()
-
-    formulas = result.get("values", [])
-    linked_spreadsheet_ids = [
-        re.search(r"/d/([a-zA-Z0-9-_]+)", cell).group(1)
-        for row in formulas
-        for cell in row
-        if cell.startswith("=HYPERLINK(")
-    ]
-
-    print(
-        f"추출된 스프레드시트 ID들: {linked_spreadsheet_ids[:5]}{'...' if len(linked_spreadsheet_ids) > 5 else ''} (총 {len(linked_spreadsheet_ids)}개)"
-    )
-    return linked_spreadsheet_ids
-
-
-# 스프레드시트 ID 추출 실행
-linked_spreadsheet_ids = get_linked_spreadsheet_ids(spreadsheet_id)
-
 # Work Schedule Variables
 holidays = [
     date(2025, 1, 1),
@@ -468,17 +679,29 @@ def calculate_working_hours_with_holidays(start_time, end_time):
     return total_hours
 
 
-def process_data(df_use, model_name):
+def working_hours_rows(df_use, model_name):
+    """시작/완료 시간이 모두 있는 행 + 행별 워킹데이 소요 시간 (행 묶음 단위로 계산 가능)"""
     df_complete = df_use.dropna(subset=["시작 시간", "완료 시간"]).copy()
-    df_complete["워킹데이 소요 시간"] = df_complete.apply(
-        lambda row: calculate_working_hours_with_holidays(
-            row["시작 시간"], row["완료 시간"]
-        ),
-        axis=1,
+    hours = [
+        calculate_working_hours_with_holidays(start, end)
+        for start, end in zip(df_complete["시작 시간"], df_complete["완료 시간"])
+    ]
+    # 완료 행이 없는 묶음도 이어 붙일 수 있도록 빈 열은 float로 생성
+    df_complete["워킹데이 소요 시간"] = pd.Series(
+        hours, index=df_complete.index, dtype=None if hours else float
     )
     df_complete["작업 분류"] = df_complete["내용"].apply(
         lambda x: classify_task(x, model_name)
     )
+    return df_complete
+
+
+def process_data(df_use, model_name):
+    return summarize_task_time(working_hours_rows(df_use, model_name))
+
+
+def summarize_task_time(df_complete):
+    """working_hours_rows 결과(여러 묶음을 이어 붙인 것 포함) -> 작업별 총 워킹 소요 시간"""
     task_total_time = (
         df_complete.groupby("내용")["워킹데이 소요 시간"].sum().reset_index()
     )
@@ -649,7 +872,8 @@ def classify_task(content, model_name):
     return "기타"
 
 
-def calculate_progress_by_category(df, model_name):
+def progress_maxima(df, model_name):
+    """작업별 최대 진행율 (행 묶음 단위로 계산 후 summarize_progress에서 병합)"""
     df = df.copy()
     df["작업 분류"] = df["내용"].apply(lambda x: classify_task(x, model_name))
     df["진행율"] = df.apply(
@@ -663,7 +887,11 @@ def calculate_progress_by_category(df, model_name):
         axis=1,
     )
     df_valid = df.dropna(subset=["내용"])
-    df_max = df_valid.groupby(["내용", "작업 분류"])["진행율"].max().reset_index()
+    return df_valid.groupby(["내용", "작업 분류"])["진행율"].max().reset_index()
+
+
+def summarize_progress(maxima):
+    df_max = pd.concat(maxima).groupby(["내용", "작업 분류"])["진행율"].max().reset_index()
     progress_summary = {}
     for category in ["기구", "전장", "TMS_반제품"]:
         df_cat = df_max[df_max["작업 분류"] == category]
@@ -674,6 +902,10 @@ def calculate_progress_by_category(df, model_name):
     return progress_summary
 
 
+def calculate_progress_by_category(df, model_name):
+    return summarize_progress([progress_maxima(df, model_name)])
+
+
 def parse_avg_time_string(s):
     s = s.lower().strip()
     match = re.match(r"(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?", s)
@@ -716,6 +948,7 @@ def get_avg_time_mapping(model_name):
 # ====================================
 # Graph Functions
 # ====================================
+@traced("render")
 def generate_and_save_graph(task_total_time, order_no, model_name):
     avg_mapping = get_avg_time_mapping(model_name)
     fig, ax = plt.subplots(figsize=(12, 8))
@@ -756,6 +989,7 @@ def generate_and_save_graph(task_total_time, order_no, model_name):
     return file_name
 
 
+@traced("render")
 def generate_legend_chart(task_total_time, order_no, model_name):
     avg_mapping = get_avg_time_mapping(model_name)
     task_total_time["작업 분류"] = task_total_time["내용"].apply(
@@ -826,32 +1060,59 @@ def generate_legend_chart(task_total_time, order_no, model_name):
     return file_name
 
 
-def generate_and_save_graph_wd(task_total_time, df, order_no, model_name):
+def wd_timeline_segments(task_total_time, df):
+    """
+    WD 그래프 선분 좌표를 작업 행 전체에 대해 한 번에 계산합니다.
+    작업(task_total_time 행 순서)별로 행을 시작 시간 순으로 정렬하고, 같은 작업의 k번째 행은
+    겹치지 않도록 시작/완료 시간을 k시간씩 뒤로 밉니다.
+    반환: (시작 x, 완료 x, 작업 위치 y, {작업 위치: 완료 시간 최댓값})
+          x는 matplotlib 날짜 숫자 배열, 최댓값은 오프셋 적용 전 시간 (총 소요 시간 라벨 위치)
+    """
+    positions = {}
+    for position, task in enumerate(task_total_time["내용"]):
+        positions.setdefault(task, position)
     df_valid = df.dropna(subset=["시작 시간", "완료 시간"])
-    plt.figure(figsize=(16, 10))
-    colors = plt.cm.tab20.colors
-    time_offset = pd.Timedelta(hours=1)
-    for index, task in enumerate(task_total_time["내용"]):
-        group = df_valid[df_valid["내용"] == task].sort_values("시작 시간")
-        if group.empty:
-            continue
-        total_duration_text = task_total_time.loc[
-            task_total_time["내용"] == task, "총 워킹 소요 시간 (시간:분)"
-        ].values[0]
-        for i, (_, row) in enumerate(group.iterrows()):
-            start_time = row["시작 시간"] + (i * time_offset)
-            end_time = row["완료 시간"] + (i * time_offset)
-            plt.plot(
-                [start_time, end_time],
-                [index, index],
-                color=colors[index % len(colors)],
-                linewidth=3,
-                marker="o",
-            )
-        plt.text(
-            group["완료 시간"].max() + pd.Timedelta(hours=2),
-            index,
-            total_duration_text,
+    rows = df_valid.assign(_y=df_valid["내용"].map(positions)).dropna(subset=["_y"])
+    rows = rows.sort_values(["_y", "시작 시간"], kind="stable")
+    grouped = rows.groupby("_y", sort=False)
+    offsets = grouped.cumcount().to_numpy() * np.timedelta64(1, "h")
+    starts = rows["시작 시간"].to_numpy(dtype="datetime64[ns]") + offsets
+    ends = rows["완료 시간"].to_numpy(dtype="datetime64[ns]") + offsets
+    last_ends = {int(y): end for y, end in grouped["완료 시간"].max().items()}
+    return (
+        mdates.date2num(starts),
+        mdates.date2num(ends),
+        rows["_y"].to_numpy(dtype=int),
+        last_ends,
+    )
+
+
+@traced("render")
+def generate_and_save_graph_wd(task_total_time, df, order_no, model_name):
+    fig, ax = plt.subplots(figsize=(16, 10))
+    colors = np.array(plt.cm.tab20.colors)
+    x_start, x_end, y, last_ends = wd_timeline_segments(task_total_time, df)
+    if len(y):
+        # 행마다 plt.plot을 부르는 대신 전체 선분을 LineCollection 하나, 양 끝점을 scatter 하나로 그림
+        row_colors = colors[y % len(colors)]
+        segments = np.stack(
+            [np.column_stack([x_start, y]), np.column_stack([x_end, y])], axis=1
+        )
+        ax.add_collection(LineCollection(segments, colors=row_colors, linewidths=3))
+        ax.scatter(
+            np.concatenate([x_start, x_end]),
+            np.concatenate([y, y]),
+            c=np.concatenate([row_colors, row_colors]),
+            s=36,
+            zorder=3,
+        )
+        ax.autoscale_view()
+    durations = task_total_time["총 워킹 소요 시간 (시간:분)"].to_numpy()
+    for position, last_end in last_ends.items():
+        ax.text(
+            mdates.date2num(last_end + pd.Timedelta(hours=2)),
+            position,
+            durations[position],
             va="center",
             fontsize=10,
             color="black",
@@ -872,46 +1133,219 @@ def generate_and_save_graph_wd(task_total_time, df, order_no, model_name):
 
 
 # Utility Functions
-def fetch_data_from_sheets(spreadsheet_id, sheet_range):
-    result = api_call_with_backoff(
-        sheets_service.spreadsheets().values().get,
-        spreadsheetId=spreadsheet_id,
-        range=sheet_range,
-    ).execute()
-    values = result.get("values", [])
-    if not values or len(values) <= 7:
+WORKSHEET_COLUMNS = ["내용", "시작 시간", "완료 시간", "진행율"]
+
+
+def _parse_progress(value):
+    # "85%", " 100 ", "" -> 85.0, 100.0, NaN
+    text = str(value).replace("%", "").strip()
+    return float(text) if text else np.nan
+
+
+def build_worksheet_frame(columns, sheet_range):
+    """
+    필요한 4개 컬럼(WORKSHEET_COLUMNS 순서)의 값 목록으로 DataFrame을 만듭니다.
+    열마다 뒤쪽 빈 칸이 잘려 길이가 다를 수 있으므로 빠진 칸은 빈 문자열로 취급하며,
+    행 길이를 맞추는 패딩 복사나 모든 컬럼을 담은 중간 DataFrame을 만들지 않습니다.
+    """
+    row_count = max((len(column) for column in columns), default=0)
+    if row_count == 0:
         raise ValueError(f"'{sheet_range}'에 충분한 데이터가 없습니다.")
-    header = values[6]
-    data = values[7:]
-    max_cols = max(len(header), max((len(row) for row in data), default=0))
-    if max_cols > len(header):
-        header.extend([""] * (max_cols - len(header)))
-    adjusted_data = [
-        row + [""] * (max_cols - len(row)) if len(row) < max_cols else row[:max_cols]
-        for row in data
-    ]
-    df_raw = pd.DataFrame(adjusted_data, columns=header[:max_cols])
-    needed_cols = ["내용", "시작 시간", "완료 시간", "진행율"]
-    if not all(col in df_raw.columns for col in needed_cols):
-        raise ValueError(f"필요한 컬럼 {needed_cols}이(가) '{sheet_range}'에 없습니다.")
-    df_use = df_raw[needed_cols].copy()
-    df_use["시작 시간"] = df_use["시작 시간"].apply(parse_korean_datetime)
-    df_use["완료 시간"] = df_use["완료 시간"].apply(parse_korean_datetime)
+
+    def cells(column):
+        return [column[i] if i < len(column) else "" for i in range(row_count)]
+
+    contents, starts, ends, progress = (cells(column) for column in columns)
     # 진행율 float 변환에 방어코드 및 로깅 추가
     try:
-        df_use["진행율"] = (
-            df_use["진행율"]
-            .astype(str)
-            .str.replace("%", "")
-            .str.strip()
-            .replace("", np.nan)
-            .astype(float)
-        )
-    except Exception as e:
+        progress_values = np.array([_parse_progress(v) for v in progress], dtype=float)
+    except ValueError as e:
         print(f"[진행율 변환 오류] {e}")
-        print("진행율 값 목록:", df_use["진행율"].unique())
+        print("진행율 값 목록:", list(dict.fromkeys(progress)))
         raise
-    return df_use[df_use["내용"].notna()]
+    return pd.DataFrame(
+        {
+            "내용": contents,
+            "시작 시간": pd.Series(starts, dtype=object).map(parse_korean_datetime),
+            "완료 시간": pd.Series(ends, dtype=object).map(parse_korean_datetime),
+            "진행율": progress_values,
+        }
+    )
+
+
+# 템플릿(모델)별 WORKSHEET 열 문자 - 실행 간 SHEET_CACHE_DIR에 저장
+worksheet_layouts = load_layouts(SHEET_CACHE_DIR)
+
+
+# 스프레드시트 ID별 제목/시트(sheetId, 행 수) - 실행 간 SHEET_CACHE_DIR에 저장, 시작 시 Drive 수정 시각으로 검증
+spreadsheet_metadata = load_metadata(SHEET_CACHE_DIR)
+# 이번 실행에서 확인한 Drive 수정 시각 (새로 조회한 메타데이터를 캐시에 기록할 때 사용)
+drive_modified_times = {}
+
+
+def fetch_drive_modified_times(spreadsheet_ids):
+    """Drive modifiedTime을 한 번의 배치 HTTP 요청(최대 100건)으로 조회. 실패한 ID는 None"""
+    modified_times = {}
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            print(f"❌ [오류] 수정 시각 가져오기 실패 ({request_id}): {exception}")
+            modified_times[request_id] = None
+        else:
+            modified_times[request_id] = response.get("modifiedTime")
+
+    ids = list(dict.fromkeys(spreadsheet_ids))
+    for start in range(0, len(ids), 100):
+        batch = drive_service.new_batch_http_request(callback=callback)
+        for sid in ids[start : start + 100]:
+            batch.add(
+                drive_service.files().get(fileId=sid, fields="id,modifiedTime"),
+                request_id=sid,
+            )
+        api_call_with_backoff(batch.execute)
+    return modified_times
+
+
+def revalidate_spreadsheet_metadata(spreadsheet_ids):
+    """
+    처리할 주문의 메타데이터 캐시를 Drive 수정 시각으로 일괄 검증합니다.
+    수정되지 않은 주문은 캐시를 그대로 쓰고, 수정됐거나 TTL이 지난 주문만 spreadsheets.get으로 다시 조회합니다.
+    """
+    if not spreadsheet_ids:
+        return
+    try:
+        drive_modified_times.update(fetch_drive_modified_times(spreadsheet_ids))
+    except Exception as e:
+        # 검증할 수 없으면 캐시를 쓰지 않고 모두 다시 조회
+        print(f"❌ [오류] 메타데이터 캐시 검증 실패, 전체 재조회: {e}")
+        for sid in spreadsheet_ids:
+            spreadsheet_metadata.pop(sid, None)
+        return
+    kept, dropped = revalidate(
+        spreadsheet_metadata, drive_modified_times, SHEET_METADATA_TTL_HOURS * 3600
+    )
+    print(
+        f"🗂️ 메타데이터 캐시: 재사용 {kept}건, 변경/만료로 재조회 {dropped}건, "
+        f"신규 {len(spreadsheet_ids) - kept - dropped}건"
+    )
+
+
+def fetch_worksheet_row_count(spreadsheet_id):
+    """WORKSHEET 탭의 전체 행 수 (같은 호출로 스프레드시트 제목도 수집, 검증된 캐시가 있으면 호출 생략)"""
+    entry = spreadsheet_metadata.get(spreadsheet_id)
+    if entry is None:
+        info = execute_with_backoff(
+            sheets_service.spreadsheets().get(
+                spreadsheetId=spreadsheet_id,
+                fields="properties.title,sheets.properties(sheetId,title,gridProperties.rowCount)",
+            )
+        )
+        entry = make_entry(info, drive_modified_times.get(spreadsheet_id))
+        if entry["modified_time"] is not None:
+            spreadsheet_metadata[spreadsheet_id] = entry
+    spreadsheet_titles[spreadsheet_id] = entry["title"]
+    if WORKSHEET_SHEET_NAME not in entry["sheets"]:
+        raise ValueError(f"'{WORKSHEET_SHEET_NAME}' 시트를 찾을 수 없습니다.")
+    return entry["sheets"][WORKSHEET_SHEET_NAME]["rowCount"]
+
+
+def resolve_worksheet_layout(spreadsheet_id, template):
+    """헤더 행에서 필요한 컬럼의 열 문자를 찾아 템플릿 캐시에 저장"""
+    header_range = f"'{WORKSHEET_SHEET_NAME}'!{WORKSHEET_HEADER_ROW}:{WORKSHEET_HEADER_ROW}"
+    result = execute_with_backoff(
+        sheets_service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id, range=header_range
+        )
+    )
+    header = (result.get("values") or [[]])[0]
+    letters = resolve_columns(header, WORKSHEET_COLUMNS)
+    if letters is None:
+        raise ValueError(f"필요한 컬럼 {WORKSHEET_COLUMNS}이(가) '{header_range}'에 없습니다.")
+    worksheet_layouts[template] = letters
+    save_layouts(SHEET_CACHE_DIR, worksheet_layouts)
+    print(f"🧭 WORKSHEET 열 위치 확인 ({template}): {dict(zip(WORKSHEET_COLUMNS, letters))}")
+    return letters
+
+
+def fetch_worksheet_columns(spreadsheet_id, letters, first_row, last_row):
+    """필요한 열의 first_row~last_row 행만 한 번의 batchGet으로 조회. 반환: 열별 값 목록"""
+    # 묶음 단위 조회로 요청 수가 늘어나므로 429도 묶음별로 백오프 재시도 (주문 전체를 포기하지 않음)
+    result = execute_with_backoff(
+        sheets_service.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=column_ranges(WORKSHEET_SHEET_NAME, letters, first_row, last_row),
+            majorDimension="COLUMNS",
+        )
+    )
+    return [
+        (value_range.get("values") or [[]])[0]
+        for value_range in result.get("valueRanges", [])
+    ]
+
+
+def iter_worksheet_frames(spreadsheet_id, template):
+    """
+    주문 WORKSHEET에서 내용/시작 시간/완료 시간/진행율 열만 WORKSHEET_CHUNK_ROWS행 단위로 조회해
+    묶음별 DataFrame을 차례로 돌려줍니다. (대부분의 시트는 한 묶음)
+    묶음 끝의 빈 행은 뒤 묶음에 데이터가 있을 때만 이어 붙이므로, 모든 묶음을 합치면
+    시트 전체를 한 번에 조회한 결과와 같습니다.
+    template: 열 위치 캐시 키 (같은 모델은 같은 템플릿)
+    """
+    row_count = fetch_worksheet_row_count(spreadsheet_id)
+    if row_count <= WORKSHEET_HEADER_ROW:
+        raise ValueError(f"'{WORKSHEET_SHEET_NAME}'에 충분한 데이터가 없습니다.")
+    template_key = f"{WORKSHEET_SHEET_NAME}|{template}"
+    letters = worksheet_layouts.get(template_key) or resolve_worksheet_layout(
+        spreadsheet_id, template_key
+    )
+    first_data_row = WORKSHEET_HEADER_ROW + 1
+    pending_blank_rows = 0
+    has_data = False
+    for first_row in range(first_data_row, row_count + 1, WORKSHEET_CHUNK_ROWS):
+        last_row = min(first_row + WORKSHEET_CHUNK_ROWS - 1, row_count)
+        if first_row == first_data_row:
+            # 첫 묶음은 헤더 행부터 조회해 캐시된 열 위치가 맞는지 확인
+            columns = fetch_worksheet_columns(
+                spreadsheet_id, letters, WORKSHEET_HEADER_ROW, last_row
+            )
+            if [column[:1] for column in columns] != [[name] for name in WORKSHEET_COLUMNS]:
+                # 캐시된 열 위치가 이 스프레드시트와 맞지 않음 (템플릿 변경) -> 헤더를 다시 찾아 재조회
+                letters = resolve_worksheet_layout(spreadsheet_id, template_key)
+                columns = fetch_worksheet_columns(
+                    spreadsheet_id, letters, WORKSHEET_HEADER_ROW, last_row
+                )
+            columns = [column[1:] for column in columns]
+        else:
+            columns = fetch_worksheet_columns(spreadsheet_id, letters, first_row, last_row)
+        chunk_rows = last_row - first_row + 1
+        data_rows = max(len(column) for column in columns)
+        if data_rows == 0:
+            pending_blank_rows += chunk_rows
+            continue
+        if pending_blank_rows:
+            columns = [[""] * pending_blank_rows + column for column in columns]
+        yield build_worksheet_frame(columns, WORKSHEET_SHEET_NAME)
+        has_data = True
+        pending_blank_rows = chunk_rows - data_rows
+    if not has_data:
+        raise ValueError(f"'{WORKSHEET_SHEET_NAME}'에 충분한 데이터가 없습니다.")
+
+
+def fetch_data_from_sheets(spreadsheet_id, template):
+    """주문 WORKSHEET 전체를 DataFrame 하나로 조회 (iter_worksheet_frames의 묶음을 이어 붙임)"""
+    return pd.concat(
+        list(iter_worksheet_frames(spreadsheet_id, template)), ignore_index=True
+    )
+
+
+# 스프레드시트 ID별 기구 시작일 (정보판!B6) - 주문별 정보판 조회 시 함께 수집되어 정렬에 사용
+mech_start_dates = {}
+
+
+def _parse_mech_start(response):
+    values = response.get("values", [])
+    raw_date = values[0][0] if values and values[0] else None
+    return pd.to_datetime(raw_date, errors="coerce")
 
 
 def fetch_info_board_extended(spreadsheet_id):
@@ -919,6 +1353,7 @@ def fetch_info_board_extended(spreadsheet_id):
         ("정보판!D4", "model_name"),
         ("정보판!B5", "mech_partner"),
         ("정보판!D5", "elec_partner"),
+        ("정보판!B6", "mech_start"),
     ]
     batch_request = (
         sheets_service.spreadsheets()
@@ -932,6 +1367,9 @@ def fetch_info_board_extended(spreadsheet_id):
     result = api_call_with_backoff(batch_request.execute)
     results = {}
     for (rng, key), response in zip(ranges, result.get("valueRanges", [])):
+        if key == "mech_start":
+            mech_start_dates[spreadsheet_id] = _parse_mech_start(response)
+            continue
         values = response.get("values", [[]])
         results[key] = values[0][0].strip() if values else "미정"
     print(
@@ -946,11 +1384,9 @@ def fetch_info_board_extended(spreadsheet_id):
 
 def batch_update_spreadsheet(spreadsheet_id, requests):
     body = {"requests": requests}
-    api_call_with_backoff(
-        sheets_service.spreadsheets().batchUpdate,
-        spreadsheetId=spreadsheet_id,
-        body=body,
-    ).execute()
+    execute_with_backoff(
+        sheets_service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=body)
+    )
 
 
 # --- 수정된 업데이트 함수 (sheet_values 전달) ---
@@ -1256,16 +1692,35 @@ def batch_update_spreadsheet_values(spreadsheet_id, data):
 
 
 # NaN & Overtime Stats
-def compute_occurrence_rates(
-    df,
-    task_total_time,
-    avg_mapping,
-    model_name,
-    tolerance=2,
-    mech_partner=None,
-    elec_partner=None,
-):
-    categories = ["기구", "TMS_반제품", "전장", "검사", "마무리", "기타"]
+def scan_occurrences(df, model_name):
+    """
+    행 묶음 1개의 NaN 집계 재료: 카테고리별 행 수, NaN 후보 (작업명, 분류) 목록(행 순서), 완료된 작업명
+    완료 여부는 전체 행 기준이므로 NaN 판정은 모든 묶음을 모은 뒤 finish_occurrence_rates에서 합니다.
+    """
+    df["진행율"] = pd.to_numeric(df["진행율"], errors="coerce")
+    completed_tasks = set(
+        df[(df["진행율"] >= 100) | (df["시작 시간"].notna() & df["완료 시간"].notna())][
+            "내용"
+        ]
+    )
+    total_counts = dict.fromkeys(CATEGORIES, 0)
+    nan_candidates = []
+    for task_name, start, end, progress in zip(
+        df["내용"], df["시작 시간"], df["완료 시간"], df["진행율"]
+    ):
+        category = classify_task(task_name, model_name)
+        total_counts[category] += 1
+        if pd.isna(start) or pd.isna(end) or pd.isna(progress):
+            nan_candidates.append((task_name, category))
+    return {
+        "total_counts": total_counts,
+        "nan_candidates": nan_candidates,
+        "completed_tasks": completed_tasks,
+    }
+
+
+def finish_occurrence_rates(scans, task_total_time, avg_mapping, model_name, tolerance=2):
+    """scan_occurrences 결과(묶음 순서대로)와 작업별 총 시간으로 카테고리/협력사별 NaN·OT 집계"""
     occurrence_stats = {
         cat: {
             "total_count": 0,
@@ -1274,30 +1729,18 @@ def compute_occurrence_rates(
             "nan_tasks": [],
             "ot_task_details": [],
         }
-        for cat in categories
+        for cat in CATEGORIES
     }
     partner_stats = {
         "mech": {"nan_count": 0, "ot_count": 0},
         "elec": {"nan_count": 0, "ot_count": 0},
     }
-    df["진행율"] = pd.to_numeric(df["진행율"], errors="coerce")
-    completed_tasks = set(
-        df[
-            (pd.to_numeric(df["진행율"], errors="coerce") >= 100)
-            | (df["시작 시간"].notna() & df["완료 시간"].notna())
-        ]["내용"]
-    )
+    completed_tasks = set().union(*(scan["completed_tasks"] for scan in scans))
     nan_task_checked = set()
-    for _, row in df.iterrows():
-        task_name = row["내용"]
-        category = classify_task(task_name, model_name)
-        occurrence_stats[category]["total_count"] += 1
-        is_nan = (
-            pd.isna(row["시작 시간"])
-            or pd.isna(row["완료 시간"])
-            or pd.isna(row["진행율"])
-        )
-        if is_nan:
+    for scan in scans:
+        for category, count in scan["total_counts"].items():
+            occurrence_stats[category]["total_count"] += count
+        for task_name, category in scan["nan_candidates"]:
             if task_name in completed_tasks:
                 continue
             if (task_name, category) in nan_task_checked:
@@ -1309,9 +1752,9 @@ def compute_occurrence_rates(
                 partner_stats["mech"]["nan_count"] += 1
             elif category == "전장":
                 partner_stats["elec"]["nan_count"] += 1
-    for _, row in task_total_time.iterrows():
-        task_name = row["내용"]
-        actual_hours = row["워킹데이 소요 시간"]
+    for task_name, actual_hours in zip(
+        task_total_time["내용"], task_total_time["워킹데이 소요 시간"]
+    ):
         category = classify_task(task_name, model_name)
         if (
             task_name in avg_mapping
@@ -1328,40 +1771,86 @@ def compute_occurrence_rates(
     return occurrence_stats, partner_stats
 
 
+def compute_occurrence_rates(
+    df,
+    task_total_time,
+    avg_mapping,
+    model_name,
+    tolerance=2,
+    mech_partner=None,
+    elec_partner=None,
+):
+    return finish_occurrence_rates(
+        [scan_occurrences(df, model_name)],
+        task_total_time,
+        avg_mapping,
+        model_name,
+        tolerance=tolerance,
+    )
+
+
+class WorksheetAggregate:
+    """
+    주문 WORKSHEET 행 묶음을 차례로 받아 집계 재료만 누적합니다.
+    묶음마다 원본 행은 버리고 완료 행(+워킹 시간), NaN 집계 재료, 작업별 최대 진행율만 남기며,
+    병합 결과는 전체 행을 한 번에 넣은 process_data / compute_occurrence_rates /
+    calculate_progress_by_category와 같습니다.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.row_count = 0
+        self._complete_rows = []
+        self._scans = []
+        self._progress_maxima = []
+
+    def add(self, df):
+        self.row_count += len(df)
+        self._complete_rows.append(working_hours_rows(df, self.model_name))
+        self._scans.append(scan_occurrences(df, self.model_name))
+        self._progress_maxima.append(progress_maxima(df, self.model_name))
+
+    def complete_rows(self):
+        """시작/완료 시간이 모두 있는 행 (WD 그래프용)"""
+        return pd.concat(self._complete_rows, ignore_index=True)
+
+    def task_total_time(self):
+        return summarize_task_time(self.complete_rows())
+
+    def occurrence_rates(self, task_total_time, avg_mapping, tolerance=2):
+        return finish_occurrence_rates(
+            self._scans, task_total_time, avg_mapping, self.model_name, tolerance
+        )
+
+    def progress_summary(self):
+        return summarize_progress(self._progress_maxima)
+
+
 # Bar Chart Generation
+@traced("render")
 def generate_nan_bar_charts(all_results):
     partner_stats = {}
-    for (
-        _,
-        _,
-        mech_partner_raw,
-        elec_partner_raw,
-        occurrence_stats,
-        partner_stats_individual,
-        _,
-        _,
-        _,
-    ) in all_results:
-        mech_partner = "TMS(m)" if mech_partner_raw == "TMS" else mech_partner_raw
-        elec_partner = "TMS(e)" if elec_partner_raw == "TMS" else elec_partner_raw
-        mech_nan = partner_stats_individual.get("mech", {}).get("nan_count", 0)
-        mech_total = occurrence_stats.get("기구", {}).get("total_count", 0)
+    for result in all_results:
+        mech_partner = "TMS(m)" if result.mech_partner == "TMS" else result.mech_partner
+        elec_partner = "TMS(e)" if result.elec_partner == "TMS" else result.elec_partner
+        mech_nan = result.partner_nan[0]
+        mech_total = result.total_counts[MECH]
         if mech_partner:
             partner_stats[mech_partner] = partner_stats.get(
                 mech_partner, {"nan_count": 0, "total_tasks": 0}
             )
             partner_stats[mech_partner]["nan_count"] += mech_nan
             partner_stats[mech_partner]["total_tasks"] += mech_total
-        tms_nan = occurrence_stats.get("TMS_반제품", {}).get("nan_count", 0)
-        tms_total = occurrence_stats.get("TMS_반제품", {}).get("total_count", 0)
+        tms_nan = result.nan_counts[TMS]
+        tms_total = result.total_counts[TMS]
         if tms_total > 0:
             partner_stats["TMS_반제품"] = partner_stats.get(
                 "TMS_반제품", {"nan_count": 0, "total_tasks": 0}
             )
             partner_stats["TMS_반제품"]["nan_count"] += tms_nan
             partner_stats["TMS_반제품"]["total_tasks"] += tms_total
-        elec_nan = partner_stats_individual.get("elec", {}).get("nan_count", 0)
-        elec_total = occurrence_stats.get("전장", {}).get("total_count", 0)
+        elec_nan = result.partner_nan[1]
+        elec_total = result.total_counts[ELEC]
         if elec_partner:
             partner_stats[elec_partner] = partner_stats.get(
                 elec_partner, {"nan_count": 0, "total_tasks": 0}
@@ -1435,85 +1924,14 @@ def render_progress_bar(percent, total, label):
         )
 
 
-def build_combined_email_body(
-    all_results,
-    nan_tasks_link=None,
-    nan_total_link=None,
-    heatmap_url=None,
-    monthly_partner_url=None,
-    monthly_model_url=None,
-):
-    kst = pytz.timezone("Asia/Seoul")
-    execution_time = datetime.now(kst).strftime("%Y-%m-%d %H:%M:%S")
-    year, week_num, _ = date.today().isocalendar()
-    dashboard_link = os.getenv("DASHBOARD_URL", "https://nan-dashboard.netlify.app")
-
-    # 고유 값 수집 (필터 드롭다운용)
-    unique_values = {
-        "Order": set(),
-        "모델명": set(),
-        "기구협력사": set(),
-        "전장협력사": set(),
-        "총 작업 수": set(),
-        "기구 NaN": set(),
-        "기구 OT": set(),
-        "기구 진행률": set(),
-        "전장 NaN": set(),
-        "전장 OT": set(),
-        "전장 진행률": set(),
-        "TMS NaN": set(),
-        "TMS OT": set(),
-        "TMS 진행률": set(),
-    }
-    for (
-        order_no,
-        model_name,
-        mech_partner,
-        elec_partner,
-        occurrence_stats,
-        partner_stats,
-        _,
-        spreadsheet_url,
-        progress_summary,
-    ) in all_results:
-        total_tasks = sum(stats["total_count"] for stats in occurrence_stats.values())
-        mech_stats = partner_stats.get("mech", {})
-        elec_stats = partner_stats.get("elec", {})
-        tms_stats = occurrence_stats.get("TMS_반제품", {})
-        unique_values["Order"].add(order_no)
-        unique_values["모델명"].add(model_name)
-        unique_values["기구협력사"].add(mech_partner)
-        unique_values["전장협력사"].add(elec_partner)
-        unique_values["총 작업 수"].add(str(total_tasks))
-        unique_values["기구 NaN"].add(str(mech_stats.get("nan_count", 0)))
-        unique_values["기구 OT"].add(str(mech_stats.get("ot_count", 0)))
-        unique_values["전장 NaN"].add(str(elec_stats.get("nan_count", 0)))
-        unique_values["전장 OT"].add(str(elec_stats.get("ot_count", 0)))
-        unique_values["TMS NaN"].add(str(tms_stats.get("nan_count", 0)))
-        unique_values["TMS OT"].add(str(tms_stats.get("ot_count", 0)))
-        # 진행률 고유 값 추가 (소수점 1자리 문자열)
-        prog = progress_summary or {"기구": 0, "전장": 0, "TMS_반제품": 0}
-        unique_values["기구 진행률"].add(f"{prog.get('기구', 0):.1f}")
-        unique_values["전장 진행률"].add(f"{prog.get('전장', 0):.1f}")
-        unique_values["TMS 진행률"].add(f"{prog.get('TMS_반제품', 0):.1f}")
-
-    lines = [
-        '<div style="text-align: center; margin-bottom: 20px;">' "</div>",
-        '<div class="chart-section" style="margin-top: 30px;">',
-        '<iframe src="partner_entry_chart.html" width="100%" height="1200" frameborder="0"></iframe>',
-        "</div>",
-        f"<h1>PDA Dashboard - {year}년 {week_num}주차</h1>",
-        f"<h3>📌 [알림] PDA Overtime 및 NaN 체크 결과 (총 {len(all_results)}건 처리)</h3>",
-        f"<p>📅 실행 시간: {execution_time} (KST)</p>",
-        f'<p>📊 대시보드에서 상세 내용 확인하세요! (<a href="{dashboard_link}">대시보드 바로가기</a>',
-    ]
-
-    # NOVA 트렌드 그래프 섹션을 대시보드 링크 바로 뒤에 추가
-    nova_links = []
-    if heatmap_url:
-        nova_links.append(
-            f'📅 주간 협력사 NaN 히트맵: <a href="{heatmap_url}" target="_blank">그래프 보기</a>'
-        )
+def resolve_trend_links(heatmap_url=None, monthly_partner_url=None, monthly_model_url=None):
+    """
+    트렌드 지표 링크 목록 [(라벨, URL)]을 만듭니다.
+    월간 히트맵 URL이 없으면 Drive에서 최신 파일을 검색하고, 그래도 없으면 환경변수 기본값을 사용합니다.
+    """
+    trend_links = []
+    if heatmap_url:
+        trend_links.append(("📅 주간 협력사 NaN 히트맵", heatmap_url))
 
     # 월간 히트맵 링크들 (Google Drive에서 최신 파일 검색)
     if not monthly_partner_url:
@@ -1586,13 +2004,78 @@ def build_combined_email_body(
 
     # 링크가 있는 경우에만 추가
     if monthly_partner_url:
-        nova_links.append(
-            f'🗓️ 월간 협력사 NaN 히트맵: <a href="{monthly_partner_url}" target="_blank">그래프 보기</a>'
-        )
+        trend_links.append(("🗓️ 월간 협력사 NaN 히트맵", monthly_partner_url))
     if monthly_model_url:
-        nova_links.append(
-            f'📈 월간 모델별 NaN 히트맵: <a href="{monthly_model_url}" target="_blank">그래프 보기</a>'
+        trend_links.append(("📈 월간 모델별 NaN 히트맵", monthly_model_url))
+    return trend_links
+
+
+def build_combined_email_body(
+    all_results,
+    nan_tasks_link=None,
+    nan_total_link=None,
+    heatmap_url=None,
+    monthly_partner_url=None,
+    monthly_model_url=None,
+):
+    kst = pytz.timezone("Asia/Seoul")
+    execution_time = datetime.now(kst).strftime("%Y-%m-%d %H:%M:%S")
+    year, week_num, _ = date.today().isocalendar()
+    dashboard_link = os.getenv("DASHBOARD_URL", "https://nan-dashboard.netlify.app")
+
+    # 고유 값 수집 (필터 드롭다운용)
+    unique_values = {
+        "Order": set(),
+        "모델명": set(),
+        "기구협력사": set(),
+        "전장협력사": set(),
+        "총 작업 수": set(),
+        "기구 NaN": set(),
+        "기구 OT": set(),
+        "기구 진행률": set(),
+        "전장 NaN": set(),
+        "전장 OT": set(),
+        "전장 진행률": set(),
+        "TMS NaN": set(),
+        "TMS OT": set(),
+        "TMS 진행률": set(),
+    }
+    for result in all_results:
+        prog_mech, prog_elec, prog_tms = result.progress
+        unique_values["Order"].add(result.order_no)
+        unique_values["모델명"].add(result.model_name)
+        unique_values["기구협력사"].add(result.mech_partner)
+        unique_values["전장협력사"].add(result.elec_partner)
+        unique_values["총 작업 수"].add(str(result.total_tasks))
+        unique_values["기구 NaN"].add(str(result.partner_nan[0]))
+        unique_values["기구 OT"].add(str(result.partner_ot[0]))
+        unique_values["전장 NaN"].add(str(result.partner_nan[1]))
+        unique_values["전장 OT"].add(str(result.partner_ot[1]))
+        unique_values["TMS NaN"].add(str(result.nan_counts[TMS]))
+        unique_values["TMS OT"].add(str(result.ot_counts[TMS]))
+        # 진행률 고유 값 추가 (소수점 1자리 문자열)
+        unique_values["기구 진행률"].add(f"{prog_mech:.1f}")
+        unique_values["전장 진행률"].add(f"{prog_elec:.1f}")
+        unique_values["TMS 진행률"].add(f"{prog_tms:.1f}")
+
+    lines = [
+        '<div style="text-align: center; margin-bottom: 20px;">' "</div>",
+        '<div class="chart-section" style="margin-top: 30px;">',
+        '<iframe src="partner_entry_chart.html" width="100%" height="1200" frameborder="0"></iframe>',
+        "</div>",
+        f"<h1>PDA Dashboard - {year}년 {week_num}주차</h1>",
+        f"<h3>📌 [알림] PDA Overtime 및 NaN 체크 결과 (총 {len(all_results)}건 처리)</h3>",
+        f"<p>📅 실행 시간: {execution_time} (KST)</p>",
+        f'<p>📊 대시보드에서 상세 내용 확인하세요! (<a href="{dashboard_link}">대시보드 바로가기</a>',
+    ]
+
+    # NOVA 트렌드 그래프 섹션을 대시보드 링크 바로 뒤에 추가
+    nova_links = [
+        f'{label}: <a href="{url}" target="_blank">그래프 보기</a>'
+        for label, url in resolve_trend_links(
+            heatmap_url, monthly_partner_url, monthly_model_url
         )
+    ]
 
     if nova_links:
         lines.append("<p><strong>📊트렌드 지표</strong></p><ul>")
@@ -1638,36 +2121,17 @@ def build_combined_email_body(
     lines.append("</tr>")
 
     # 테이블 행 생성 (Order 열에 하이퍼링크 추가)
-    for (
-        order_no,
-        model_name,
-        mech_partner,
-        elec_partner,
-        occurrence_stats,
-        partner_stats,
-        links,
-        spreadsheet_url,
-        progress_summary,
-    ) in all_results:
-        total_tasks = sum(stats["total_count"] for stats in occurrence_stats.values())
-        prog = progress_summary or {"기구": 0, "전장": 0, "TMS_반제품": 0}
-        prog_mech = prog.get("기구", 0)
-        prog_elec = prog.get("전장", 0)
-        prog_tms = prog.get("TMS_반제품", 0)
-        mech_stats = partner_stats.get("mech", {})
-        elec_stats = partner_stats.get("elec", {})
-        tms_stats = occurrence_stats.get("TMS_반제품", {})
-        mech_nan = mech_stats.get("nan_count", 0)
-        mech_ot = mech_stats.get("ot_count", 0)
-        mech_total = mech_stats.get("total_count", 0)
-        elec_nan = elec_stats.get("nan_count", 0)
-        elec_ot = elec_stats.get("ot_count", 0)
-        elec_total = elec_stats.get("total_count", 0)
-        tms_nan = tms_stats.get("nan_count", 0)
-        tms_ot = tms_stats.get("ot_count", 0)
-        tms_total = tms_stats.get("total_count", 0)
+    for result in all_results:
+        prog_mech, prog_elec, prog_tms = result.progress
+        mech_nan, elec_nan = result.partner_nan
+        mech_ot, elec_ot = result.partner_ot
+        # 협력사 통계에는 전체 작업 수가 없어 진행률 막대의 기구/전장 작업 수는 0으로 표시 (기존 동작 유지)
+        mech_total = elec_total = 0
+        tms_nan = result.nan_counts[TMS]
+        tms_ot = result.ot_counts[TMS]
+        tms_total = result.total_counts[TMS]
         lines.append(
-            f'<tr><td><a href="{spreadsheet_url}">{order_no}</a></td><td>{model_name}</td><td>{mech_partner}</td><td>{elec_partner}</td><td>{total_tasks}</td>'
+            f'<tr><td><a href="{result.spreadsheet_url}">{result.order_no}</a></td><td>{result.model_name}</td><td>{result.mech_partner}</td><td>{result.elec_partner}</td><td>{result.total_tasks}</td>'
             f'<td{" style=" + chr(34) + "color: red; font-weight: bold;" + chr(34) if mech_nan > 0 else ""}>{mech_nan}</td>'
             f'<td{" style=" + chr(34) + "color: red; font-weight: bold;" + chr(34) if mech_ot > 0 else ""}>{mech_ot}</td>'
             f'<td>{render_progress_bar(prog_mech, mech_total, "기구")}</td>'
@@ -1732,55 +2196,38 @@ def build_combined_email_body(
     """
     )
 
-    for (
-        order_no,
-        model_name,
-        mech_partner,
-        elec_partner,
-        occurrence_stats,
-        partner_stats,
-        links,
-        spreadsheet_url,
-        progress_summary,
-    ) in all_results:
+    for result in all_results:
+        working_hours_link, legend_link, wd_link = result.links
         lines.append(
-            f"<details><summary><strong>📍 Order: {order_no}, 모델명: {model_name}</strong></summary>"
+            f"<details><summary><strong>📍 Order: {result.order_no}, 모델명: {result.model_name}</strong></summary>"
         )
         lines.append(
-            f"<p>🏭 기구협력사: {mech_partner}, ⚡ 전장협력사: {elec_partner}</p>"
+            f"<p>🏭 기구협력사: {result.mech_partner}, ⚡ 전장협력사: {result.elec_partner}</p>"
         )
         lines.append(
-            f'<p>📋 <strong>모델 스프레드시트</strong>: <a href="{spreadsheet_url}">바로가기</a></p>'
+            f'<p>📋 <strong>모델 스프레드시트</strong>: <a href="{result.spreadsheet_url}">바로가기</a></p>'
         )
         lines.append(
             f"<p>📊 그래프 링크:</p><ul>"
-            f'<li>Working Hours: <a href="{links["working_hours"]}">바로가기</a></li>'
-            f'<li>Legend Chart: <a href="{links["legend"]}">바로가기</a></li>'
-            f'<li>WD Chart: <a href="{links["wd"]}">바로가기</a></li></ul>'
+            f'<li>Working Hours: <a href="{working_hours_link}">바로가기</a></li>'
+            f'<li>Legend Chart: <a href="{legend_link}">바로가기</a></li>'
+            f'<li>WD Chart: <a href="{wd_link}">바로가기</a></li></ul>'
         )
-        for category in ["기구", "TMS_반제품", "전장", "검사", "마무리", "기타"]:
-            stats = occurrence_stats.get(
-                category,
-                {
-                    "total_count": 0,
-                    "nan_count": 0,
-                    "ot_count": 0,
-                    "nan_tasks": [],
-                    "ot_task_details": [],
-                },
-            )
-            total_count = stats["total_count"]
+        for index, category in enumerate(CATEGORIES):
+            total_count = result.total_counts[index]
             lines.append(
                 f"<p><b>🔹 {category} 작업</b><br> - 전체 작업 수: {total_count} 건<br>"
             )
-            nan_count = stats["nan_count"]
+            nan_count = result.nan_counts[index]
             nan_ratio = (nan_count / total_count) * 100 if total_count > 0 else 0
             lines.append(
                 f' <span{" style=" + chr(34) + "color: red;" + chr(34) if nan_count > 0 else ""}>⚠️ 누락(NaN): {nan_count} 건 (비율: {nan_ratio:.2f}%)</span><br>'
             )
             if nan_count > 0:
-                lines.append("".join(f"   - {task}<br>" for task in stats["nan_tasks"]))
-            ot_count = stats["ot_count"]
+                lines.append(
+                    "".join(f"   - {task}<br>" for task in result.nan_tasks(category))
+                )
+            ot_count = result.ot_counts[index]
             ot_ratio = (ot_count / total_count) * 100 if total_count > 0 else 0
             lines.append(
                 f' <span{" style=" + chr(34) + "color: red;" + chr(34) if ot_count > 0 else ""}>⏳ 오버타임: {ot_count} 건 (비율: {ot_ratio:.2f}%)</span><br>'
@@ -1789,7 +2236,7 @@ def build_combined_email_body(
                 lines.append(
                     "".join(
                         f"   - {task} {format_hours(hours)}<br>"
-                        for task, hours in stats["ot_task_details"]
+                        for task, hours in result.ot_task_details(category)
                     )
                 )
             lines.append("</p>")
@@ -1798,54 +2245,93 @@ def build_combined_email_body(
     return "\n".join(lines)
 
 
-def send_occurrence_email(subject, body_text, graph_files=None, dashboard_file=None):
+# 알림 채널 함수가 설정 없음 등으로 아무것도 보내지 않았을 때 반환하는 값
+NOTIFICATION_SKIPPED = "skipped"
+
+
+def send_occurrence_email(
+    subject, body_text, graph_files=None, dashboard_file=None, image_links=None
+):
+    """
+    알림 메일 발송: 그래프는 축소/최적화 후 본문에 인라인(CID)으로 삽입하고,
+    EMAIL_MAX_BYTES를 넘으면 큰 이미지부터, 그다음 대시보드 첨부를 링크(image_links 또는 대시보드)로 대체하고
+    본문만으로도 넘으면 보내지 않고 실패로 처리합니다. SMTP 세션은 실행 중 재사용됩니다.
+    반환: True(발송), False(실패), NOTIFICATION_SKIPPED(이메일 설정 없음)
+    """
     # 이메일 설정이 없으면 건너뛰기
     if not email_configured:
         print(f"⚠️ 이메일 설정이 없어 이메일 전송을 건너뜁니다.")
         print(f"📧 제목: {subject}")
-        return
+        return NOTIFICATION_SKIPPED
 
-    context = ssl.create_default_context()
-    msg = MIMEMultipart("mixed")
-    msg["From"] = EMAIL_ADDRESS
-    msg["To"] = RECEIVER_EMAIL
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body_text, "html", _charset="utf-8"))
-    if graph_files:
-        for graph_file in graph_files:
-            try:
-                with open(graph_file, "rb") as f:
-                    img = MIMEImage(f.read())
-                    img.add_header(
-                        "Content-Disposition", "attachment", filename=graph_file
-                    )
-                    msg.attach(img)
-                print(f"✅ 그래프 파일 첨부 완료: {graph_file}")
-            except Exception as e:
-                print(f"❌ [첨부 오류] 그래프 파일 {graph_file} 첨부 실패: {e}")
-    if dashboard_file:
-        try:
-            with open(dashboard_file, "rb") as f:
-                html_attachment = MIMEApplication(f.read(), _subtype="html")
-                html_attachment.add_header(
-                    "Content-Disposition", "attachment", filename=dashboard_file
-                )
-                msg.attach(html_attachment)
-            print(f"📄 [이메일 첨부] HTML 대시보드 파일 {dashboard_file} 추가 완료")
-        except Exception as e:
-            print(
-                f"❌ [이메일 첨부 오류] HTML 대시보드 파일 {dashboard_file} 추가 실패: {e}"
-            )
+    dashboard_link = os.getenv("DASHBOARD_URL", "https://nan-dashboard.netlify.app")
+    links = {path: dashboard_link for path in graph_files or []}
+    links.update(image_links or {})
     try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls(context=context)
-            server.login(EMAIL_ADDRESS, EMAIL_PASS)
-            server.send_message(msg)
+        msg = build_email(
+            subject,
+            body_text,
+            EMAIL_ADDRESS,
+            RECEIVER_EMAIL,
+            images=graph_files,
+            attachments=[dashboard_file] if dashboard_file else None,
+            image_links=links,
+            attachment_links={dashboard_file: dashboard_link} if dashboard_file else None,
+            max_bytes=EMAIL_MAX_BYTES,
+            max_width=EMAIL_IMAGE_MAX_WIDTH,
+        )
+    except EmailTooLargeError as e:
+        # 반송될 크기의 메일은 보내지 않음
+        print(f"❌ [이메일 발송 취소]: {e}")
+        return False
+    try:
+        send_email(msg, SMTP_SERVER, SMTP_PORT, EMAIL_ADDRESS, EMAIL_PASS)
         print(
-            f"📧 [이메일 발송] {RECEIVER_EMAIL}로 통합 HTML 알림 메일 및 첨부파일 전송 완료"
+            f"📧 [이메일 발송] {RECEIVER_EMAIL}로 통합 HTML 알림 메일 전송 완료 "
+            f"({len(msg.as_bytes()) / 1024:.0f}KB)"
         )
+        return True
     except Exception as e:
         print(f"❌ [이메일 발송 실패]: {e}")
+        return False
+
+
+def dispatch_notifications(channels, max_workers=None):
+    """
+    알림/업로드 채널을 동시에 실행하고 채널별 소요 시간과 결과를 보고합니다.
+    channels: {채널 이름: 인자 없는 함수}
+      (False 반환 또는 예외 발생 시 실패, NOTIFICATION_SKIPPED 반환 시 건너뜀으로 집계)
+    반환: {채널 이름: {"ok": bool, "skipped": bool, "seconds": float, "error": str 또는 None}}
+    """
+    def run(func):
+        start = systime.perf_counter()
+        skipped = False
+        try:
+            outcome, error = func(), None
+            skipped = outcome == NOTIFICATION_SKIPPED
+            ok = outcome is not False and not skipped
+        except Exception as e:
+            ok, error = False, str(e)
+        return {
+            "ok": ok,
+            "skipped": skipped,
+            "seconds": systime.perf_counter() - start,
+            "error": error,
+        }
+
+    report = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(channels) or 1) as executor:
+        futures = {name: executor.submit(run, func) for name, func in channels.items()}
+        for name, future in futures.items():
+            report[name] = future.result()
+
+    print("📬 알림 채널 결과:")
+    for name, result in report.items():
+        status = "⏭️" if result["skipped"] else "✅" if result["ok"] else "❌"
+        detail = f" ({result['error']})" if result["error"] else ""
+        detail += " (건너뜀)" if result["skipped"] else ""
+        print(f"   {status} {name}: {result['seconds']:.2f}초{detail}")
+    return report
 
 
 def cross_check_data_integrity(all_results):
@@ -1871,52 +2357,23 @@ def cross_check_data_integrity(all_results):
         },
     }
 
-    # 카테고리별 총합 계산 (기존 방식)
-    category_nan_total = 0
-    category_ot_total = 0
-    category_breakdown = {}
-
-    # 협력사별 총합 계산
-    partner_nan_total = 0
-    partner_ot_total = 0
-    partner_breakdown = {"mech": 0, "elec": 0}
+    # 카테고리별/협력사별 총합 (주문별 고정 크기 배열을 위치별로 합산)
+    category_nan = sum_counts(all_results, "nan_counts")
+    category_ot = sum_counts(all_results, "ot_counts")
+    category_total = sum_counts(all_results, "total_counts")
+    partner_nan = sum_counts(all_results, "partner_nan")
+    partner_ot = sum_counts(all_results, "partner_ot")
+
+    category_nan_total = sum(category_nan)
+    category_ot_total = sum(category_ot)
+    category_breakdown = {
+        category: {"nan": category_nan[index], "ot": category_ot[index]}
+        for index, category in enumerate(CATEGORIES)
+    }
 
-    for result in all_results:
-        (
-            order_no,
-            model_name,
-            mech_partner,
-            elec_partner,
-            occurrence_stats,
-            partner_stats,
-            _,
-            _,
-            _,
-        ) = result
-
-        # 카테고리별 통계 집계
-        for category, stats in occurrence_stats.items():
-            nan_count = stats.get("nan_count", 0)
-            ot_count = stats.get("ot_count", 0)
-
-            category_nan_total += nan_count
-            category_ot_total += ot_count
-
-            if category not in category_breakdown:
-                category_breakdown[category] = {"nan": 0, "ot": 0}
-            category_breakdown[category]["nan"] += nan_count
-            category_breakdown[category]["ot"] += ot_count
-
-        # 협력사별 통계 집계
-        for partner_type, stats in partner_stats.items():
-            nan_count = stats.get("nan_count", 0)
-            ot_count = stats.get("ot_count", 0)
-
-            partner_nan_total += nan_count
-            partner_ot_total += ot_count
-
-            if partner_type in partner_breakdown:
-                partner_breakdown[partner_type] += nan_count
+    partner_nan_total = sum(partner_nan)
+    partner_ot_total = sum(partner_ot)
+    partner_breakdown = dict(zip(PARTNER_TYPES, partner_nan))
 
     # 크로스 체크 1: 기구/전장 카테고리와 협력사 통계 비교
     mech_category_nan = category_breakdown.get("기구", {}).get("nan", 0)
@@ -1940,11 +2397,7 @@ def cross_check_data_integrity(all_results):
     for category in major_categories:
         if category in category_breakdown:
             nan_count = category_breakdown[category]["nan"]
-            total_count = sum(
-                stats.get("total_count", 0)
-                for result in all_results
-                for stats in [result[4].get(category, {})]
-            )
+            total_count = category_total[CATEGORY_INDEX[category]]
 
             if total_count > 0:
                 nan_ratio = (nan_count / total_count) * 100
@@ -1954,16 +2407,7 @@ def cross_check_data_integrity(all_results):
                     )
 
     # 크로스 체크 3: 전체 모델 수와 실제 처리된 데이터 수 비교
-    processed_models = len(
-        [
-            r
-            for r in all_results
-            if any(
-                stats.get("nan_count", 0) > 0 or stats.get("ot_count", 0) > 0
-                for stats in r[4].values()
-            )
-        ]
-    )
+    processed_models = sum(1 for result in all_results if result.has_issues())
 
     if processed_models != len(all_results):
         check_report["warnings"].append(
@@ -1984,7 +2428,7 @@ def cross_check_data_integrity(all_results):
 def send_nan_alert_to_kakao(all_results):
     if not all_results:
         print("⚠️ [알림] 전송할 데이터가 없습니다.")
-        return
+        return NOTIFICATION_SKIPPED
 
     # 기존 결과값들을 크로스 체크
     print("🔍 기존 결과값 크로스 체크 중...")
@@ -2003,12 +2447,8 @@ def send_nan_alert_to_kakao(all_results):
     total_ot = check_report["summary"]["total_ot_by_category"]
 
     # 기존 방식과 비교 (디버깅용)
-    original_nan = sum(
-        stats["nan_count"] for result in all_results for stats in result[4].values()
-    )
-    original_ot = sum(
-        stats["ot_count"] for result in all_results for stats in result[4].values()
-    )
+    original_nan = sum(sum(result.nan_counts) for result in all_results)
+    original_ot = sum(sum(result.ot_counts) for result in all_results)
 
     if total_nan != original_nan or total_ot != original_ot:
         print(
@@ -2045,7 +2485,7 @@ def send_nan_alert_to_kakao(all_results):
     access_token = refresh_access_token()
     if not access_token:
         print("❌ [카카오톡 발송 실패] 액세스 토큰이 없어 메시지 발송 불가.")
-        return
+        return False
 
     success = send_kakao_message(text, access_token)
 
@@ -2056,9 +2496,46 @@ def send_nan_alert_to_kakao(all_results):
             print(f"⚠️ 확인 필요 항목: {len(check_report['warnings'])}건")
     else:
         print("❌ 카카오톡 메시지 전송 실패")
+    return success
+
+
+def load_cached_kakao_token(margin_seconds=300):
+    """디스크에 캐시된 카카오 액세스 토큰 (만료 margin_seconds 전까지만 유효)"""
+    try:
+        with open(KAKAO_TOKEN_CACHE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("expires_at", 0) - margin_seconds > systime.time():
+        return cached.get("access_token")
+    return None
+
+
+def save_cached_kakao_token(token_info):
+    try:
+        os.makedirs(os.path.dirname(KAKAO_TOKEN_CACHE) or ".", exist_ok=True)
+        cached = {
+            "access_token": token_info["access_token"],
+            "expires_at": systime.time() + int(token_info.get("expires_in", 0)),
+        }
+        # 토큰 파일은 소유자만 읽을 수 있도록 저장
+        fd = os.open(KAKAO_TOKEN_CACHE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cached, f)
+    except OSError as e:
+        print(f"⚠️ 카카오 토큰 캐시 저장 실패: {e}")
 
 
 def refresh_access_token():
+    """캐시된 토큰이 유효하면 재사용하고, 없거나 만료 임박이면 refresh_token으로 갱신합니다."""
+    cached_token = load_cached_kakao_token()
+    if cached_token:
+        print("✅ 캐시된 카카오 액세스 토큰 사용 (갱신 생략)")
+        return cached_token
+    if not REST_API_KEY or not REFRESH_TOKEN:
+        print("⚠️ 카카오 REST API 키 또는 리프레시 토큰이 없어 토큰 갱신을 건너뜁니다.")
+        return None
+
     url = "https://kauth.kakao.com/oauth/token"
     data = {
         "grant_type": "refresh_token",
@@ -2066,12 +2543,15 @@ def refresh_access_token():
         "refresh_token": REFRESH_TOKEN,
     }
     try:
-        response = requests.post(url, data=data)
+        response = http_session.post(url, data=data, timeout=10)
         response.raise_for_status()
         token_info = response.json()
         if "access_token" in token_info:
             new_access_token = token_info["access_token"]
-            print(f"✅ 새 액세스 토큰: {new_access_token}")
+            print(
+                f"✅ 새 액세스 토큰 발급 (유효 {int(token_info.get('expires_in', 0)) // 60}분)"
+            )
+            save_cached_kakao_token(token_info)
             return new_access_token
         else:
             print(f"❌ 토큰 갱신 실패: {token_info}")
@@ -2104,7 +2584,7 @@ def send_kakao_message(text, access_token=None):
         )
     }
     try:
-        response = requests.post(url, headers=headers, data=data)
+        response = http_session.post(url, headers=headers, data=data, timeout=10)
         response.raise_for_status()
         print(
             f"✅ 카카오톡 메시지 전송 성공! (시간: {datetime.now().strftime('%H:%M:%S')})"
@@ -2115,79 +2595,139 @@ def send_kakao_message(text, access_token=None):
         return False
 
 
-def upload_to_github(file_path):
+@traced("upload")
+def publish_to_github(file_paths):
+    """
+    여러 파일을 GitHub public/ 폴더에 한 번의 커밋으로 업로드합니다.
+    로컬 blob SHA가 원격과 같은 파일은 건너뛰며, 변경이 없으면 커밋하지 않습니다.
+    """
     GITHUB_USERNAME = os.getenv("GITHUB_USERNAME", "isolhsolfafa")
     GITHUB_REPO = os.getenv("GITHUB_REPO", "gst-factory")
     GITHUB_BRANCH = os.getenv("GITHUB_BRANCH", "main")
     GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
     if not GITHUB_TOKEN:
         print("❌ [오류] GITHUB_TOKEN 환경변수가 설정되지 않았습니다.")
+        return False
+    file_paths = [path for path in file_paths if path and os.path.exists(path)]
+    if not file_paths:
+        return None
+    try:
+        return publish_files(
+            file_paths,
+            GITHUB_USERNAME,
+            GITHUB_REPO,
+            GITHUB_BRANCH,
+            GITHUB_TOKEN,
+            session=http_session,
+        )
+    except Exception as e:
+        print(f"❌ GitHub 업로드 실패! {e}")
+        return False
+
+
+def upload_to_github(file_path):
+    return publish_to_github([file_path])
+
+
+def _spreadsheet_id_from_url(spreadsheet_url):
+    match = re.search(r"/d/([a-zA-Z0-9-_]+)", spreadsheet_url or "")
+    return match.group(1) if match else None
+
+
+def prefetch_mech_start_dates(spreadsheet_ids, sheets_service):
+    """
+    아직 수집되지 않은 기구 시작일(정보판!B6)을 한 번의 배치 HTTP 요청으로 조회합니다.
+    (정보판 조회 시 이미 수집된 ID는 건너뜀)
+    """
+    missing = [
+        sid
+        for sid in dict.fromkeys(spreadsheet_ids)
+        if sid and sid not in mech_start_dates
+    ]
+    if not missing:
         return
-    with open(file_path, "rb") as file:
-        content = base64.b64encode(file.read()).decode("utf-8")
-    file_name = os.path.basename(file_path)
-    url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/contents/public/{file_name}"
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json",
-    }
-    response = requests.get(url, headers=headers)
-    sha = response.json().get("sha", "")
-    data = {
-        "message": f"자동 업로드: {file_name}",
-        "content": content,
-        "branch": GITHUB_BRANCH,
-    }
-    if sha:
-        data["sha"] = sha
-    response = requests.put(url, headers=headers, json=data)
-    if response.status_code in [200, 201]:
-        print(f"✅ {file_name} GitHub 업로드 성공!")
-    else:
-        print(f"❌ {file_name} GitHub 업로드 실패! {response.text}")
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            print(f"❌ [오류] 기구 시작일 가져오기 실패 ({request_id}): {exception}")
+            mech_start_dates[request_id] = pd.NaT
+        else:
+            mech_start_dates[request_id] = _parse_mech_start(response)
+
+    # 배치 요청은 최대 100건까지 묶을 수 있음
+    for start in range(0, len(missing), 100):
+        batch = sheets_service.new_batch_http_request(callback=callback)
+        for sid in missing[start : start + 100]:
+            batch.add(
+                sheets_service.spreadsheets()
+                .values()
+                .get(
+                    spreadsheetId=sid,
+                    range="정보판!B6",
+                    valueRenderOption="FORMATTED_VALUE",
+                ),
+                request_id=sid,
+            )
+        api_call_with_backoff(batch.execute)
 
 
-def get_mech_start_date(spreadsheet_url, sheets_service):
+def sort_all_results_by_mech_start(all_results, sheets_service):
+    """기구 시작일 기준 정렬 (누락분만 한 번에 조회한 뒤 메모리에서 정렬, 날짜 없는 항목은 뒤로)"""
+    ids = [_spreadsheet_id_from_url(entry.spreadsheet_url) for entry in all_results]
     try:
-        match = re.search(r"/d/([a-zA-Z0-9-_]+)", spreadsheet_url)
-        if not match:
-            return pd.NaT
-        spreadsheet_id = match.group(1)
-        result = api_call_with_backoff(
-            sheets_service.spreadsheets().values().get,
-            spreadsheetId=spreadsheet_id,
-            range="정보판!B6",
-            valueRenderOption="FORMATTED_VALUE",
-        ).execute()
-        raw_date = result.get("values", [[]])[0][0]
-        return pd.to_datetime(raw_date, errors="coerce")
+        prefetch_mech_start_dates(ids, sheets_service)
     except Exception as e:
         print(f"❌ [오류] 기구 시작일 가져오기 실패: {e}")
-        return pd.NaT
 
+    def extract_start_date(item):
+        start = mech_start_dates.get(item[0], pd.NaT)
+        return (pd.isna(start), start if not pd.isna(start) else pd.Timestamp.min)
+
+    return [
+        entry for _, entry in sorted(zip(ids, all_results), key=extract_start_date)
+    ]
 
-def sort_all_results_by_mech_start(all_results, sheets_service):
-    def extract_start_date(entry):
-        spreadsheet_url = entry[7]
-        return get_mech_start_date(spreadsheet_url, sheets_service)
 
-    return sorted(all_results, key=extract_start_date)
+def limited_spreadsheet_ids():
+    """LIMIT 환경변수 적용 대상 ID 목록 (0 이하이면 전체)"""
+    limit = int(os.getenv("LIMIT", "1"))
+    return linked_spreadsheet_ids[:limit] if limit > 0 else linked_spreadsheet_ids
 
 
 def collect_and_process_data():
-    limit = int(os.getenv("LIMIT", "1"))
     batch_size = 10
     if not linked_spreadsheet_ids:
         print("🚨 [오류] 추출된 스프레드시트 ID가 없습니다.")
         return []
-    target_ids = linked_spreadsheet_ids[:limit] if limit > 0 else linked_spreadsheet_ids
+    target_ids = limited_spreadsheet_ids()
     print(
         f"총 {len(linked_spreadsheet_ids)}개 중 처음 {len(target_ids)}개만 처리합니다."
     )
-    sheet_values = fetch_entire_sheet_values(
-        spreadsheet_id, f"'{TARGET_SHEET_NAME}'!A:AA"
-    )
+    if SHARDED:
+        target_ids = select_shard(target_ids, SHARD_INDEX, SHARD_COUNT)
+        print(f"🧩 이 샤드({SHARD_INDEX}/{SHARD_COUNT})에 배정된 주문: {len(target_ids)}개")
+    sheet_values = target_sheet_values
     all_results = []
+
+    # 체크포인트 저널: 이전 시도에서 끝난 주문은 기록된 결과를 재사용
+    # (샤드 실행은 부분 결과 파일이 저널 역할, RUN_ID가 없으면 매번 새로 작성)
+    if SHARDED:
+        journal = partial_path(SHARD_DIR, SHARD_INDEX, SHARD_COUNT)
+        if not RUN_ID and os.path.exists(journal):
+            os.remove(journal)
+        # 배정된 주문이 없어도 병합 단계가 샤드 완료를 확인할 수 있도록 파일 생성
+        os.makedirs(SHARD_DIR, exist_ok=True)
+        open(journal, "a", encoding="utf-8").close()
+    else:
+        journal = journal_path(JOURNAL_DIR, RUN_ID) if RUN_ID else None
+    completed = load_journal(journal) if journal else {}
+    if completed:
+        remaining = sum(1 for sid in target_ids if sid not in completed)
+        print(
+            f"♻️ 실행 ID {RUN_ID}의 저널에서 완료된 주문 {len(target_ids) - remaining}건을 불러옵니다. "
+            f"(남은 주문 {remaining}건)"
+        )
+    revalidate_spreadsheet_metadata([sid for sid in target_ids if sid not in completed])
     current_weekday = datetime.today().weekday()
 
     # 그래프 생성 옵션 확인 (환경변수에서 제어)
@@ -2221,267 +2761,264 @@ def collect_and_process_data():
     )
 
     def process_batch(batch_ids):
-        import time
-
         for idx, target_spreadsheet_id in enumerate(batch_ids, 1):
-            try:
-                print(f"--- 🚀 처리 중: {idx}/{len(batch_ids)} (Batch) ---")
-
-                # Rate Limit 방지를 위한 지연 (첫 번째가 아닌 경우)
-                if idx > 1:
-                    print("⏱️ Rate Limit 방지를 위해 3초 대기...")
-                    time.sleep(3)
-
-                df = fetch_data_from_sheets(target_spreadsheet_id, WORKSHEET_RANGE)
-                product_name, mech_partner, elec_partner = fetch_info_board_extended(
-                    target_spreadsheet_id
-                )
-                print(f"📌 Processing Model: {product_name}")
-                task_total_time = process_data(df, product_name)
-                task_total_time["작업 분류"] = task_total_time["내용"].apply(
-                    lambda x: classify_task(x, product_name)
-                )
-                order_no = get_spreadsheet_title(target_spreadsheet_id)
-                print(f"📌 Processing Order No: {order_no}")
-                spreadsheet_url = f"https://docs.google.com/spreadsheets/d/{target_spreadsheet_id}/edit"
-                update_spreadsheet_with_product_name(
-                    spreadsheet_id, order_no, product_name, sheet_values
-                )
-                if generate_graphs_today:
-                    # 그래프 파일들을 먼저 생성
-                    working_hours_file = generate_and_save_graph(
-                        task_total_time, order_no, product_name
+            if target_spreadsheet_id in completed:
+                resumed = completed[target_spreadsheet_id]
+                if resumed is not None:
+                    all_results.append(resumed)
+                continue
+            # 주문 단위 span: 하위 API 호출/렌더링/업로드 span이 order_no, model을 물려받음
+            with span("order", "order", spreadsheet_id=target_spreadsheet_id):
+                try:
+                    print(f"--- 🚀 처리 중: {idx}/{len(batch_ids)} (Batch) ---")
+
+                    # Rate Limit 방지를 위한 지연 (첫 번째가 아닌 경우)
+                    if idx > 1:
+                        print("⏱️ Rate Limit 방지를 위해 3초 대기...")
+                        pace(3, "rate_limit")
+
+                    product_name, mech_partner, elec_partner = fetch_info_board_extended(
+                        target_spreadsheet_id
                     )
-                    legend_file = generate_legend_chart(
-                        task_total_time, order_no, product_name
+                    # 큰 WORKSHEET은 행 묶음 단위로 받아 집계 재료만 누적 (원본 행은 묶음마다 버림)
+                    worksheet = WorksheetAggregate(product_name)
+                    for chunk in iter_worksheet_frames(target_spreadsheet_id, product_name):
+                        worksheet.add(chunk)
+                    print(f"📌 Processing Model: {product_name}")
+                    set_attributes(model=product_name)
+                    task_total_time = worksheet.task_total_time()
+                    task_total_time["작업 분류"] = task_total_time["내용"].apply(
+                        lambda x: classify_task(x, product_name)
                     )
-                    wd_file = generate_and_save_graph_wd(
-                        task_total_time, df, order_no, product_name
+                    order_no = get_spreadsheet_title(target_spreadsheet_id)
+                    print(f"📌 Processing Order No: {order_no}")
+                    set_attributes(order_no=order_no)
+                    spreadsheet_url = f"https://docs.google.com/spreadsheets/d/{target_spreadsheet_id}/edit"
+                    update_spreadsheet_with_product_name(
+                        spreadsheet_id, order_no, product_name, sheet_values
                     )
-
-                    # Drive에 업로드하고 링크 업데이트
-                    links = {
-                        "working_hours": update_spreadsheet_with_working_hours(
-                            spreadsheet_id,
-                            order_no,
-                            upload_to_drive(working_hours_file),
-                            sheet_values,
-                        ),
-                        "legend": update_spreadsheet_with_legend(
-                            spreadsheet_id,
-                            order_no,
-                            upload_to_drive(legend_file),
-                            sheet_values,
-                        ),
-                        "wd": update_spreadsheet_with_wd_graph(
-                            spreadsheet_id,
-                            order_no,
-                            upload_to_drive(wd_file),
-                            sheet_values,
-                        ),
-                    }
-
-                    # 임시 파일 정리
-                    for temp_file in [working_hours_file, legend_file, wd_file]:
-                        try:
-                            if temp_file and os.path.exists(temp_file):
-                                os.remove(temp_file)
-                                logger.info(f"임시 파일 삭제: {temp_file}")
-                        except Exception as e:
-                            logger.warning(f"임시 파일 삭제 실패 {temp_file}: {e}")
-                else:
-                    links = {"working_hours": None, "legend": None, "wd": None}
-                    print("⛔ 그래프 생성 및 링크 업데이트 생략됨")
-                progress_summary = calculate_progress_by_category(df, product_name)
-                total_time_decimal = task_total_time["워킹데이 소요 시간"].sum()
-                total_time_formatted = format_hours(total_time_decimal)
-                update_spreadsheet_with_total_time(
-                    spreadsheet_id, order_no, total_time_formatted, sheet_values
-                )
-                print(
-                    f"🎯 총 소요시간 {total_time_formatted}이 W열에 업데이트되었습니다."
-                )
-                mechanical_time_decimal = task_total_time[
-                    task_total_time["작업 분류"] == "기구"
-                ]["워킹데이 소요 시간"].sum()
-                electrical_time_decimal = task_total_time[
-                    task_total_time["작업 분류"] == "전장"
-                ]["워킹데이 소요 시간"].sum()
-                inspection_time_decimal = task_total_time[
-                    task_total_time["작업 분류"] == "검사"
-                ]["워킹데이 소요 시간"].sum()
-                finishing_time_decimal = task_total_time[
-                    task_total_time["작업 분류"] == "마무리"
-                ]["워킹데이 소요 시간"].sum()
-                update_spreadsheet_with_mechanical_time(
-                    spreadsheet_id,
-                    order_no,
-                    format_hours(mechanical_time_decimal),
-                    sheet_values,
-                )
-                update_spreadsheet_with_electrical_time(
-                    spreadsheet_id,
-                    order_no,
-                    format_hours(electrical_time_decimal),
-                    sheet_values,
-                )
-                update_spreadsheet_with_inspection_time(
-                    spreadsheet_id,
-                    order_no,
-                    format_hours(inspection_time_decimal),
-                    sheet_values,
-                )
-                update_spreadsheet_with_finishing_time(
-                    spreadsheet_id,
-                    order_no,
-                    format_hours(finishing_time_decimal),
-                    sheet_values,
-                )
-                print(f"🎯 모델 '{order_no}'의 작업별 소요시간이 업데이트되었습니다.")
-                avg_mapping = get_avg_time_mapping(product_name)
-                occurrence_stats, partner_stats = compute_occurrence_rates(
-                    df,
-                    task_total_time,
-                    avg_mapping,
-                    product_name,
-                    tolerance=2,
-                    mech_partner=mech_partner,
-                    elec_partner=elec_partner,
-                )
-                if any(
-                    stats["nan_count"] > 0 or stats["ot_count"] > 0
-                    for stats in occurrence_stats.values()
-                ):
-                    all_results.append(
-                        (
-                            order_no,
-                            product_name,
-                            mech_partner,
-                            elec_partner,
-                            occurrence_stats,
-                            partner_stats,
-                            links,
-                            spreadsheet_url,
-                            progress_summary,
+                    if generate_graphs_today:
+                        # 그래프 파일들을 먼저 생성
+                        working_hours_file = generate_and_save_graph(
+                            task_total_time, order_no, product_name
+                        )
+                        legend_file = generate_legend_chart(
+                            task_total_time, order_no, product_name
+                        )
+                        wd_file = generate_and_save_graph_wd(
+                            task_total_time, worksheet.complete_rows(), order_no, product_name
                         )
+
+                        # Drive에 업로드하고 링크 업데이트
+                        links = {
+                            "working_hours": update_spreadsheet_with_working_hours(
+                                spreadsheet_id,
+                                order_no,
+                                upload_to_drive(working_hours_file),
+                                sheet_values,
+                            ),
+                            "legend": update_spreadsheet_with_legend(
+                                spreadsheet_id,
+                                order_no,
+                                upload_to_drive(legend_file),
+                                sheet_values,
+                            ),
+                            "wd": update_spreadsheet_with_wd_graph(
+                                spreadsheet_id,
+                                order_no,
+                                upload_to_drive(wd_file),
+                                sheet_values,
+                            ),
+                        }
+
+                        # 임시 파일 정리
+                        for temp_file in [working_hours_file, legend_file, wd_file]:
+                            try:
+                                if temp_file and os.path.exists(temp_file):
+                                    os.remove(temp_file)
+                                    logger.info(f"임시 파일 삭제: {temp_file}")
+                            except Exception as e:
+                                logger.warning(f"임시 파일 삭제 실패 {temp_file}: {e}")
+                    else:
+                        links = {"working_hours": None, "legend": None, "wd": None}
+                        print("⛔ 그래프 생성 및 링크 업데이트 생략됨")
+                    progress_summary = worksheet.progress_summary()
+                    total_time_decimal = task_total_time["워킹데이 소요 시간"].sum()
+                    total_time_formatted = format_hours(total_time_decimal)
+                    update_spreadsheet_with_total_time(
+                        spreadsheet_id, order_no, total_time_formatted, sheet_values
                     )
-                else:
-                    print("✅ [알림] 모든 작업이 정상 범위 내에 있습니다.")
-                print(f"✅ 모델 '{order_no}' 처리 완료.\n")
-                systime.sleep(1)
-            except Exception as e:
-                print(
-                    f"❌ [오류 발생: 스프레드시트 ID {target_spreadsheet_id}] -> {e}\n"
-                )
-                systime.sleep(5)
+                    print(
+                        f"🎯 총 소요시간 {total_time_formatted}이 W열에 업데이트되었습니다."
+                    )
+                    mechanical_time_decimal = task_total_time[
+                        task_total_time["작업 분류"] == "기구"
+                    ]["워킹데이 소요 시간"].sum()
+                    electrical_time_decimal = task_total_time[
+                        task_total_time["작업 분류"] == "전장"
+                    ]["워킹데이 소요 시간"].sum()
+                    inspection_time_decimal = task_total_time[
+                        task_total_time["작업 분류"] == "검사"
+                    ]["워킹데이 소요 시간"].sum()
+                    finishing_time_decimal = task_total_time[
+                        task_total_time["작업 분류"] == "마무리"
+                    ]["워킹데이 소요 시간"].sum()
+                    update_spreadsheet_with_mechanical_time(
+                        spreadsheet_id,
+                        order_no,
+                        format_hours(mechanical_time_decimal),
+                        sheet_values,
+                    )
+                    update_spreadsheet_with_electrical_time(
+                        spreadsheet_id,
+                        order_no,
+                        format_hours(electrical_time_decimal),
+                        sheet_values,
+                    )
+                    update_spreadsheet_with_inspection_time(
+                        spreadsheet_id,
+                        order_no,
+                        format_hours(inspection_time_decimal),
+                        sheet_values,
+                    )
+                    update_spreadsheet_with_finishing_time(
+                        spreadsheet_id,
+                        order_no,
+                        format_hours(finishing_time_decimal),
+                        sheet_values,
+                    )
+                    print(f"🎯 모델 '{order_no}'의 작업별 소요시간이 업데이트되었습니다.")
+                    avg_mapping = get_avg_time_mapping(product_name)
+                    occurrence_stats, partner_stats = worksheet.occurrence_rates(
+                        task_total_time, avg_mapping, tolerance=2
+                    )
+                    order_result = OrderResult.from_stats(
+                        order_no,
+                        product_name,
+                        mech_partner,
+                        elec_partner,
+                        occurrence_stats,
+                        partner_stats,
+                        links,
+                        spreadsheet_url,
+                        progress_summary,
+                    )
+                    if order_result.has_issues():
+                        all_results.append(order_result)
+                    else:
+                        order_result = None
+                        print("✅ [알림] 모든 작업이 정상 범위 내에 있습니다.")
+                    if journal:
+                        append_journal(journal, target_spreadsheet_id, order_result)
+                    print(f"✅ 모델 '{order_no}' 처리 완료.\n")
+                    pace(1, "order_gap")
+                except Exception as e:
+                    print(
+                        f"❌ [오류 발생: 스프레드시트 ID {target_spreadsheet_id}] -> {e}\n"
+                    )
+                    pace(5, "error_cooldown")
 
     iterator = iter(target_ids)
     while batch := list(islice(iterator, batch_size)):
         process_batch(batch)
-        systime.sleep(10)
+        if any(sid not in completed for sid in batch):
+            pace(10, "batch_gap")
+    # 원장에서 빠진 주문은 캐시에서 정리
+    for sid in set(spreadsheet_metadata) - set(linked_spreadsheet_ids):
+        del spreadsheet_metadata[sid]
+    save_metadata(SHEET_CACHE_DIR, spreadsheet_metadata)
     return all_results
 
 
-def save_results_to_json(all_results, drive_service):
+def build_results_payload(all_results):
     """
-    주요 처리 결과를 JSON 파일로 저장하고 'JSON 데이터 저장용' 구글 드라이브에 업로드합니다.
-    (데이터 -> JSON)
-    업로드된 파일의 Google Drive ID를 반환합니다.
+    이번 실행 결과를 nan_ot_results JSON 구조로 변환합니다. (데이터 -> JSON 구조)
+    반환: {"name": Drive 파일명, "base_path": 확장자 제외 로컬 경로, "data": JSON 데이터}
+    히트맵 단계는 이 값을 메모리에서 바로 받아 Drive 재다운로드 없이 사용합니다.
     """
-    if not all_results:
-        print("ℹ️ 처리할 결과가 없어 JSON 파일을 생성하지 않습니다.")
-        return None
-
     now_kst = datetime.now(pytz.timezone("Asia/Seoul"))
     execution_time_str = now_kst.strftime("%Y%m%d_%H%M%S")
     execution_time_for_json = execution_time_str  # 기존 형식 유지: "20250618_231207"
     weekday_kor = ["월", "화", "수", "목", "금", "토", "일"][now_kst.weekday()]
     session = now_kst.weekday() + 1
-    filename = (
-        f"output/nan_ot_results_{execution_time_str}_{weekday_kor}_{session}회차.json"
-    )
+    base_path = f"output/nan_ot_results_{execution_time_str}_{weekday_kor}_{session}회차"
     os.makedirs("output", exist_ok=True)
 
     results_list = []
     for res in all_results:
-        (
-            order_no,
-            model_name,
-            mech_partner,
-            elec_partner,
-            occurrence_stats,
-            partner_stats,
-            links,
-            spreadsheet_url,
-            progress_summary,
-        ) = res
-
-        total_tasks = sum(
-            stats.get("total_count", 0) for stats in occurrence_stats.values()
-        )
-
-        def calc_ratio(cat_stats):
-            total_count = cat_stats.get("total_count", 0)
-            if total_count == 0:
-                return 0.0, 0.0
-            nan_ratio = (cat_stats.get("nan_count", 0) / total_count) * 100
-            ot_ratio = (cat_stats.get("ot_count", 0) / total_count) * 100
-            return nan_ratio, ot_ratio
-
         ratios = {}
-        if "기구" in occurrence_stats:
-            ratios["mech_nan_ratio"], ratios["mech_ot_ratio"] = calc_ratio(
-                occurrence_stats["기구"]
-            )
-        if "전장" in occurrence_stats:
-            ratios["elec_nan_ratio"], ratios["elec_ot_ratio"] = calc_ratio(
-                occurrence_stats["전장"]
-            )
-        if "TMS_반제품" in occurrence_stats:
-            ratios["tms_nan_ratio"], ratios["tms_ot_ratio"] = calc_ratio(
-                occurrence_stats["TMS_반제품"]
-            )
-
-        # 기존 JSON 구조에 맞게 occurrence_stats에서 세부 정보 제거
-        cleaned_occurrence_stats = {}
-        for category, stats in occurrence_stats.items():
-            cleaned_occurrence_stats[category] = {
-                "total_count": stats.get("total_count", 0),
-                "nan_count": stats.get("nan_count", 0),
-                "ot_count": stats.get("ot_count", 0),
-            }
-
-        # 기존 JSON 구조에 맞게 links를 order_href 하나로 통합
-        legacy_links = {"order_href": spreadsheet_url}
+        for prefix, index in (("mech", MECH), ("elec", ELEC), ("tms", TMS)):
+            total_count = res.total_counts[index]
+            if total_count == 0:
+                ratios[f"{prefix}_nan_ratio"], ratios[f"{prefix}_ot_ratio"] = 0.0, 0.0
+            else:
+                ratios[f"{prefix}_nan_ratio"] = res.nan_counts[index] / total_count * 100
+                ratios[f"{prefix}_ot_ratio"] = res.ot_counts[index] / total_count * 100
 
         results_list.append(
             {
-                "order_no": order_no,
-                "model_name": model_name,
-                "mech_partner": mech_partner,
-                "elec_partner": elec_partner,
-                "total_tasks": total_tasks,
+                "order_no": res.order_no,
+                "model_name": res.model_name,
+                "mech_partner": res.mech_partner,
+                "elec_partner": res.elec_partner,
+                "total_tasks": res.total_tasks,
                 "ratios": ratios,
-                "links": legacy_links,  # 기존 구조 사용
-                "occurrence_stats": cleaned_occurrence_stats,  # 세부 정보 제거
-                "partner_stats": partner_stats,
+                # 기존 JSON 구조에 맞게 links를 order_href 하나로 통합
+                "links": {"order_href": res.spreadsheet_url},
+                # 기존 JSON 구조: 카테고리별 건수만 (작업 상세 제외)
+                "occurrence_stats": {
+                    category: {
+                        "total_count": res.total_counts[index],
+                        "nan_count": res.nan_counts[index],
+                        "ot_count": res.ot_counts[index],
+                    }
+                    for index, category in enumerate(CATEGORIES)
+                },
+                "partner_stats": {
+                    partner: {
+                        "nan_count": res.partner_nan[index],
+                        "ot_count": res.partner_ot[index],
+                    }
+                    for index, partner in enumerate(PARTNER_TYPES)
+                },
                 "spreadsheet_url": "",  # 기존 구조에서는 빈 문자열
                 # progress_summary 제거 (기존 구조에 없음)
             }
         )
 
     json_data = {"execution_time": execution_time_for_json, "results": results_list}
+    return {
+        "name": os.path.basename(base_path) + RESULTS_FORMATS[RESULTS_FORMAT][0],
+        "base_path": base_path,
+        "data": json_data,
+    }
+
+
+@traced("upload")
+def save_results_to_json(all_results, drive_service, payload=None):
+    """
+    주요 처리 결과를 JSON 파일로 저장하고 'JSON 데이터 저장용' 구글 드라이브에 업로드합니다.
+    (데이터 -> JSON, RESULTS_FORMAT=ndjson.gz이면 gzip 압축 NDJSON)
+    payload: build_results_payload 결과 (없으면 all_results로 새로 생성)
+    업로드된 파일의 Google Drive ID를 반환합니다.
+    """
+    if not all_results:
+        print("ℹ️ 처리할 결과가 없어 JSON 파일을 생성하지 않습니다.")
+        return None
 
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(json_data, f, ensure_ascii=False, indent=2, default=str)
-    print(f"✅ JSON 저장 완료: {filename}")
+    if payload is None:
+        payload = build_results_payload(all_results)
+    filename, mime_type = write_results_file(
+        payload["base_path"], payload["data"], RESULTS_FORMAT
+    )
+    print(f"✅ JSON 저장 완료: {filename} ({os.path.getsize(filename):,} bytes)")
 
     # 업로드 시 JSON 전용 폴더 ID 사용
     file_metadata = {
         "name": os.path.basename(filename),
         "parents": [JSON_DRIVE_FOLDER_ID],
     }
-    media = MediaFileUpload(filename, mimetype="application/json")
+    media = MediaFileUpload(filename, mimetype=mime_type)
     uploaded = (
         drive_service.files()
         .create(body=file_metadata, media_body=media, fields="id, name")
@@ -2494,502 +3031,19 @@ def save_results_to_json(all_results, drive_service):
     return uploaded.get("id")
 
 
-def load_json_files_from_drive(
-    drive_service, period="weekly", week_number=None, target_day=None
-):
-    """
-    Google Drive 폴더 내 JSON 파일 로드
-    period: "weekly" (주간), "monthly" (월간)
-    week_number: 특정 주차 필터링 (주간용)
-    target_day: 특정 요일 파일만 로드 ("friday", "sunday", None=모든 요일, "mixed"=주차별 혼합)
-    """
-
-    # 월간 히트맵용 스마트 target_day 자동 설정 (효율성 개선)
-    if period == "monthly" and target_day is None:
-        target_day = "mixed"  # 32주 이전=금요일, 33주 이후=일요일 혼합
-        print("📊 월간 히트맵: 32주 이전=금요일, 33주 이후=일요일 JSON 혼합 로드")
-
-    query = f"'{JSON_DRIVE_FOLDER_ID}' in parents and name contains 'nan_ot_results_'"
-    if target_day == "friday":
-        query += " and name contains '_금_'"
-    elif target_day == "sunday":
-        query += " and name contains '_일_'"
-    elif target_day == "mixed":
-        # 금요일과 일요일 모두 포함 (나중에 주차별로 필터링)
-        query += " and (name contains '_금_' or name contains '_일_')"
-    # target_day가 None이면 모든 요일 포함
-
-    # 최대 3번까지 재시도 (Drive 파일 처리 지연 대응)
-    for attempt in range(3):
-        files = (
-            drive_service.files()
-            .list(q=query, fields="files(id, name)")
-            .execute()
-            .get("files", [])
-        )
-
-        if files:
-            break
-
-        if attempt < 2:  # 마지막 시도가 아닌 경우에만 대기
-            print(f"⏳ 파일을 찾을 수 없습니다. 3초 후 재시도... ({attempt + 1}/3)")
-            systime.sleep(3)
-        else:
-            print("⚠️ 로드할 JSON 파일이 없습니다.")
-            return []
-
-    data_list = []
-
-    for file in files:
-        file_name = file["name"]
-        match = re.search(r"nan_ot_results_(\d{8})", file_name)
-        if not match:
-            continue
-
-        file_date = match.group(1)  # YYYYMMDD
-        try:
-            file_datetime = pd.to_datetime(file_date, format="%Y%m%d")
-            file_week = file_datetime.isocalendar().week
-        except ValueError:
-            continue
-
-        # week_number 필터링
-        if week_number is not None and file_week != week_number:
-            continue
-
-        # mixed 모드에서 주차별 요일 필터링 (32주 이전=금요일, 33주 이후=일요일)
-        if target_day == "mixed":
-            if file_week < 33:
-                # 32주 이전: 금요일만
-                if "_금_" not in file_name:
-                    continue
-            else:
-                # 33주 이후: 일요일만
-                if "_일_" not in file_name:
-                    continue
-
-        print(f"📁 JSON 파일 로드 중: {file_name}")
-        file_id = file["id"]
-        request = drive_service.files().get_media(fileId=file_id)
-        content = request.execute().decode("utf-8")
-        data = json.loads(content)
-        for result in data["results"]:
-            result["execution_time"] = data["execution_time"]
-        data_list.extend(data["results"])
-
-    print(f"📂 총 {len(data_list)}개의 로그 데이터를 로드했습니다.")
-    return data_list
-
-
-def ratio_calc(stats):
-    """NaN 비율 계산"""
-    total = stats.get("total_count", 0)
-    nan_count = stats.get("nan_count", 0)
-    return (nan_count / total * 100) if total > 0 else 0
-
-
-def generate_heatmap(
-    drive_service,
-    period="weekly",
-    group_by="partner",
-    week_number=None,
-    target_day=None,
-):
-    """
-    히트맵 생성 함수
-    period: "weekly" (주간), "monthly" (월간)
-    group_by: "partner" (협력사), "model" (모델)
-    target_day: 월간 히트맵용 특정 요일 ("friday", "sunday", None=auto)
-    """
-    # 폰트 설정 추가
-    global font_prop
-    try:
-        # font_prop가 정의되어 있는지 확인
-        font_prop
-    except NameError:
-        # font_prop가 정의되지 않은 경우 기본값으로 설정
-        font_prop = None
-    # 데이터 로드 (월간 히트맵의 경우 load_json_files_from_drive에서 스마트 target_day 자동 설정)
-    all_data = load_json_files_from_drive(
-        drive_service, period, week_number, target_day
-    )
-
-    if not all_data:
-        print("⚠️ 데이터를 로드할 수 없습니다.")
-        return None
-
-    # DataFrame 생성 및 데이터 변환
-    df_data = []
-    for d in all_data:
-        execution_time = d["execution_time"]
-        occurrence_stats = d.get("occurrence_stats", {})
-        mech_partner = d.get("mech_partner", "").strip().upper()
-        elec_partner = d.get("elec_partner", "").strip().upper()
-
-        entry = {
-            "date": execution_time,
-            "model_name": d["model_name"],
-            "mech_partner": mech_partner,
-            "elec_partner": elec_partner,
-            "bat_nan_ratio": 0.0,
-            "fni_nan_ratio": 0.0,
-            "tms_m_nan_ratio": 0.0,
-            "cna_nan_ratio": 0.0,
-            "pns_nan_ratio": 0.0,
-            "tms_e_nan_ratio": 0.0,
-            "tms_semi_nan_ratio": 0.0,
-        }
-
-        # 기구 협력사별 NaN 비율 계산
-        if mech_partner == "BAT":
-            target = occurrence_stats.get("기구", {})
-            entry["bat_nan_ratio"] = ratio_calc(target)
-        elif mech_partner == "FNI":
-            target = occurrence_stats.get("기구", {})
-            entry["fni_nan_ratio"] = ratio_calc(target)
-        elif mech_partner == "TMS":
-            target = occurrence_stats.get("기구", {})
-            entry["tms_m_nan_ratio"] = ratio_calc(target)
-
-        # 전장 협력사별 NaN 비율 계산
-        if elec_partner == "C&A":
-            target = occurrence_stats.get("전장", {})
-            entry["cna_nan_ratio"] = ratio_calc(target)
-        elif elec_partner == "P&S":
-            target = occurrence_stats.get("전장", {})
-            entry["pns_nan_ratio"] = ratio_calc(target)
-        elif elec_partner == "TMS":
-            target = occurrence_stats.get("전장", {})
-            entry["tms_e_nan_ratio"] = ratio_calc(target)
-
-        # TMS 반제품 NaN 비율
-        tms_semi_stats = occurrence_stats.get("TMS_반제품", {})
-        entry["tms_semi_nan_ratio"] = ratio_calc(tms_semi_stats)
-
-        df_data.append(entry)
-
-    df = pd.DataFrame(df_data)
-    df["date"] = pd.to_datetime(df["date"], format="%Y%m%d_%H%M%S", errors="coerce")
-    df = df.dropna(subset=["date"])
-
-    # 협력사 카테고리 정의
-    partner_categories = [
-        ("bat_nan_ratio", "BAT", "blue"),
-        ("fni_nan_ratio", "FNI", "cyan"),
-        ("tms_m_nan_ratio", "TMS(m)", "orange"),
-        ("cna_nan_ratio", "C&A", "green"),
-        ("pns_nan_ratio", "P&S", "red"),
-        ("tms_e_nan_ratio", "TMS(e)", "purple"),
-        ("tms_semi_nan_ratio", "TMS_반제품", "magenta"),
-    ]
-
-    # 주간/월간별 그룹핑
-    if period == "weekly":
-        df = df.sort_values("date")
-        df["day"] = df["date"].dt.strftime("%m월%d일")  # 날짜 형식 변경
-
-        if group_by == "partner":
-            df_grouped = df.groupby("day").mean(numeric_only=True)
-            categories = partner_categories
-            labels = list(df_grouped.index)  # 이미 포맷된 날짜 사용
-            title = "주간 NaN 비율 추이 (mixed)"  # 기존 제목과 일치
-            y_label = "협력사"
-        elif group_by == "model":
-            # 주간 모델별 데이터 처리
-            model_daily_data = []
-            for (day, model), group in df.groupby(["day", "model_name"]):
-                total_nan_ratio = 0
-                count = 0
-                for col, _, _ in partner_categories:
-                    if col in group.columns and group[col].sum() > 0:
-                        total_nan_ratio += group[col].mean()
-                        count += 1
-                avg_nan_ratio = total_nan_ratio / count if count > 0 else 0
-                model_daily_data.append(
-                    {"day": day, "model_name": model, "avg_nan_ratio": avg_nan_ratio}
-                )
-
-            model_df = pd.DataFrame(model_daily_data)
-            if not model_df.empty:
-                df_grouped = model_df.pivot(
-                    index="model_name", columns="day", values="avg_nan_ratio"
-                ).fillna(0)
-                labels = [f"{d.month}월{d.day}일" for d in df_grouped.columns]
-            else:
-                print("⚠️ 모델별 주간 데이터가 없습니다.")
-                return None
-            title = "주간 모델별 NaN 비율 히트맵"
-            y_label = "모델"
-
-    elif period == "monthly":
-        if group_by == "partner":
-            df_grouped = df.groupby(df["date"].dt.to_period("M")).mean(
-                numeric_only=True
-            )
-            df_grouped.index = df_grouped.index.to_timestamp()
-            categories = partner_categories
-            labels = [d.strftime("%Y-%m") for d in df_grouped.index]
-            title = "월간 협력사별 NaN 비율 히트맵 (금요일 기준)"
-            y_label = "협력사"
-        elif group_by == "model":
-            # 기존 방식과 완전히 동일: 월간 모델별 처리
-            df_grouped = (
-                df.groupby([df["date"].dt.to_period("M"), "model_name"])
-                .mean(numeric_only=True)
-                .reset_index()
-            )
-            df_grouped["date"] = df_grouped["date"].apply(lambda x: x.to_timestamp())
-
-            # 모델명 리스트 생성 (categories 변수)
-            categories = [
-                (row["model_name"], row["model_name"], "blue")
-                for _, row in df_grouped[["model_name"]].drop_duplicates().iterrows()
-            ]
-
-            # Pivot 테이블 생성: 모든 협력사 비율 컬럼 유지
-            df_grouped = df_grouped.pivot(
-                index="date",
-                columns="model_name",
-                values=[col[0] for col in partner_categories],
-            )
-
-            # 핵심! 기존 방식: 컬럼명 단순화
-            df_grouped.columns = [col[1] for col in df_grouped.columns]
-
-            labels = [d.strftime("%Y-%m") for d in df_grouped.index]
-            title = "월간 NaN 비율 추이 (금요일 기준)"
-            y_label = "모델"
-
-    # 히트맵 데이터 준비
-    if group_by == "partner":
-        heatmap_data = df_grouped[[cat[0] for cat in partner_categories]].T
-        heatmap_data.index = [cat[1] for cat in partner_categories]
-    else:
-        # 모델별 히트맵: 기존 방식과 동일하게 groupby로 평균 계산 후 transpose
-        heatmap_data = df_grouped.groupby(axis=1, level=0).mean().T
-
-    # 히트맵 생성
-    plt.figure(figsize=(12, max(6, len(heatmap_data.index) * 0.6)))
-    sns.heatmap(
-        heatmap_data,
-        annot=True,
-        fmt=".1f",
-        cmap="YlOrRd",
-        cbar_kws={"label": "NaN 비율 (%)"},
-        linewidths=0.5,
-    )
-
-    if font_prop:
-        plt.title(title, fontproperties=font_prop, fontsize=16)
-        plt.xlabel("측정 날짜", fontproperties=font_prop)
-        plt.ylabel(y_label, fontproperties=font_prop)
-        plt.xticks(
-            ticks=np.arange(len(labels)) + 0.5,
-            labels=labels,
-            rotation=45,
-            ha="right",
-            fontproperties=font_prop,
-        )
-        plt.yticks(rotation=0, fontproperties=font_prop)
-    else:
-        plt.title(title, fontsize=16)
-        plt.xlabel("측정 날짜")
-        plt.ylabel(y_label)
-        plt.xticks(
-            ticks=np.arange(len(labels)) + 0.5, labels=labels, rotation=45, ha="right"
-        )
-        plt.yticks(rotation=0)
-    plt.tight_layout()
-
-    # 파일명 및 저장
-    filename = f"output/{period}_{group_by}_nan_heatmap_{datetime.now().strftime('%Y%m%d')}.png"
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    plt.savefig(filename, bbox_inches="tight")
-    plt.close()
-
-    print(f"✅ {title} 생성 완료: {filename}")
-    return filename
-
-
-def generate_weekly_report_heatmap(drive_service, output_path=None):
+def compute_heatmaps(drive_service, variants, current_run=None):
     """
-    이번 주(월~금)의 모든 JSON을 Drive에서 읽어, 협력사별/날짜별 NaN 비율 히트맵을 생성합니다.
-    (Drive JSONs -> Weekly Heatmap)
+    히트맵 매트릭스 계산 단계 (Drive 히스토리 로드 + 집계, 렌더링 제외)
+    반환: {variant 이름: 매트릭스 또는 None}
     """
-    # 폰트 설정 추가
-    global font_prop
-    try:
-        # font_prop가 정의되어 있는지 확인
-        font_prop
-    except NameError:
-        # font_prop가 정의되지 않은 경우 기본값으로 설정
-        font_prop = None
-    # 1. 이번 주 날짜 및 주차 계산 (월요일 ~ 금요일)
-    today = datetime.now(pytz.timezone("Asia/Seoul"))
-    start_of_week = today - timedelta(days=today.weekday())
-    end_of_week = start_of_week + timedelta(days=4)
-    current_week = today.isocalendar().week
-    print(
-        f"\n--- 📊 주간 히트맵 생성을 위해 {current_week}주차 데이터를 로드합니다 ---"
-    )
-    print(
-        f"({start_of_week.strftime('%Y-%m-%d')} ~ {end_of_week.strftime('%Y-%m-%d')})"
+    sums = aggregate_history(
+        drive_service,
+        JSON_DRIVE_FOLDER_ID,
+        variants,
+        current_run=current_run,
+        cache_dir=HISTORY_CACHE_DIR,
     )
-
-    # 2. 이번 주차 데이터만 로드 (효율성 개선)
-    all_data = load_json_files_from_drive(
-        drive_service, period="weekly", week_number=current_week
-    )
-
-    if not all_data:
-        print("⚠️ 이번 주 데이터가 없어 주간 히트맵을 생성할 수 없습니다.")
-        return None
-
-    # 3. DataFrame 생성 및 데이터 변환
-    df_data = []
-    for d in all_data:
-        execution_time = d["execution_time"]
-        occurrence_stats = d.get("occurrence_stats", {})
-        mech_partner = d.get("mech_partner", "").strip().upper()
-        elec_partner = d.get("elec_partner", "").strip().upper()
-
-        # 날짜 파싱
-        try:
-            if isinstance(execution_time, str):
-                if "_" in execution_time:  # 기존 형식: 20250616_132845
-                    date_obj = pd.to_datetime(execution_time, format="%Y%m%d_%H%M%S")
-                else:  # 새 형식: 2025-06-18 23:12:07
-                    date_obj = pd.to_datetime(execution_time)
-            else:
-                date_obj = pd.to_datetime(execution_time)
-        except:
-            continue
-
-        # 이번 주에 해당하는 데이터만 필터링
-        if not (start_of_week.date() <= date_obj.date() <= end_of_week.date()):
-            continue
-
-        entry = {
-            "date": date_obj,
-            "model_name": d["model_name"],
-            "mech_partner": mech_partner,
-            "elec_partner": elec_partner,
-            "bat_nan_ratio": 0.0,
-            "fni_nan_ratio": 0.0,
-            "tms_m_nan_ratio": 0.0,
-            "cna_nan_ratio": 0.0,
-            "pns_nan_ratio": 0.0,
-            "tms_e_nan_ratio": 0.0,
-            "tms_semi_nan_ratio": 0.0,
-        }
-
-        # 기구 협력사별 NaN 비율 계산
-        if mech_partner == "BAT":
-            target = occurrence_stats.get("기구", {})
-            entry["bat_nan_ratio"] = ratio_calc(target)
-        elif mech_partner == "FNI":
-            target = occurrence_stats.get("기구", {})
-            entry["fni_nan_ratio"] = ratio_calc(target)
-        elif mech_partner == "TMS":
-            target = occurrence_stats.get("기구", {})
-            entry["tms_m_nan_ratio"] = ratio_calc(target)
-
-        # 전장 협력사별 NaN 비율 계산
-        if elec_partner == "C&A":
-            target = occurrence_stats.get("전장", {})
-            entry["cna_nan_ratio"] = ratio_calc(target)
-        elif elec_partner == "P&S":
-            target = occurrence_stats.get("전장", {})
-            entry["pns_nan_ratio"] = ratio_calc(target)
-        elif elec_partner == "TMS":
-            target = occurrence_stats.get("전장", {})
-            entry["tms_e_nan_ratio"] = ratio_calc(target)
-
-        # TMS 반제품 NaN 비율
-        tms_semi_stats = occurrence_stats.get("TMS_반제품", {})
-        entry["tms_semi_nan_ratio"] = ratio_calc(tms_semi_stats)
-
-        df_data.append(entry)
-
-    if not df_data:
-        print("⚠️ 이번 주 데이터가 없어 주간 히트맵을 생성할 수 없습니다.")
-        return None
-
-    df = pd.DataFrame(df_data)
-    df = df.sort_values("date")
-    df["day"] = df["date"].dt.strftime("%m월%d일")
-
-    # 협력사 카테고리 정의
-    partner_categories = [
-        ("bat_nan_ratio", "BAT"),
-        ("fni_nan_ratio", "FNI"),
-        ("tms_m_nan_ratio", "TMS(m)"),
-        ("cna_nan_ratio", "C&A"),
-        ("pns_nan_ratio", "P&S"),
-        ("tms_e_nan_ratio", "TMS(e)"),
-        ("tms_semi_nan_ratio", "TMS_반제품"),
-    ]
-
-    # 날짜별 그룹화 및 평균 계산
-    df_grouped = df.groupby("day").mean(numeric_only=True)
-
-    if df_grouped.empty:
-        print("⚠️ 그룹화된 데이터가 없어 히트맵을 생성할 수 없습니다.")
-        return None
-
-    # 히트맵 데이터 준비 (협력사 x 날짜)
-    heatmap_data = []
-    for col, label in partner_categories:
-        if col in df_grouped.columns:
-            heatmap_data.append(df_grouped[col].values)
-        else:
-            heatmap_data.append([0] * len(df_grouped))
-
-    heatmap_array = np.array(heatmap_data)
-    partner_labels = [label for _, label in partner_categories]
-    date_labels = list(df_grouped.index)
-
-    # 히트맵 생성
-    plt.figure(
-        figsize=(max(8, len(date_labels) * 1.5), max(6, len(partner_labels) * 0.8))
-    )
-    sns.heatmap(
-        heatmap_array,
-        annot=True,
-        fmt=".1f",
-        cmap="Reds",
-        linewidths=0.5,
-        xticklabels=date_labels,
-        yticklabels=partner_labels,
-        cbar_kws={"label": "NaN 비율 (%)"},
-    )
-
-    if font_prop:
-        plt.title("주간 NaN 비율 추이 (mixed)", fontproperties=font_prop, fontsize=16)
-        plt.xlabel("측정 날짜", fontproperties=font_prop)
-        plt.ylabel("협력사", fontproperties=font_prop)
-        plt.xticks(rotation=0, fontproperties=font_prop)
-        plt.yticks(rotation=0, fontproperties=font_prop)
-    else:
-        plt.title("주간 NaN 비율 추이 (mixed)", fontsize=16)
-        plt.xlabel("측정 날짜")
-        plt.ylabel("협력사")
-        plt.xticks(rotation=0)
-        plt.yticks(rotation=0)
-    plt.tight_layout()
-
-    # 날짜가 포함된 파일명 생성
-    if output_path is None:
-        output_path = (
-            f"output/weekly_partner_nan_heatmap_{datetime.now().strftime('%Y%m%d')}.png"
-        )
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    plt.savefig(output_path, bbox_inches="tight")
-    plt.close()
-
-    print(f"✅ 주간 리포트용 히트맵 저장 완료: {output_path}")
-    return output_path
+    return compute_heatmap_matrices(sums, variants)
 
 
 def should_generate_monthly_heatmap():
@@ -3066,133 +3120,271 @@ def generate_final_html(
     return output_filename
 
 
-# ====================================
-# MAIN EXECUTION BLOCK (REFACTORED)
-# ====================================
-if __name__ == "__main__":
-    # 1. 데이터 추출 및 가공
-    print("--- 1. 데이터 추출 및 가공 시작 ---")
-    all_results = collect_and_process_data()
-
-    if all_results:
-        # 2. 결과 JSON으로 저장 및 Drive 업로드
-        print("\n--- 2. 결과 JSON으로 저장 및 업로드 시작 ---")
-        save_results_to_json(all_results, drive_service)  # ID 반환값은 더이상 필요 없음
-
-        # JSON 업로드 후 Drive에서 파일이 완전히 처리될 때까지 잠시 대기
-        print("⏱️ Google Drive 파일 처리 대기 중... (5초)")
-        systime.sleep(5)
-
-        # 3. 주간/월간 히트맵 생성
-        print("\n--- 3. 히트맵 생성 시작 ---")
-
-        # 3-1. 주간 리포트용 히트맵 (이번 주 모든 JSON 취합)
-        heatmap_path = generate_weekly_report_heatmap(drive_service)
-
-        # 3-2. 월간 히트맵 생성 (33주부터 일요일 기준으로 변경)
-        monthly_partner_link = None
-        monthly_model_link = None
+def generate_data_dashboard(
+    all_results,
+    heatmap_path,
+    output_filename="partner.html",
+    monthly_partner_link=None,
+    monthly_model_link=None,
+):
+    """
+    데이터 기반 대시보드를 생성합니다. (정적 셸 + 압축 JSON 데이터)
+    반환: (셸 경로, 데이터 경로, 요약 이메일 본문)
+    """
+    heatmap_url = upload_to_drive(heatmap_path) if heatmap_path else None
+    execution_time = datetime.now(pytz.timezone("Asia/Seoul")).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    year, week_num, _ = date.today().isocalendar()
+    payload = build_dashboard_payload(
+        all_results,
+        execution_time,
+        year,
+        week_num,
+        format_hours,
+        trend_links=resolve_trend_links(
+            heatmap_url, monthly_partner_link, monthly_model_link
+        ),
+    )
+    shell_path, data_path = write_dashboard(payload, output_filename)
+    dashboard_link = os.getenv("DASHBOARD_URL", "https://nan-dashboard.netlify.app")
+    return shell_path, data_path, build_summary_email_body(payload, dashboard_link)
 
-        should_generate, target_day = should_generate_monthly_heatmap()
-        if should_generate:
-            if target_day == "friday":
-                print("\n--- 📊 월의 마지막 금요일: 월간 히트맵 생성 시작 ---")
-            else:
-                print("\n--- 📊 월의 마지막 일요일: 월간 히트맵 생성 시작 ---")
-
-            # 월간 협력사 히트맵
-            monthly_partner_heatmap = generate_heatmap(
-                drive_service,
-                period="monthly",
-                group_by="partner",
-                target_day=target_day,
-            )
 
-            # 월간 모델 히트맵
-            monthly_model_heatmap = generate_heatmap(
-                drive_service, period="monthly", group_by="model", target_day=target_day
-            )
+def plan_heatmap_variants():
+    """이번 주 주간 리포트용 히트맵 + (월말이면) 월간 히트맵 정의. 반환: (variants, 월간 생성 여부)"""
+    now_kst = datetime.now(pytz.timezone("Asia/Seoul"))
+    heatmap_variants = [weekly_variant("partner", now_kst)]
 
-            print(f"✅ 월간 히트맵 생성 완료:")
-            if monthly_partner_heatmap:
-                print(f"   - 협력사별: {monthly_partner_heatmap}")
-                # 드라이브 업로드
-                monthly_partner_link = upload_to_drive(monthly_partner_heatmap)
-                if monthly_partner_link:
-                    print(f"   - 협력사별 드라이브 업로드 완료: {monthly_partner_link}")
-            if monthly_model_heatmap:
-                print(f"   - 모델별: {monthly_model_heatmap}")
-                # 드라이브 업로드
-                monthly_model_link = upload_to_drive(monthly_model_heatmap)
-                if monthly_model_link:
-                    print(f"   - 모델별 드라이브 업로드 완료: {monthly_model_link}")
+    should_generate, target_day = should_generate_monthly_heatmap()
+    if should_generate:
+        if target_day == "friday":
+            print("\n--- 📊 월의 마지막 금요일: 월간 히트맵 생성 시작 ---")
         else:
-            current_week = datetime.now(pytz.timezone("Asia/Seoul")).isocalendar().week
-            if current_week < 33:
-                print(
-                    "ℹ️ 월의 마지막 금요일이 아니므로 월간 히트맵을 생성하지 않습니다."
-                )
-            else:
-                print(
-                    "ℹ️ 월의 마지막 일요일이 아니므로 월간 히트맵을 생성하지 않습니다."
-                )
-
-        # 4. 최종 HTML 생성
-        print("\n--- 4. 최종 HTML 리포트 생성 시작 ---")
-        # generate_nan_bar_charts는 all_results를 사용하므로 여기서 호출
-        tasks_file, total_file = generate_nan_bar_charts(all_results)
-        final_html_path = generate_final_html(
+            print("\n--- 📊 월의 마지막 일요일: 월간 히트맵 생성 시작 ---")
+        heatmap_variants += [
+            monthly_variant("partner", target_day),
+            monthly_variant("model", target_day),
+        ]
+    elif now_kst.isocalendar().week < 33:
+        print("ℹ️ 월의 마지막 금요일이 아니므로 월간 히트맵을 생성하지 않습니다.")
+    else:
+        print("ℹ️ 월의 마지막 일요일이 아니므로 월간 히트맵을 생성하지 않습니다.")
+    return heatmap_variants, should_generate
+
+
+def upload_monthly_heatmaps(heatmap_files):
+    """월간 히트맵을 Drive에 업로드. 반환: (협력사별 링크, 모델별 링크)"""
+    links = []
+    for name, label in [("monthly_partner", "협력사별"), ("monthly_model", "모델별")]:
+        path = heatmap_files.get(name)
+        link = None
+        if path:
+            print(f"   - {label}: {path}")
+            link = upload_to_drive(path)
+            if link:
+                print(f"   - {label} 드라이브 업로드 완료: {link}")
+        links.append(link)
+    return tuple(links)
+
+
+def build_final_report(all_results, heatmap_files, monthly_links):
+    """최종 리포트 생성. 반환: (HTML 경로, 대시보드 데이터 경로 또는 None, 이메일 본문)"""
+    monthly_partner_link, monthly_model_link = monthly_links
+    if DASHBOARD_MODE == "data":
+        return generate_data_dashboard(
             all_results,
-            heatmap_path,
+            heatmap_files["weekly_partner"],
             output_filename="partner.html",
             monthly_partner_link=monthly_partner_link,
             monthly_model_link=monthly_model_link,
         )
+    final_html_path = generate_final_html(
+        all_results,
+        heatmap_files["weekly_partner"],
+        output_filename="partner.html",
+        monthly_partner_link=monthly_partner_link,
+        monthly_model_link=monthly_model_link,
+    )
+    with open(final_html_path, "r", encoding="utf-8") as f:
+        return final_html_path, None, f.read()
 
-        # 5. 알림 및 업로드
-        print("\n--- 5. 알림 및 업로드 시작 ---")
 
-        # GitHub 업로드 옵션 확인 (환경변수에서 제어)
-        GITHUB_UPLOAD = os.getenv("GITHUB_UPLOAD", "auto").lower()
+def github_upload_enabled():
+    # GitHub 업로드 옵션 확인 (환경변수에서 제어)
+    GITHUB_UPLOAD = os.getenv("GITHUB_UPLOAD", "auto").lower()
 
+    should_upload_github = False
+    if GITHUB_UPLOAD == "true":
+        should_upload_github = True
+        print("✅ GITHUB_UPLOAD=true: 강제로 GitHub 업로드 진행")
+    elif GITHUB_UPLOAD == "false":
         should_upload_github = False
-        if GITHUB_UPLOAD == "true":
-            should_upload_github = True
-            print("✅ GITHUB_UPLOAD=true: 강제로 GitHub 업로드 진행")
-        elif GITHUB_UPLOAD == "false":
-            should_upload_github = False
-            print("⛔ GITHUB_UPLOAD=false: GitHub 업로드 비활성화")
+        print("⛔ GITHUB_UPLOAD=false: GitHub 업로드 비활성화")
+    else:
+        # 자동 모드: TEST_MODE가 아닐 때만 업로드
+        should_upload_github = not TEST_MODE
+        if should_upload_github:
+            print("✅ 운영 모드: GitHub 업로드 진행")
         else:
-            # 자동 모드: TEST_MODE가 아닐 때만 업로드
-            should_upload_github = not TEST_MODE
-            if should_upload_github:
-                print("✅ 운영 모드: GitHub 업로드 진행")
-            else:
-                print("🧪 TEST_MODE: GitHub 업로드 생략")
+            print("🧪 TEST_MODE: GitHub 업로드 생략")
 
-        print(
-            f"📤 GitHub 업로드 설정: GITHUB_UPLOAD={GITHUB_UPLOAD}, 실제 업로드 여부: {should_upload_github}"
-        )
+    print(
+        f"📤 GitHub 업로드 설정: GITHUB_UPLOAD={GITHUB_UPLOAD}, 실제 업로드 여부: {should_upload_github}"
+    )
+    return should_upload_github
 
-        if should_upload_github:
-            upload_to_github(final_html_path)
-            print(f"✅ GitHub 업로드 완료: {final_html_path}")
-        else:
-            print(f"⛔ GitHub 업로드 생략됨: {final_html_path}")
-
-        # 이메일 발송
-        email_body = open(final_html_path, "r", encoding="utf-8").read()
-        attachment_files = [f for f in [tasks_file, total_file, heatmap_path] if f]
-        send_occurrence_email(
-            f"[알림] PDA Overtime 및 NaN 체크 결과 - 총 {len(all_results)}건",
-            email_body,
-            graph_files=attachment_files,
+
+def send_notifications(
+    all_results,
+    final_html_path,
+    dashboard_data_path,
+    email_body,
+    bar_chart_files,
+    heatmap_files,
+):
+    """GitHub 업로드 / 이메일 / 카카오톡은 서로 독립적이므로 동시에 발송"""
+    if OFFLINE_BACKEND:
+        print(f"🧪 GOOGLE_BACKEND={GOOGLE_BACKEND}: 오프라인 실행이므로 알림/업로드를 보내지 않습니다.")
+        return {}
+    notification_channels = {}
+    if github_upload_enabled():
+        # 대시보드(+데이터 파일)와 히트맵을 한 번의 커밋으로 업로드 (변경 없는 파일은 생략)
+        notification_channels["GitHub"] = lambda: publish_to_github(
+            [final_html_path, dashboard_data_path, *heatmap_files.values()]
         )
+    else:
+        print(f"⛔ GitHub 업로드 생략됨: {final_html_path}")
+
+    attachment_files = [
+        f for f in [*bar_chart_files, heatmap_files["weekly_partner"]] if f
+    ]
+    notification_channels["이메일"] = lambda: send_occurrence_email(
+        f"[알림] PDA Overtime 및 NaN 체크 결과 - 총 {len(all_results)}건",
+        email_body,
+        graph_files=attachment_files,
+    )
+    notification_channels["카카오톡"] = lambda: send_nan_alert_to_kakao(all_results)
+    return dispatch_notifications(notification_channels)
 
-        # 카카오톡 발송
-        send_nan_alert_to_kakao(all_results)
+
+def build_main_stages():
+    """
+    메인 파이프라인 스테이지 DAG.
+    각 스테이지는 선언된 입력이 준비되는 즉시 시작하며, pyplot("plot")과
+    Drive 서비스("drive")를 쓰는 스테이지끼리만 직렬화됩니다.
+    (임계 경로인 히트맵 계산을 결과 JSON 업로드보다 먼저 배치)
+    수집 결과(collected_results)는 기구 시작일 순으로 정렬한 뒤 all_results로 모든 스테이지에 전달됩니다.
+    """
+    return [
+        stage(
+            "기구 시작일 정렬",
+            lambda results: sort_all_results_by_mech_start(results, sheets_service),
+            ["collected_results"],
+            ["all_results"],
+        ),
+        stage("결과 페이로드", build_results_payload, ["all_results"], ["results_payload"]),
+        stage(
+            "히트맵 계산",
+            lambda variants, payload: compute_heatmaps(
+                drive_service, variants, current_run=payload
+            ),
+            ["heatmap_variants", "results_payload"],
+            ["heatmap_matrices"],
+            resources=["drive"],
+        ),
+        stage(
+            "결과 JSON 업로드",
+            lambda results, payload: save_results_to_json(
+                results, drive_service, payload=payload
+            ),
+            ["all_results", "results_payload"],
+            ["results_file_id"],
+            resources=["drive"],
+        ),
+        stage(
+            "히트맵 렌더링",
+            lambda matrices: render_heatmaps(matrices, font_prop=font_prop),
+            ["heatmap_matrices"],
+            ["heatmap_files"],
+            resources=["plot"],
+        ),
+        stage(
+            "월간 히트맵 업로드",
+            upload_monthly_heatmaps,
+            ["heatmap_files"],
+            ["monthly_links"],
+            resources=["drive"],
+        ),
+        stage(
+            "NaN 막대그래프",
+            generate_nan_bar_charts,
+            ["all_results"],
+            ["bar_chart_files"],
+            resources=["plot"],
+        ),
+        stage(
+            "최종 리포트",
+            build_final_report,
+            ["all_results", "heatmap_files", "monthly_links"],
+            ["final_html_path", "dashboard_data_path", "email_body"],
+            resources=["drive"],
+        ),
+        stage(
+            "알림 및 업로드",
+            send_notifications,
+            [
+                "all_results",
+                "final_html_path",
+                "dashboard_data_path",
+                "email_body",
+                "bar_chart_files",
+                "heatmap_files",
+            ],
+            ["notification_report"],
+        ),
+    ]
+
+
+# ====================================
+# MAIN EXECUTION BLOCK (REFACTORED)
+# ====================================
+if __name__ == "__main__":
+    if SHARD_MERGE:
+        # 1. 샤드별 부분 결과 병합 (수집은 각 샤드 실행에서 완료됨)
+        print(f"--- 1. 샤드 {SHARD_COUNT}개 부분 결과 병합 ---")
+        with span("샤드 병합", "stage"):
+            all_results = merge_partials(SHARD_DIR, SHARD_COUNT, limited_spreadsheet_ids())
+    else:
+        # 1. 데이터 추출 및 가공
+        print("--- 1. 데이터 추출 및 가공 시작 ---")
+        with span("데이터 추출 및 가공", "stage"):
+            all_results = collect_and_process_data()
+
+    if SHARDED:
+        # 저장/히트맵/리포트/알림은 병합 실행(SHARD_MERGE=true)에서 한 번만 수행
+        print(
+            f"\n🧩 [종료] 샤드 {SHARD_INDEX}/{SHARD_COUNT} 수집 완료: "
+            f"{partial_path(SHARD_DIR, SHARD_INDEX, SHARD_COUNT)} (이상 발견 {len(all_results)}건)"
+        )
+    elif all_results:
+        # 2. 결과 저장 / 히트맵 / 리포트 / 알림을 스테이지 DAG로 실행
+        print("\n--- 2. 결과 저장, 히트맵, 리포트, 알림 스테이지 실행 ---")
+        heatmap_variants, _ = plan_heatmap_variants()
+        run_pipeline(
+            build_main_stages(),
+            initial={"collected_results": all_results, "heatmap_variants": heatmap_variants},
+        )
 
         print("\n✅ [종료] 데이터 중심 파이프라인 처리 완료.")
 
     else:
         print("\n✅ [종료] 처리할 데이터가 없어 작업을 마칩니다.")
+
+    # 실행 트레이스 저장 (chrome://tracing 또는 ui.perfetto.dev에서 열기) 및 요약 출력
+    write_trace(TRACE_OUTPUT)
+    print_trace_summary()
+
+    # 엔드포인트별 API 사용량 (Prometheus textfile + JSON)
+    write_api_metrics(API_METRICS_DIR)
+    print_api_summary()
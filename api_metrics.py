@@ -0,0 +1,251 @@
+"""
+Google API 호출 집계
+엔드포인트별/호출 함수별 요청 수, 재시도, 429, 오류, 송수신 bytes, 지연 시간 백분위를 집계하고
+실행 종료 시 Prometheus textfile(node_exporter textfile collector용)과 JSON 요약을 저장합니다.
+할당량 최적화 효과 확인과 동시성 크기 조정에 사용합니다.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest, HttpRequest
+
+from tracing import TracedHttpRequest
+
+_lock = threading.Lock()
+_endpoints = {}
+_callers = {}
+_project_dir = os.path.dirname(os.path.abspath(__file__))
+
+# 호출 함수 추적 시 건너뛸 래퍼 함수
+_WRAPPER_FUNCTIONS = {"execute", "api_call_with_backoff", "execute_with_backoff", "retry", "wrapper", "positional_wrapper"}
+_INSTRUMENTATION_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(_project_dir, "tracing.py"),
+    os.path.join(_project_dir, "fake_google.py"),
+}
+
+
+def endpoint_name(request):
+    """methodId에서 API 이름을 뗀 엔드포인트 이름 (미디어 다운로드는 files.get_media)"""
+    method_id = request.methodId or f"unknown.{request.method}"
+    api, _, endpoint = method_id.partition(".")
+    if endpoint == "files.get" and "alt=media" in (request.uri or ""):
+        endpoint = "files.get_media"
+    return api, endpoint
+
+
+def calling_function():
+    """프로젝트 코드 중 래퍼가 아닌 첫 번째 호출 함수 이름 (execute()를 부른 쪽 기준)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        path = os.path.abspath(code.co_filename)
+        if (
+            path.startswith(_project_dir)
+            and "site-packages" not in path
+            and path not in _INSTRUMENTATION_FILES
+            and code.co_name not in _WRAPPER_FUNCTIONS
+        ):
+            return code.co_name
+        frame = frame.f_back
+    return "unknown"
+
+
+def _new_stats():
+    return {
+        "requests": 0,
+        "retries": 0,
+        "rate_limited": 0,
+        "errors": 0,
+        "bytes_sent": 0,
+        "bytes_received": 0,
+        "latencies": [],
+    }
+
+
+def record_request(api, endpoint, caller, seconds, status, bytes_sent, bytes_received):
+    with _lock:
+        for table, key in [(_endpoints, (api, endpoint)), (_callers, (caller, endpoint))]:
+            stats = table.setdefault(key, _new_stats())
+            stats["requests"] += 1
+            stats["bytes_sent"] += bytes_sent
+            stats["bytes_received"] += bytes_received
+            stats["latencies"].append(seconds)
+            if status == 429:
+                stats["rate_limited"] += 1
+            if status >= 400:
+                stats["errors"] += 1
+
+
+def _retried_endpoints(request):
+    """재시도된 요청의 (api, 엔드포인트) 목록 - 배치 요청은 묶인 하위 요청마다 하나씩"""
+    if isinstance(request, HttpRequest):
+        return [endpoint_name(request)]
+    if isinstance(request, BatchHttpRequest):
+        return [endpoint_name(sub) for sub in request._requests.values()]
+    # fake_google 대역 (FakeRequest / FakeBatchRequest)
+    if hasattr(request, "endpoint"):
+        return [(request.api, request.endpoint)]
+    if hasattr(request, "requests"):
+        return [(sub.api, sub.endpoint) for _, sub, _ in request.requests]
+    return []
+
+
+def record_retry(details):
+    """backoff on_backoff 핸들러: 재시도된 요청을 엔드포인트별로 집계"""
+    # api_call_with_backoff(func, ...)의 func: 요청.execute(execute_with_backoff)이면 엔드포인트를 알 수 있음
+    func = (details.get("args") or [None])[0]
+    endpoints = _retried_endpoints(getattr(func, "__self__", None)) or [
+        ("unknown", getattr(func, "__name__", "unknown"))
+    ]
+    with _lock:
+        for api, endpoint in endpoints:
+            _endpoints.setdefault((api, endpoint), _new_stats())["retries"] += 1
+
+
+class InstrumentedHttpRequest(TracedHttpRequest):
+    """
+    트레이스 span 기록 + 엔드포인트별 집계를 하는 requestBuilder.
+    build(..., requestBuilder=InstrumentedHttpRequest)로 지정합니다.
+    """
+
+    def execute(self, *args, **kwargs):
+        api, endpoint = endpoint_name(self)
+        caller = calling_function()
+        received = [0]
+        postproc = self.postproc
+
+        def counting_postproc(resp, content):
+            received[0] = len(content or b"")
+            return postproc(resp, content)
+
+        self.postproc = counting_postproc
+        if self.resumable is not None:
+            sent = self.resumable.size() or 0
+        else:
+            sent = len(self.body or b"")
+        status = 200
+        start = time.perf_counter()
+        try:
+            return super().execute(*args, **kwargs)
+        except HttpError as e:
+            status = int(getattr(e.resp, "status", 0) or 0)
+            raise
+        except Exception:
+            status = 599
+            raise
+        finally:
+            self.postproc = postproc
+            record_request(
+                api, endpoint, caller, time.perf_counter() - start, status, sent, received[0]
+            )
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _summarize(stats):
+    latencies = stats["latencies"]
+    return {
+        "requests": stats["requests"],
+        "retries": stats["retries"],
+        "rate_limited": stats["rate_limited"],
+        "errors": stats["errors"],
+        "bytes_sent": stats["bytes_sent"],
+        "bytes_received": stats["bytes_received"],
+        "latency_seconds": {
+            "sum": round(sum(latencies), 4),
+            "p50": round(_percentile(latencies, 0.5), 4),
+            "p90": round(_percentile(latencies, 0.9), 4),
+            "p99": round(_percentile(latencies, 0.99), 4),
+            "max": round(max(latencies, default=0.0), 4),
+        },
+    }
+
+
+def metrics_summary():
+    with _lock:
+        endpoints = {f"{api}.{endpoint}": _summarize(s) for (api, endpoint), s in _endpoints.items()}
+        callers = {}
+        for (caller, endpoint), s in _callers.items():
+            callers.setdefault(caller, {})[endpoint] = _summarize(s)
+    return {"endpoints": endpoints, "callers": callers}
+
+
+def _prometheus_lines():
+    def labels(**kwargs):
+        return ",".join(f'{key}="{value}"' for key, value in kwargs.items())
+
+    with _lock:
+        endpoints = {key: _summarize(s) for key, s in _endpoints.items()}
+        callers = {key: _summarize(s) for key, s in _callers.items()}
+
+    lines = []
+    counters = [
+        ("requests", "pda_api_requests_total", "API 요청 수"),
+        ("retries", "pda_api_retries_total", "백오프 재시도 수"),
+        ("rate_limited", "pda_api_rate_limited_total", "429 응답 수"),
+        ("errors", "pda_api_errors_total", "오류 응답 수"),
+        ("bytes_sent", "pda_api_bytes_sent_total", "요청 본문 bytes"),
+        ("bytes_received", "pda_api_bytes_received_total", "응답 본문 bytes"),
+    ]
+    for key, metric, help_text in counters:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for (api, endpoint), s in sorted(endpoints.items()):
+            lines.append(f"{metric}{{{labels(api=api, endpoint=endpoint)}}} {s[key]}")
+
+    metric = "pda_api_latency_seconds"
+    lines += [f"# HELP {metric} API 지연 시간", f"# TYPE {metric} summary"]
+    for (api, endpoint), s in sorted(endpoints.items()):
+        latency = s["latency_seconds"]
+        for quantile, name in [("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")]:
+            lines.append(
+                f"{metric}{{{labels(api=api, endpoint=endpoint, quantile=quantile)}}} {latency[name]}"
+            )
+        lines.append(f"{metric}_sum{{{labels(api=api, endpoint=endpoint)}}} {latency['sum']}")
+        lines.append(f"{metric}_count{{{labels(api=api, endpoint=endpoint)}}} {s['requests']}")
+
+    metric = "pda_api_caller_requests_total"
+    lines += [f"# HELP {metric} 호출 함수별 API 요청 수", f"# TYPE {metric} counter"]
+    for (caller, endpoint), s in sorted(callers.items()):
+        lines.append(f"{metric}{{{labels(caller=caller, endpoint=endpoint)}}} {s['requests']}")
+    return lines
+
+
+def write_api_metrics(output_dir="output"):
+    """Prometheus textfile(api_metrics.prom)과 JSON 요약(api_metrics.json) 저장"""
+    os.makedirs(output_dir, exist_ok=True)
+    prom_path = os.path.join(output_dir, "api_metrics.prom")
+    json_path = os.path.join(output_dir, "api_metrics.json")
+    # textfile collector가 쓰는 도중의 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+    with open(prom_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write("\n".join(_prometheus_lines()) + "\n")
+    os.replace(prom_path + ".tmp", prom_path)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(metrics_summary(), f, ensure_ascii=False, indent=2)
+    print(f"📈 API 집계 저장 완료: {prom_path}, {json_path}")
+    return prom_path, json_path
+
+
+def print_api_summary():
+    """엔드포인트별 요청/재시도/429/지연 요약 출력"""
+    summary = metrics_summary()["endpoints"]
+    if not summary:
+        return
+    print("📈 API 엔드포인트별 사용량:")
+    for endpoint, s in sorted(summary.items(), key=lambda item: -item[1]["requests"]):
+        latency = s["latency_seconds"]
+        print(
+            f"   {endpoint:<40} 요청 {s['requests']:>5} | 재시도 {s['retries']:>3} | "
+            f"429 {s['rate_limited']:>3} | p50 {latency['p50']:.2f}s p90 {latency['p90']:.2f}s"
+        )
@@ -0,0 +1,312 @@
+"""
+분석 핫 함수 마이크로 벤치마크 (pytest-benchmark 방식)
+주문 1건당 CPU 경로(시간 파싱 -> 워킹시간 계산 -> 분류/집계 -> 크로스 체크/메일 본문)를
+결정적 합성 데이터로 반복 측정하고, 저장된 기준값(baseline) 대비 회귀를 표시합니다.
+  - 한국어 타임스탬프(오전/오후, 날짜만, 엑셀 serial, 빈 값)
+  - model_mechanical_tasks의 모든 모델 + 전장/검사/마무리 작업
+  - 주말을 넘기는 여러 날짜짜리 작업과 누락(NaN) 작업
+
+사용 예:
+    python benchmark_functions.py --save                 # 기준값 저장
+    python benchmark_functions.py                        # 기준값 대비 비교 (20% 초과 느려지면 실패)
+    python benchmark_functions.py --threshold 0.1 -k process_data
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 자격 증명 없이 모듈을 불러오기 위해 가짜 Google API 백엔드 사용 (주문 0건)
+os.environ["GOOGLE_BACKEND"] = "fake"
+os.environ["FAKE_ORDERS"] = "0"
+os.environ["PACING_SCALE"] = "0"
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import PDA_partner as pda
+from fake_google import korean_datetime
+from order_result import OrderResult
+
+DEFAULT_BASELINE = os.path.join(".benchmarks", "functions_baseline.json")
+SEED = 20250714
+BASE_DATE = datetime(2025, 7, 7, 8, 0)  # 월요일
+
+
+def _model_tasks(model):
+    return (
+        pda.get_mechanical_tasks(model)
+        + pda.default_electrical_tasks
+        + pda.default_inspection_tasks
+        + pda.default_finishing_tasks
+    )
+
+
+def make_timestamps(rng, count=2000):
+    """시트에서 읽히는 형태의 시작/완료 시간 문자열 (일부는 날짜만, serial 숫자, 빈 값)"""
+    values = []
+    for _ in range(count):
+        dt = BASE_DATE + timedelta(minutes=rng.randint(0, 60 * 24 * 60))
+        kind = rng.random()
+        if kind < 0.8:
+            values.append(korean_datetime(dt))
+        elif kind < 0.9:
+            values.append(f"{dt.year}. {dt.month}. {dt.day}")
+        elif kind < 0.95:
+            values.append(45845.0 + rng.random() * 60)
+        else:
+            values.append("")
+    return values
+
+
+def make_intervals(rng, count=500):
+    """주말/여러 날에 걸친 작업 구간 (시작, 완료)"""
+    intervals = []
+    for _ in range(count):
+        start = BASE_DATE + timedelta(
+            days=rng.randint(0, 40), hours=rng.randint(0, 11), minutes=rng.randint(0, 59)
+        )
+        intervals.append((start, start + timedelta(hours=rng.choice([1, 5, 13, 30, 54, 80, 150]))))
+    return intervals
+
+
+def make_order_frame(rng, model, workers=3, nan_rate=0.08):
+    """fetch_data_from_sheets 결과와 같은 형태 (작업별 작업자 여러 행, 일부 누락)"""
+    rows = []
+    for task in _model_tasks(model):
+        for _ in range(rng.randint(1, workers)):
+            start = BASE_DATE + timedelta(days=rng.randint(0, 20), hours=rng.randint(0, 10))
+            end = start + timedelta(hours=rng.choice([1, 3, 8, 20, 50]))
+            missing = rng.random() < nan_rate
+            rows.append(
+                {
+                    "내용": task,
+                    "시작 시간": korean_datetime(start),
+                    "완료 시간": "" if missing else korean_datetime(end),
+                    "진행율": None if missing else float(rng.choice([40, 80, 100, 100])),
+                }
+            )
+    df = pda.pd.DataFrame(rows)
+    df["시작 시간"] = df["시작 시간"].apply(pda.parse_korean_datetime)
+    df["완료 시간"] = df["완료 시간"].apply(pda.parse_korean_datetime)
+    return df
+
+
+def make_avg_mapping(rng, model):
+    return {task: rng.uniform(2, 30) for task in _model_tasks(model)}
+
+
+def make_inputs():
+    """모든 케이스가 공유하는 결정적 입력"""
+    rng = random.Random(SEED)
+    models = list(pda.model_mechanical_tasks)
+    orders = []
+    for model in models:
+        df = make_order_frame(rng, model)
+        task_total_time = pda.process_data(df, model)
+        orders.append(
+            {
+                "model": model,
+                "df": df,
+                "task_total_time": task_total_time,
+                "avg_mapping": make_avg_mapping(rng, model),
+            }
+        )
+
+    # 주문 200건 분량의 결과 레코드 (collect_and_process_data와 동일한 구조)
+    all_results = []
+    for index in range(200):
+        order = orders[index % len(orders)]
+        occurrence_stats, partner_stats = pda.compute_occurrence_rates(
+            order["df"].copy(),
+            order["task_total_time"],
+            order["avg_mapping"],
+            order["model"],
+            mech_partner=rng.choice(["BAT", "FNI", "TMS"]),
+            elec_partner=rng.choice(["C&A", "P&S", "TMS"]),
+        )
+        all_results.append(
+            OrderResult.from_stats(
+                f"ORD-{index:05d}",
+                order["model"],
+                rng.choice(["BAT", "FNI", "TMS"]),
+                rng.choice(["C&A", "P&S", "TMS"]),
+                occurrence_stats,
+                partner_stats,
+                {"working_hours": None, "legend": None, "wd": None},
+                f"https://docs.google.com/spreadsheets/d/fakeorder{index}/edit",
+                pda.calculate_progress_by_category(order["df"], order["model"]),
+            )
+        )
+    return {
+        "timestamps": make_timestamps(rng),
+        "intervals": make_intervals(rng),
+        "orders": orders,
+        "task_pairs": [(task, o["model"]) for o in orders for task in _model_tasks(o["model"])],
+        "all_results": all_results,
+    }
+
+
+def build_cases(inputs):
+    """케이스 이름 -> 인자 없는 호출 함수 (호출 1회 = 측정 단위 1회)"""
+    orders = inputs["orders"]
+    links = {
+        "heatmap_url": "https://example.com/weekly.png",
+        "monthly_partner_url": "https://example.com/monthly_partner.png",
+        "monthly_model_url": "https://example.com/monthly_model.png",
+    }
+    return {
+        "parse_korean_datetime[2000]": lambda: [
+            pda.parse_korean_datetime(v) for v in inputs["timestamps"]
+        ],
+        "calculate_working_hours_with_holidays[500]": lambda: [
+            pda.calculate_working_hours_with_holidays(s, e) for s, e in inputs["intervals"]
+        ],
+        "classify_task[all_models]": lambda: [
+            pda.classify_task(task, model) for task, model in inputs["task_pairs"]
+        ],
+        "process_data[all_models]": lambda: [
+            pda.process_data(o["df"], o["model"]) for o in orders
+        ],
+        "calculate_progress_by_category[all_models]": lambda: [
+            pda.calculate_progress_by_category(o["df"], o["model"]) for o in orders
+        ],
+        "compute_occurrence_rates[all_models]": lambda: [
+            pda.compute_occurrence_rates(
+                o["df"], o["task_total_time"], o["avg_mapping"], o["model"]
+            )
+            for o in orders
+        ],
+        "wd_timeline_segments[all_models]": lambda: [
+            pda.wd_timeline_segments(o["task_total_time"], o["df"]) for o in orders
+        ],
+        "cross_check_data_integrity[200]": lambda: pda.cross_check_data_integrity(
+            inputs["all_results"]
+        ),
+        "build_combined_email_body[200]": lambda: pda.build_combined_email_body(
+            inputs["all_results"], **links
+        ),
+    }
+
+
+def measure(func, rounds=7, min_round_time=0.05):
+    """
+    pytest-benchmark와 같은 방식: 1회 워밍업 후 한 라운드가 min_round_time 이상 되도록
+    반복 횟수를 맞추고, 라운드별 1회 평균 시간의 통계를 반환합니다.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        single = max(time.perf_counter() - start, 1e-6)
+        iterations = max(1, int(min_round_time / single))
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            samples.append((time.perf_counter() - start) / iterations)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.mean(samples),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": rounds,
+        "iterations": iterations,
+    }
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "saved_at": datetime.now().isoformat(timespec="seconds"),
+                "machine": platform.node(),
+                "python": platform.python_version(),
+                "pandas": pda.pd.__version__,
+                "results": results,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"💾 기준값 저장: {path}")
+
+
+def compare(results, baseline, threshold):
+    """중앙값 기준 비교. 반환: 회귀 케이스 이름 목록"""
+    regressions = []
+    base_results = (baseline or {}).get("results", {})
+    print(f"   {'케이스':<46} {'중앙값(ms)':>11} {'최소(ms)':>10} {'기준(ms)':>10} {'변화':>8}")
+    for name, stats in results.items():
+        base = base_results.get(name)
+        line = f"   {name:<46} {stats['median'] * 1e3:>11.3f} {stats['min'] * 1e3:>10.3f}"
+        if base:
+            change = stats["median"] / base["median"] - 1
+            mark = ""
+            if change > threshold:
+                regressions.append(name)
+                mark = " ❌"
+            elif change < -threshold:
+                mark = " 🚀"
+            line += f" {base['median'] * 1e3:>10.3f} {change * 100:>+7.1f}%{mark}"
+        else:
+            line += f" {'-':>10} {'-':>8}"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분석 핫 함수 마이크로 벤치마크")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="기준값 JSON 경로")
+    parser.add_argument("--save", action="store_true", help="이번 결과를 기준값으로 저장")
+    parser.add_argument("--threshold", type=float, default=0.2, help="회귀 판정 비율 (0.2 = 20%%)")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("-k", dest="keyword", help="이름에 포함된 케이스만 실행")
+    args = parser.parse_args()
+
+    print("🧪 합성 입력 생성 중...")
+    cases = build_cases(make_inputs())
+    if args.keyword:
+        cases = {name: func for name, func in cases.items() if args.keyword in name}
+
+    results = {}
+    for name, func in cases.items():
+        print(f"⏱️ {name}")
+        results[name] = measure(func, rounds=args.rounds)
+
+    baseline = load_baseline(args.baseline)
+    print(f"\n📊 결과 (회귀 기준: 중앙값 {args.threshold * 100:.0f}% 초과 증가)")
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save:
+        # 일부 케이스만 실행한 경우 나머지 기준값은 유지
+        merged = dict((baseline or {}).get("results", {}))
+        merged.update(results)
+        save_baseline(args.baseline, merged)
+    elif baseline is None:
+        print(f"ℹ️ 기준값이 없습니다. --save로 {args.baseline}에 저장하세요.")
+
+    if regressions and not args.save:
+        print(f"❌ 성능 회귀 {len(regressions)}건: {', '.join(regressions)}")
+        return 1
+    print("✅ 성능 회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
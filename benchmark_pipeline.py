@@ -0,0 +1,175 @@
+"""
+오프라인 end-to-end 벤치마크
+GOOGLE_BACKEND=fake(fake_google.py)로 PDA_partner.py 전체 파이프라인을 주문 수별로 실행하고
+실행 시간, API 호출 수(엔드포인트별), 최대 메모리(RSS)를 비교합니다.
+각 실행은 임시 폴더에서 별도 프로세스로 돌기 때문에 히스토리 캐시/출력 파일이 서로 섞이지 않습니다.
+
+사용 예:
+    python benchmark_pipeline.py                         # 10 / 200 / 2000건
+    python benchmark_pipeline.py --orders 10 200 --latency-ms 50
+    python benchmark_pipeline.py --graphs --output output/bench.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(PROJECT_DIR, "PDA_partner.py")
+
+# 벤치마크 중 외부로 나가면 안 되는 알림/업로드 설정은 제거
+BLOCKED_ENV = [
+    "EMAIL_ADDRESS",
+    "SMTP_USER",
+    "EMAIL_PASS",
+    "SMTP_PASSWORD",
+    "RECEIVER_EMAIL",
+    "KAKAO_REST_API_KEY",
+    "KAKAO_ACCESS_TOKEN",
+    "KAKAO_REFRESH_TOKEN",
+    "GITHUB_TOKEN",
+]
+
+
+def _wait_with_rusage(process):
+    # 해당 자식 프로세스만의 최대 RSS를 얻기 위해 wait4 사용 (RUSAGE_CHILDREN은 누적 최대값)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # Linux는 KB, macOS는 bytes 단위
+    scale = 1 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss * scale
+
+
+def run_once(orders, latency_ms, history_files, graphs, workdir, worksheet_rows=0):
+    """주문 orders건으로 파이프라인 1회 실행 후 측정값 dict 반환"""
+    output_dir = os.path.join(workdir, "output")
+    env = {k: v for k, v in os.environ.items() if k not in BLOCKED_ENV}
+    env.update(
+        {
+            "GOOGLE_BACKEND": "fake",
+            "FAKE_ORDERS": str(orders),
+            "FAKE_LATENCY_MS": str(latency_ms),
+            "FAKE_HISTORY_FILES": str(history_files),
+            "FAKE_WORKSHEET_ROWS": str(worksheet_rows),
+            "LIMIT": str(orders),
+            "PACING_SCALE": "0",
+            "GENERATE_GRAPHS": "true" if graphs else "false",
+            "GITHUB_UPLOAD": "false",
+            "HISTORY_CACHE_DIR": os.path.join(output_dir, "history_cache"),
+            "SHEET_CACHE_DIR": os.path.join(output_dir, "sheet_cache"),
+            "TRACE_OUTPUT": os.path.join(output_dir, "trace.json"),
+            "API_METRICS_DIR": output_dir,
+            "KAKAO_TOKEN_CACHE": os.path.join(workdir, "kakao_token.json"),
+            "MPLBACKEND": "Agg",
+            "PYTHONUNBUFFERED": "1",
+        }
+    )
+    log_path = os.path.join(workdir, "run.log")
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(
+            [sys.executable, SCRIPT], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        peak_rss = _wait_with_rusage(process)
+    wall = time.perf_counter() - start
+
+    endpoints = {}
+    metrics_path = os.path.join(output_dir, "api_metrics.json")
+    if os.path.exists(metrics_path):
+        with open(metrics_path, encoding="utf-8") as f:
+            endpoints = {
+                name: stats["requests"] for name, stats in json.load(f)["endpoints"].items()
+            }
+    return {
+        "orders": orders,
+        "exit_code": process.returncode,
+        "wall_seconds": round(wall, 3),
+        "api_calls": sum(endpoints.values()),
+        "api_calls_by_endpoint": endpoints,
+        "peak_rss_mb": round(peak_rss / 1024 / 1024, 1),
+        "log": log_path,
+    }
+
+
+def print_results(results):
+    print("\n📊 파이프라인 벤치마크 결과:")
+    print(f"   {'주문 수':>8} {'소요(초)':>10} {'API 호출':>10} {'최대 RSS(MB)':>14} {'종료 코드':>10}")
+    for r in results:
+        print(
+            f"   {r['orders']:>8} {r['wall_seconds']:>10.2f} {r['api_calls']:>10} "
+            f"{r['peak_rss_mb']:>14.1f} {r['exit_code']:>10}"
+        )
+    for r in results:
+        top = sorted(r["api_calls_by_endpoint"].items(), key=lambda item: -item[1])[:5]
+        summary = ", ".join(f"{name} {count}" for name, count in top)
+        print(f"   - {r['orders']}건 엔드포인트 상위: {summary or '없음'}")
+        if r["exit_code"] != 0:
+            print(f"   ❌ {r['orders']}건 실행 실패, 로그: {r['log']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 Google API로 전체 파이프라인 벤치마크")
+    parser.add_argument("--orders", type=int, nargs="+", default=[10, 200, 2000])
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="요청당 지연 시간 (ms)")
+    parser.add_argument("--history-files", type=int, default=14, help="과거 결과 JSON 파일 수")
+    parser.add_argument(
+        "--worksheet-rows", type=int, default=0, help="주문별 WORKSHEET 작업 행 수 (0이면 기본 20행)"
+    )
+    parser.add_argument("--graphs", action="store_true", help="주문별 그래프 생성/업로드 포함")
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="같은 작업 폴더에서 한 번 먼저 실행해 캐시(히스토리, 시트 구조/메타데이터)를 채운 뒤 측정",
+    )
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--keep", action="store_true", help="실행 폴더(로그, 산출물) 유지")
+    args = parser.parse_args()
+
+    results = []
+    for orders in args.orders:
+        workdir = tempfile.mkdtemp(prefix=f"pda_bench_{orders}_")
+        if args.warm:
+            print(f"🔥 {orders}건 캐시 예열 실행 중... (작업 폴더: {workdir})")
+            run_once(
+                orders, args.latency_ms, args.history_files, args.graphs, workdir, args.worksheet_rows
+            )
+        print(f"🚀 {orders}건 실행 중... (작업 폴더: {workdir})")
+        result = run_once(
+            orders, args.latency_ms, args.history_files, args.graphs, workdir, args.worksheet_rows
+        )
+        print(
+            f"   ⏱️ {result['wall_seconds']:.2f}초, API {result['api_calls']}회, "
+            f"최대 RSS {result['peak_rss_mb']:.1f}MB"
+        )
+        results.append(result)
+        if not args.keep and result["exit_code"] == 0:
+            shutil.rmtree(workdir, ignore_errors=True)
+            result["log"] = None
+
+    print_results(results)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "latency_ms": args.latency_ms,
+                    "graphs": args.graphs,
+                    "worksheet_rows": args.worksheet_rows,
+                    "warm": args.warm,
+                    "results": results,
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        print(f"💾 벤치마크 결과 저장: {args.output}")
+    return 0 if all(r["exit_code"] == 0 for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
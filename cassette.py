@@ -0,0 +1,169 @@
+"""
+Google API 응답 녹화/재생 (cassette)
+GOOGLE_BACKEND=record: 실제 Sheets/Drive 응답을 메서드 + 정규화된 인자 키로 압축 cassette에 기록
+GOOGLE_BACKEND=replay: cassette의 응답만으로 실행 (네트워크/자격 증명 불필요)
+HTTP 전송 계층(http.request)에서 가로채므로 요청 생성, 백오프, 트레이스/API 집계 경로는 실제 실행과 같습니다.
+운영 데이터 그대로 CPU/렌더링 단계를 오프라인에서 프로파일링하고 튜닝할 때 사용합니다.
+"""
+
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+import httplib2
+
+CASSETTE_VERSION = 1
+
+
+def _canonical_body(body, headers):
+    """요청 본문 정규화: JSON은 키 정렬, multipart 업로드는 메타데이터 JSON만 사용 (미디어 bytes 제외)"""
+    if not body:
+        return ""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    content_type = {k.lower(): v for k, v in (headers or {}).items()}.get("content-type", "")
+    boundary = re.search(r'boundary="?([^";]+)"?', content_type)
+    if content_type.startswith("multipart/") and boundary:
+        for part in body.split(b"--" + boundary.group(1).encode()):
+            head, _, payload = part.partition(b"\r\n\r\n")
+            if not payload:
+                head, _, payload = part.partition(b"\n\n")
+            if b"application/json" in head:
+                body = payload.strip()
+                break
+        else:
+            return ""
+    try:
+        return json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False)
+    except ValueError:
+        return hashlib.sha1(body).hexdigest()
+
+
+def request_keys(uri, method, body=None, headers=None):
+    """
+    (정확 키, 느슨한 키)
+    정확 키: 메서드 + 경로 + 정렬된 쿼리 + 정규화 본문
+    느슨한 키: 메서드 + 경로 (업로드 파일명에 실행 시각이 들어가는 등 본문이 매번 다른 요청용)
+    """
+    parts = urlsplit(uri)
+    query = sorted(parse_qsl(parts.query, keep_blank_values=True))
+    loose = f"{method} {parts.path}"
+    exact = json.dumps(
+        [loose, query, _canonical_body(body, headers)], ensure_ascii=False
+    )
+    return exact, loose
+
+
+def _encode_content(content):
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_content(entry):
+    if "text" in entry:
+        return entry["text"].encode("utf-8")
+    return base64.b64decode(entry["base64"])
+
+
+class CassetteRecorder:
+    """여러 서비스(sheets, drive)의 응답을 하나의 cassette에 모아 종료 시 저장"""
+
+    def __init__(self, path):
+        self.path = path
+        self.interactions = []
+        self._lock = threading.Lock()
+        atexit.register(self.save)
+
+    def wrap(self, http):
+        return RecordingHttp(http, self)
+
+    def record(self, uri, method, body, headers, resp, content):
+        exact, loose = request_keys(uri, method, body, headers)
+        with self._lock:
+            self.interactions.append(
+                {
+                    "key": exact,
+                    "loose": loose,
+                    "status": resp.status,
+                    "headers": {k: v for k, v in resp.items() if k != "status"},
+                    **_encode_content(content or b""),
+                }
+            )
+
+    def save(self):
+        with self._lock:
+            interactions = list(self.interactions)
+        if not interactions:
+            return None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"version": CASSETTE_VERSION, "interactions": interactions}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        print(f"📼 cassette 저장 완료: {self.path} ({len(interactions)}개 응답)")
+        return self.path
+
+
+class RecordingHttp:
+    """실제 http 객체(AuthorizedHttp)를 감싸 모든 응답을 recorder에 기록"""
+
+    def __init__(self, http, recorder):
+        self.http = http
+        self.recorder = recorder
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        resp, content = self.http.request(uri, method, body=body, headers=headers, **kwargs)
+        self.recorder.record(uri, method, body, headers, resp, content)
+        return resp, content
+
+
+class ReplayHttp:
+    """
+    cassette 응답을 돌려주는 http 대역
+    같은 키가 여러 번 기록됐으면 기록 순서대로, 기록보다 많이 호출되면 마지막 응답을 재사용합니다.
+    정확 키가 없으면 같은 메서드/경로의 응답을 기록 순서대로 사용합니다.
+    """
+
+    def __init__(self, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            cassette = json.load(f)
+        if cassette.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"지원하지 않는 cassette 버전입니다: {cassette.get('version')}")
+        self.by_key = {}
+        self.by_loose = {}
+        for entry in cassette["interactions"]:
+            self.by_key.setdefault(entry["key"], []).append(entry)
+            self.by_loose.setdefault(entry["loose"], []).append(entry)
+        self.positions = {}
+        self.misses = 0
+        self._lock = threading.Lock()
+        print(f"📼 cassette 재생: {path} ({len(cassette['interactions'])}개 응답)")
+
+    def _next(self, table, key):
+        entries = table.get(key)
+        if not entries:
+            return None
+        position = self.positions.get((id(table), key), 0)
+        self.positions[(id(table), key)] = position + 1
+        return entries[min(position, len(entries) - 1)]
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        exact, loose = request_keys(uri, method, body, headers)
+        with self._lock:
+            entry = self._next(self.by_key, exact) or self._next(self.by_loose, loose)
+            if entry is None:
+                self.misses += 1
+        if entry is None:
+            # 기록에 없는 요청은 404로 응답해 호출부의 기존 오류 처리 경로를 따름
+            print(f"⚠️ cassette에 없는 요청: {method} {uri}")
+            return httplib2.Response({"status": 404}), b'{"error": {"code": 404, "message": "cassette miss"}}'
+        resp = httplib2.Response({**entry["headers"], "status": entry["status"]})
+        return resp, _decode_content(entry)
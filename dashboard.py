@@ -0,0 +1,321 @@
+"""
+데이터 기반 PDA 대시보드
+주문별 결과를 압축 JSON 데이터 파일(partner_data.json)로 저장하고,
+필터/정렬/상세 펼치기는 고정 크기의 정적 HTML 셸(partner.html)이 브라우저에서 처리합니다.
+이메일에는 요약만 담으므로 주문 수가 늘어도 HTML 생성 시간과 크기가 일정합니다.
+"""
+
+import json
+import os
+
+from order_result import CATEGORIES, CATEGORY_INDEX, TMS
+
+DASHBOARD_DATA_VERSION = 1
+
+# 상세 보기 카테고리 순서 (기존 HTML 리포트와 동일)
+DETAIL_CATEGORIES = list(CATEGORIES)
+
+# rows 배열의 컬럼 순서 (키 반복 없이 위치로 저장)
+ROW_COLUMNS = [
+    "order_no",
+    "model_name",
+    "mech_partner",
+    "elec_partner",
+    "total_tasks",
+    "mech_nan",
+    "mech_ot",
+    "mech_progress",
+    "mech_total",
+    "elec_nan",
+    "elec_ot",
+    "elec_progress",
+    "elec_total",
+    "tms_nan",
+    "tms_ot",
+    "tms_progress",
+    "tms_total",
+    "spreadsheet_url",
+    "graph_links",
+    "details",
+]
+
+
+def _order_details(result, format_hours):
+    # 작업이 있는 카테고리만 [전체, NaN, OT, NaN 작업, [OT 작업, 시간]] 형태로 저장
+    details = {}
+    for category in DETAIL_CATEGORIES:
+        index = CATEGORY_INDEX[category]
+        if not result.total_counts[index]:
+            continue
+        details[category] = [
+            result.total_counts[index],
+            result.nan_counts[index],
+            result.ot_counts[index],
+            result.nan_tasks(category),
+            [
+                [task, format_hours(hours)]
+                for task, hours in result.ot_task_details(category)
+            ],
+        ]
+    return details
+
+
+def build_dashboard_payload(
+    all_results,
+    execution_time,
+    year,
+    week_num,
+    format_hours,
+    trend_links=None,
+):
+    """
+    처리 결과를 대시보드 데이터 구조로 변환합니다. (결과 -> 압축 JSON 구조)
+    trend_links: [(라벨, URL)] 트렌드 지표 링크
+    format_hours: 오버타임 시간 표시 함수 (PDA_partner.format_hours)
+    """
+    rows = []
+    for result in all_results:
+        mech_nan, elec_nan = result.partner_nan
+        mech_ot, elec_ot = result.partner_ot
+        prog_mech, prog_elec, prog_tms = result.progress
+        graph_links = list(result.links)
+        rows.append(
+            [
+                result.order_no,
+                result.model_name,
+                result.mech_partner,
+                result.elec_partner,
+                result.total_tasks,
+                mech_nan,
+                mech_ot,
+                round(prog_mech, 1),
+                0,  # 협력사 통계에는 전체 작업 수가 없음 (기존 값 유지)
+                elec_nan,
+                elec_ot,
+                round(prog_elec, 1),
+                0,
+                result.nan_counts[TMS],
+                result.ot_counts[TMS],
+                round(prog_tms, 1),
+                result.total_counts[TMS],
+                result.spreadsheet_url,
+                graph_links if any(graph_links) else None,
+                _order_details(result, format_hours),
+            ]
+        )
+
+    return {
+        "version": DASHBOARD_DATA_VERSION,
+        "execution_time": execution_time,
+        "year": year,
+        "week": week_num,
+        "trend_links": [[label, url] for label, url in (trend_links or []) if url],
+        "columns": ROW_COLUMNS,
+        "rows": rows,
+    }
+
+
+def summarize_payload(payload, top_n=10):
+    """요약 지표 계산: 카테고리별 NaN/OT 합계와 NaN 상위 주문"""
+    col = {name: i for i, name in enumerate(payload["columns"])}
+    totals = {
+        key: sum(row[col[key]] for row in payload["rows"])
+        for key in ["mech_nan", "mech_ot", "elec_nan", "elec_ot", "tms_nan", "tms_ot"]
+    }
+
+    def nan_sum(row):
+        return row[col["mech_nan"]] + row[col["elec_nan"]] + row[col["tms_nan"]]
+
+    top = sorted(
+        (row for row in payload["rows"] if nan_sum(row) > 0),
+        key=nan_sum,
+        reverse=True,
+    )[:top_n]
+    return totals, [
+        (row[col["order_no"]], row[col["model_name"]], nan_sum(row), row[col["spreadsheet_url"]])
+        for row in top
+    ]
+
+
+def build_summary_email_body(payload, dashboard_link, top_n=10):
+    """이메일용 요약 HTML (주문별 상세는 대시보드에서 확인)"""
+    totals, top_orders = summarize_payload(payload, top_n)
+    lines = [
+        f"<h1>PDA Dashboard - {payload['year']}년 {payload['week']}주차</h1>",
+        f"<h3>📌 [알림] PDA Overtime 및 NaN 체크 결과 (총 {len(payload['rows'])}건 처리)</h3>",
+        f"<p>📅 실행 시간: {payload['execution_time']} (KST)</p>",
+        f'<p>📊 주문별 상세 내용은 <a href="{dashboard_link}">대시보드</a>에서 확인하세요!</p>',
+        '<table border="1" style="border-collapse: collapse; font-size: 13px;">',
+        "<tr><th>구분</th><th>NaN</th><th>OT</th></tr>",
+    ]
+    for label, key in [("기구", "mech"), ("전장", "elec"), ("TMS", "tms")]:
+        lines.append(
+            f"<tr><td>{label}</td><td>{totals[key + '_nan']}</td><td>{totals[key + '_ot']}</td></tr>"
+        )
+    lines.append("</table>")
+
+    if top_orders:
+        lines.append(f"<h4>NaN 상위 {len(top_orders)}건</h4><ul>")
+        for order_no, model_name, nan_count, url in top_orders:
+            lines.append(
+                f'<li><a href="{url}">{order_no}</a> ({model_name}): NaN {nan_count}건</li>'
+            )
+        lines.append("</ul>")
+
+    if payload["trend_links"]:
+        lines.append("<p><strong>📊트렌드 지표</strong></p><ul>")
+        for label, url in payload["trend_links"]:
+            lines.append(f'<li>{label}: <a href="{url}" target="_blank">그래프 보기</a></li>')
+        lines.append("</ul>")
+    return "\n".join(lines)
+
+
+def write_dashboard(
+    payload, output_filename="partner.html", data_filename="partner_data.json"
+):
+    """
+    정적 HTML 셸과 압축 JSON 데이터 파일을 저장합니다.
+    셸은 같은 폴더의 데이터 파일을 읽어 렌더링하므로 두 파일을 함께 배포해야 합니다.
+    반환: (셸 경로, 데이터 경로)
+    """
+    data_dir = os.path.dirname(output_filename)
+    data_path = os.path.join(data_dir, os.path.basename(data_filename))
+    with open(data_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    with open(output_filename, "w", encoding="utf-8") as f:
+        f.write(DASHBOARD_SHELL.replace("__DATA_FILE__", os.path.basename(data_path)))
+    print(
+        f"📄 대시보드 생성 완료: {output_filename} + {data_path} "
+        f"({os.path.getsize(data_path) / 1024:.1f}KB, {len(payload['rows'])}건)"
+    )
+    return output_filename, data_path
+
+
+# 주문 수와 무관한 고정 크기 셸 (필터/정렬/상세 펼치기는 브라우저에서 처리)
+DASHBOARD_SHELL = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="UTF-8">
+  <title>PDA Dashboard</title>
+  <style>
+    body { font-family: 'NanumGothic', sans-serif; font-size: 12px; margin: 20px; }
+    table { border-collapse: collapse; width: 95%; margin-bottom: 20px; font-size: 13px; }
+    th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+    th { background-color: #f2f2f2; cursor: pointer; }
+    select { width: 100%; font-size: 12px; }
+    .bad { color: red; font-weight: bold; }
+    .bar { width: 100%; background-color: #e0e0e0; height: 12px; border-radius: 3px; }
+    .bar > div { background-color: orange; height: 100%; border-radius: 3px; }
+    tr.detail td { background-color: #fafafa; }
+    ul { margin: 5px 0; padding-left: 20px; }
+    p { margin: 5px 0; }
+    a { color: #0056b3; text-decoration: none; }
+    a:hover { text-decoration: underline; }
+  </style>
+</head>
+<body>
+  <div class="chart-section" style="margin-top: 30px;">
+    <iframe src="partner_entry_chart.html" width="100%" height="1200" frameborder="0"></iframe>
+  </div>
+  <h1 id="title">PDA Dashboard</h1>
+  <h3 id="headline"></h3>
+  <p id="executed"></p>
+  <div id="trends"></div>
+  <h4>요약 테이블</h4>
+  <table id="summaryTable"><thead><tr id="headerRow"></tr></thead><tbody id="body"></tbody></table>
+  <script>
+  const HEADERS = [
+    ["Order", "order_no"], ["모델명", "model_name"], ["기구협력사", "mech_partner"],
+    ["전장협력사", "elec_partner"], ["총 작업 수", "total_tasks"],
+    ["기구 NaN", "mech_nan"], ["기구 OT", "mech_ot"], ["기구 진행률", "mech_progress"],
+    ["전장 NaN", "elec_nan"], ["전장 OT", "elec_ot"], ["전장 진행률", "elec_progress"],
+    ["TMS NaN", "tms_nan"], ["TMS OT", "tms_ot"], ["TMS 진행률", "tms_progress"],
+  ];
+  const PROGRESS_TOTAL = { mech_progress: "mech_total", elec_progress: "elec_total", tms_progress: "tms_total" };
+  const GRAPH_LABELS = ["Working Hours", "Legend Chart", "WD Chart"];
+  let data, col, filters = {}, sortKey = null, sortDesc = false;
+
+  function esc(v) {
+    return String(v ?? "").replace(/[&<>"]/g, c => ({ "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;" }[c]));
+  }
+  function display(row, key) {
+    const v = row[col[key]];
+    return key.endsWith("_progress") ? v.toFixed(1) : String(v);
+  }
+  function cell(row, key) {
+    const v = row[col[key]];
+    if (key === "order_no") return `<a href="${esc(row[col.spreadsheet_url])}">${esc(v)}</a>`;
+    if (key.endsWith("_progress")) {
+      const total = row[col[PROGRESS_TOTAL[key]]];
+      const tip = `완료: ${Math.round(v / 100 * total)} / ${total}건`;
+      if (v === 100) return `<span title="${tip}" style="font-size: 16px;">✅</span>`;
+      return `<div class="bar"><div style="width: ${v}%" title="${tip}"></div></div>${v.toFixed(1)}%`;
+    }
+    return esc(v);
+  }
+  function details(row) {
+    const out = [];
+    const links = row[col.graph_links];
+    if (links) {
+      out.push("<p>📊 그래프 링크:</p><ul>" + links.map((url, i) =>
+        url ? `<li>${GRAPH_LABELS[i]}: <a href="${esc(url)}">바로가기</a></li>` : "").join("") + "</ul>");
+    }
+    for (const [category, [total, nan, ot, nanTasks, otTasks]] of Object.entries(row[col.details])) {
+      out.push(`<p><b>🔹 ${esc(category)} 작업</b><br> - 전체 작업 수: ${total} 건<br>`);
+      out.push(`<span class="${nan ? "bad" : ""}">⚠️ 누락(NaN): ${nan} 건 (비율: ${(nan / total * 100).toFixed(2)}%)</span><br>`);
+      out.push(nanTasks.map(t => `&nbsp;&nbsp;- ${esc(t)}<br>`).join(""));
+      out.push(`<span class="${ot ? "bad" : ""}">⏳ 오버타임: ${ot} 건 (비율: ${(ot / total * 100).toFixed(2)}%)</span><br>`);
+      out.push(otTasks.map(([t, h]) => `&nbsp;&nbsp;- ${esc(t)} ${esc(h)}<br>`).join("") + "</p>");
+    }
+    return out.join("");
+  }
+  function render() {
+    let rows = data.rows.map((row, i) => [row, i]).filter(([row]) =>
+      Object.entries(filters).every(([key, val]) => !val || display(row, key) === val));
+    if (sortKey) {
+      rows.sort(([a], [b]) => {
+        const x = a[col[sortKey]], y = b[col[sortKey]];
+        return (x < y ? -1 : x > y ? 1 : 0) * (sortDesc ? -1 : 1);
+      });
+    }
+    document.getElementById("body").innerHTML = rows.map(([row, i]) => {
+      return `<tr onclick="toggle(${i})">` + HEADERS.map(([, key]) => {
+        const bad = /_(nan|ot)$/.test(key) && row[col[key]] > 0 ? ' class="bad"' : "";
+        return `<td${bad}>${cell(row, key)}</td>`;
+      }).join("") + `</tr><tr class="detail" id="detail-${i}" style="display: none;"><td colspan="${HEADERS.length}"></td></tr>`;
+    }).join("");
+  }
+  function toggle(i) {
+    const tr = document.getElementById(`detail-${i}`);
+    if (tr.style.display === "none" && !tr.firstChild.innerHTML) tr.firstChild.innerHTML = details(data.rows[i]);
+    tr.style.display = tr.style.display === "none" ? "" : "none";
+  }
+  function sortBy(key) {
+    sortDesc = sortKey === key ? !sortDesc : false;
+    sortKey = key;
+    render();
+  }
+  function buildHeader() {
+    document.getElementById("headerRow").innerHTML = HEADERS.map(([label, key]) => {
+      const values = [...new Set(data.rows.map(row => display(row, key)))].sort();
+      return `<th onclick="sortBy('${key}')">${label}<br><select onclick="event.stopPropagation()" onchange="filters['${key}'] = this.value; render()">` +
+        `<option value="">전체</option>` + values.map(v => `<option value="${esc(v)}">${esc(v)}</option>`).join("") + "</select></th>";
+    }).join("");
+  }
+  fetch("__DATA_FILE__").then(r => r.json()).then(payload => {
+    data = payload;
+    col = Object.fromEntries(data.columns.map((name, i) => [name, i]));
+    document.getElementById("title").textContent = `PDA Dashboard - ${data.year}년 ${data.week}주차`;
+    document.getElementById("headline").textContent = `📌 [알림] PDA Overtime 및 NaN 체크 결과 (총 ${data.rows.length}건 처리)`;
+    document.getElementById("executed").textContent = `📅 실행 시간: ${data.execution_time} (KST)`;
+    if (data.trend_links.length) {
+      document.getElementById("trends").innerHTML = "<p><strong>📊트렌드 지표</strong></p><ul>" +
+        data.trend_links.map(([label, url]) => `<li>${esc(label)}: <a href="${esc(url)}" target="_blank">그래프 보기</a></li>`).join("") + "</ul>";
+    }
+    buildHeader();
+    render();
+  });
+  </script>
+</body>
+</html>
+"""
@@ -0,0 +1,529 @@
+"""
+오프라인 Google API 대역 (벤치마크용)
+PDA_partner가 사용하는 sheets/drive 호출 체인만 메모리에서 흉내 내어
+자격 증명 없이 전체 파이프라인(추출 -> 히트맵 -> 리포트)을 실행할 수 있게 합니다.
+  - sheets: spreadsheets().get / batchUpdate, spreadsheets().values().get / batchGet,
+            new_batch_http_request
+  - drive : files().list / create / get_media, permissions().create
+주문 스프레드시트와 과거 결과 JSON은 시드 기반으로 결정적으로 생성되며,
+모든 execute()는 지정한 지연 시간만큼 대기한 뒤 tracing/api_metrics에 기록됩니다.
+GOOGLE_BACKEND=fake 로 실행하면 PDA_partner가 실제 서비스 대신 이 모듈을 사용합니다.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from api_metrics import calling_function, record_request
+from tracing import span
+
+FAKE_MODELS = ["GAIA-I DUAL", "GAIA-I", "DRAGON", "GAIA-II", "SWS-I", "GAIA-P"]
+FAKE_MECH_PARTNERS = ["BAT", "FNI", "TMS"]
+FAKE_ELEC_PARTNERS = ["C&A", "P&S", "TMS"]
+
+# 분류별 대표 작업 (기구/TMS_반제품/전장/검사/마무리가 모두 나오도록 구성)
+FAKE_TASKS = [
+    "CABINET ASSY",
+    "BURNER ASSY(TMS)",
+    "WET TANK ASSY(TMS)",
+    "3-WAY VALVE ASSY",
+    "N2 LINE ASSY",
+    "CDA LINE ASSY",
+    "PCW LINE ASSY",
+    "COOLING UNIT(TMS)",
+    "REACTOR ASSY(TMS)",
+    "HEATING JACKET",
+    "AC 백 판넬 작업",
+    "DC 백 판넬 작업",
+    "판넬 취부 및 선분리",
+    "탱크 작업",
+    "탱크 도킹 후 결선 작업",
+    "LNG/Util",
+    "Chamber",
+    "I/O 체크, 가동 검사, 전장 마무리",
+    "캐비넷 커버 장착 및 포장",
+    "상부 마무리",
+]
+WEEKDAY_KOR = ["월", "화", "수", "목", "금", "토", "일"]
+
+
+def korean_datetime(dt):
+    """시트 표시 형식 타임스탬프 (예: 2025. 7. 14 오후 3:05:00)"""
+    period = "오전" if dt.hour < 12 else "오후"
+    hour = dt.hour % 12 or 12
+    return f"{dt.year}. {dt.month}. {dt.day} {period} {hour}:{dt.minute:02d}:{dt.second:02d}"
+
+
+def _split_range(a1_range):
+    sheet, _, cells = a1_range.rpartition("!")
+    return sheet.strip("'"), cells
+
+
+def _column_index(letters):
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - ord("A") + 1
+    return index - 1
+
+
+def _slice_values(values, cells, major_dimension="ROWS"):
+    """A1 범위(예: B7:B120, 7:7, A1:Z100)만 잘라 Sheets처럼 뒤쪽 빈 칸/빈 행을 제거해 반환"""
+    match = re.fullmatch(r"([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?", cells or "")
+    if not match:
+        return values
+    col1, row1, col2, row2 = match.groups()
+    col2 = col1 if match.group(3) is None else col2
+    row2 = row1 if match.group(3) is None else row2
+    first_col = _column_index(col1) if col1 else 0
+    last_col = _column_index(col2) + 1 if col2 else None
+    rows = values[int(row1) - 1 if row1 else 0 : int(row2) if row2 else None]
+    rows = [row[first_col:last_col] for row in rows]
+    if major_dimension == "COLUMNS":
+        width = max((len(row) for row in rows), default=0)
+        rows = [[row[i] if i < len(row) else "" for row in rows] for i in range(width)]
+    trimmed = []
+    for row in rows:
+        while row and row[-1] == "":
+            row = row[:-1]
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+def _payload_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+class FakeRequest:
+    """execute() 시 지연 후 handler 결과를 반환하는 요청 (span + 엔드포인트 집계 기록)"""
+
+    def __init__(self, backend, api, endpoint, handler, body=None):
+        self.backend = backend
+        self.api = api
+        self.endpoint = endpoint
+        self.handler = handler
+        self.body = body
+
+    def execute(self, http=None, num_retries=0):
+        caller = calling_function()
+        start = time.perf_counter()
+        with span(f"{self.api}.{self.endpoint}", "api", fake=True):
+            if self.backend["latency"]:
+                time.sleep(self.backend["latency"])
+            result = self.handler()
+        record_request(
+            self.api,
+            self.endpoint,
+            caller,
+            time.perf_counter() - start,
+            200,
+            _payload_size(self.body),
+            _payload_size(result),
+        )
+        return result
+
+
+class FakeBatchRequest:
+    """new_batch_http_request 대역: 묶인 요청을 한 번의 왕복으로 처리"""
+
+    def __init__(self, backend, callback=None, api="sheets"):
+        self.backend = backend
+        self.callback = callback
+        self.api = api
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        request_id = request_id or str(len(self.requests) + 1)
+        self.requests.append((request_id, request, callback or self.callback))
+
+    def _run(self):
+        for request_id, request, callback in self.requests:
+            response = request.handler()
+            if callback:
+                callback(request_id, response, None)
+        return None
+
+    def execute(self, http=None):
+        return FakeRequest(self.backend, self.api, "batch", self._run).execute()
+
+
+class _Resource:
+    """메서드 호출 시 FakeRequest를 만드는 리소스 (spreadsheets(), values(), files() 등)"""
+
+    def __init__(self, backend, api, prefix, handlers, children=None):
+        self._backend = backend
+        self._api = api
+        self._prefix = prefix
+        self._handlers = handlers
+        self._children = children or {}
+
+    def __getattr__(self, name):
+        if name in self._children:
+            return lambda: self._children[name]
+        if name not in self._handlers:
+            raise AttributeError(f"fake {self._api} 리소스에 '{self._prefix}{name}'이 없습니다.")
+        handler = self._handlers[name]
+
+        def method(**kwargs):
+            return FakeRequest(
+                self._backend,
+                self._api,
+                f"{self._prefix}{name}",
+                lambda: handler(**kwargs),
+                body=kwargs.get("body"),
+            )
+
+        return method
+
+
+class _Service:
+    def __init__(self, resources, batch_factory=None):
+        self._resources = resources
+        self._batch_factory = batch_factory
+
+    def __getattr__(self, name):
+        if name == "new_batch_http_request" and self._batch_factory:
+            return self._batch_factory
+        if name in self._resources:
+            return lambda: self._resources[name]
+        raise AttributeError(name)
+
+
+def _order(backend, index):
+    """주문 index의 메타데이터 + WORKSHEET 값 (결정적 생성, 한 번 생성 후 재사용)"""
+    cache = backend["orders"]
+    if index in cache:
+        return cache[index]
+    rng = random.Random(f"{backend['seed']}:order:{index}")
+    start_day = backend["base_date"] - timedelta(days=rng.randint(0, 60))
+    rows = [[f"PDA {index}"]] + [[] for _ in range(5)]
+    rows.append(["No", "내용", "시작 시간", "완료 시간", "진행율"])
+    # worksheet_rows가 작업 수보다 많으면 재작업 루프처럼 같은 작업이 반복되는 긴 시트
+    task_rows = backend["worksheet_rows"] or len(FAKE_TASKS)
+    for no in range(1, task_rows + 1):
+        task = FAKE_TASKS[(no - 1) % len(FAKE_TASKS)]
+        started = start_day + timedelta(days=rng.randint(0, 14), hours=rng.randint(8, 16))
+        # 주말을 넘기는 작업, 누락(NaN), 장기 작업(OT)이 섞이도록 생성
+        finished = started + timedelta(hours=rng.choice([1, 2, 4, 6, 9, 30, 60]))
+        missing = rng.random() < backend["nan_rate"]
+        rows.append(
+            [
+                str(no),
+                task,
+                korean_datetime(started),
+                "" if missing else korean_datetime(finished),
+                "" if missing else f"{rng.choice([50, 80, 100, 100])}%",
+            ]
+        )
+    order = {
+        "order_no": f"ORD-{index:05d}",
+        "model": rng.choice(FAKE_MODELS),
+        "mech_partner": rng.choice(FAKE_MECH_PARTNERS),
+        "elec_partner": rng.choice(FAKE_ELEC_PARTNERS),
+        "mech_start": start_day.strftime("%Y-%m-%d"),
+        "worksheet": rows,
+    }
+    with backend["lock"]:
+        cache[index] = order
+    return order
+
+
+def _order_index(backend, spreadsheet_id):
+    match = re.fullmatch(r"fakeorder(\d+)", spreadsheet_id or "")
+    if match and int(match.group(1)) < backend["order_count"]:
+        return int(match.group(1))
+    return None
+
+
+def _ledger_values(backend, formula):
+    rows = [["Order No", "", "", "제품명"]]
+    for index in range(backend["order_count"]):
+        if formula:
+            url = f"https://docs.google.com/spreadsheets/d/fakeorder{index}/edit"
+            rows.append([f'=HYPERLINK("{url}", "ORD-{index:05d}")'])
+        else:
+            rows.append([f"ORD-{index:05d}"])
+    return rows
+
+
+def _avg_values(model):
+    rng = random.Random(f"avg:{model}")
+    return [["작업", "평균"]] + [
+        [task, f"{rng.randint(1, 8)}h {rng.choice([0, 15, 30, 45])}m"] for task in FAKE_TASKS
+    ]
+
+
+def _info_value(backend, spreadsheet_id, cells):
+    index = _order_index(backend, spreadsheet_id)
+    if index is None:
+        return []
+    order = _order(backend, index)
+    key = {"D4": "model", "B5": "mech_partner", "D5": "elec_partner", "B6": "mech_start"}.get(cells)
+    return [[order[key]]] if key else []
+
+
+def _values_get(
+    backend, spreadsheetId, range, valueRenderOption=None, majorDimension="ROWS", **_
+):
+    sheet, cells = _split_range(range)
+    if sheet == "정보판":
+        values = _info_value(backend, spreadsheetId, cells)
+    elif sheet == "WORKSHEET":
+        index = _order_index(backend, spreadsheetId)
+        worksheet = _order(backend, index)["worksheet"] if index is not None else []
+        values = _slice_values(worksheet, cells, majorDimension)
+    elif sheet.upper() in FAKE_MODELS:
+        values = _avg_values(sheet.upper())
+    else:
+        values = _ledger_values(backend, valueRenderOption == "FORMULA")
+    return {"range": range, "values": values}
+
+
+def _values_batch_get(backend, spreadsheetId, ranges, **kwargs):
+    return {
+        "spreadsheetId": spreadsheetId,
+        "valueRanges": [_values_get(backend, spreadsheetId, rng, **kwargs) for rng in ranges],
+    }
+
+
+def _ledger_row_data(backend):
+    """includeGridData/fields 마스크 응답의 rowData (A열: 표시 값 + 링크 + HYPERLINK 수식)"""
+    rows = []
+    for display_row, formula_row in zip(
+        _ledger_values(backend, False), _ledger_values(backend, True)
+    ):
+        cells = [{"formattedValue": value} for value in display_row]
+        formula = formula_row[0]
+        if formula.startswith("=HYPERLINK("):
+            cells[0]["hyperlink"] = formula.split('"')[1]
+            cells[0]["userEnteredValue"] = {"formulaValue": formula}
+        rows.append({"values": cells})
+    return rows
+
+
+def _spreadsheet_get(backend, spreadsheetId, ranges=None, **_):
+    index = _order_index(backend, spreadsheetId)
+    if index is not None:
+        order = _order(backend, index)
+        return {
+            "properties": {"title": order["order_no"]},
+            "sheets": [
+                {
+                    "properties": {
+                        "sheetId": 0,
+                        "title": "WORKSHEET",
+                        # 템플릿 기본 격자(100행)보다 작업 행이 많으면 행이 늘어난 시트
+                        "gridProperties": {"rowCount": max(len(order["worksheet"]), 100)},
+                    }
+                },
+                {
+                    "properties": {
+                        "sheetId": 1,
+                        "title": "정보판",
+                        "gridProperties": {"rowCount": 100},
+                    }
+                },
+            ],
+        }
+    titles = [backend["ledger_sheet"], "WORKSHEET", "정보판"]
+    requested = {_split_range(rng)[0] for rng in ranges or ()}
+    sheets = []
+    for sheet_id, title in enumerate(titles):
+        sheet = {"properties": {"title": title, "sheetId": sheet_id}}
+        if title in requested and title == backend["ledger_sheet"]:
+            sheet["data"] = [{"rowData": _ledger_row_data(backend)}]
+        sheets.append(sheet)
+    return {"properties": {"title": "출하예정리스트"}, "sheets": sheets}
+
+
+def _batch_update(backend, spreadsheetId, body, **_):
+    return {"spreadsheetId": spreadsheetId, "replies": [{} for _ in body.get("requests", [])]}
+
+
+def _history_record(rng, index):
+    stats = {}
+    for category, total in [("기구", 10), ("전장", 5), ("TMS_반제품", 4)]:
+        stats[category] = {
+            "total_count": total,
+            "nan_count": rng.randint(0, total // 2),
+            "ot_count": rng.randint(0, total // 3),
+        }
+    return {
+        "order_no": f"ORD-{index:05d}",
+        "model_name": rng.choice(FAKE_MODELS),
+        "mech_partner": rng.choice(FAKE_MECH_PARTNERS),
+        "elec_partner": rng.choice(FAKE_ELEC_PARTNERS),
+        "total_tasks": sum(s["total_count"] for s in stats.values()),
+        "ratios": {},
+        "links": {"order_href": f"https://docs.google.com/spreadsheets/d/fakeorder{index}/edit"},
+        "occurrence_stats": stats,
+        "partner_stats": {},
+        "spreadsheet_url": "",
+    }
+
+
+def _history_content(backend, file):
+    rng = random.Random(f"{backend['seed']}:history:{file['name']}")
+    data = {
+        "execution_time": file["execution_time"],
+        "results": [_history_record(rng, i) for i in range(backend["order_count"])],
+    }
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def _history_files(backend, json_folder_id, count):
+    """오늘부터 하루 간격으로 거슬러 올라가는 과거 결과 파일 목록 (내용은 다운로드 시 생성)"""
+    files = []
+    for day in range(count):
+        executed = backend["base_date"] - timedelta(days=day)
+        weekday = executed.weekday()
+        stamp = executed.strftime("%Y%m%d") + "_090000"
+        files.append(
+            {
+                "id": f"fakehistory{day}",
+                "name": f"nan_ot_results_{stamp}_{WEEKDAY_KOR[weekday]}_{weekday + 1}회차.json",
+                "parents": [json_folder_id],
+                "execution_time": stamp,
+                "content": None,
+            }
+        )
+    return files
+
+
+def _files_list(backend, q="", fields=None, pageSize=100, pageToken=None, **_):
+    folder = re.search(r"'([^']+)' in parents", q or "")
+    contains = re.search(r"name contains '([^']+)'", q or "")
+    with backend["lock"]:
+        files = [
+            f
+            for f in backend["files"]
+            if (not folder or folder.group(1) in f["parents"])
+            and (not contains or contains.group(1) in f["name"])
+        ]
+    offset = int(pageToken or 0)
+    page = files[offset : offset + pageSize]
+    response = {"files": [{"id": f["id"], "name": f["name"]} for f in page]}
+    if offset + pageSize < len(files):
+        response["nextPageToken"] = str(offset + pageSize)
+    return response
+
+
+def _files_create(backend, body, media_body=None, fields=None, **_):
+    content = media_body.getbytes(0, media_body.size()) if media_body is not None else b""
+    with backend["lock"]:
+        file_id = f"fakefile{len(backend['files'])}"
+        backend["files"].append(
+            {
+                "id": file_id,
+                "name": body.get("name", file_id),
+                "parents": body.get("parents", []),
+                "content": content,
+            }
+        )
+    return {"id": file_id, "name": body.get("name", file_id)}
+
+
+def _files_get(backend, fileId, fields=None, **_):
+    if _order_index(backend, fileId) is not None:
+        # 주문 스프레드시트는 기준일 0시에 마지막으로 수정된 것으로 취급
+        modified = backend["base_date"].strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        return {"id": fileId, "modifiedTime": modified}
+    with backend["lock"]:
+        file = next((f for f in backend["files"] if f["id"] == fileId), None)
+    if file is None:
+        raise FileNotFoundError(f"fake drive에 파일이 없습니다: {fileId}")
+    return {"id": file["id"], "name": file["name"]}
+
+
+def _files_get_media(backend, fileId, **_):
+    with backend["lock"]:
+        file = next((f for f in backend["files"] if f["id"] == fileId), None)
+    if file is None:
+        raise FileNotFoundError(f"fake drive에 파일이 없습니다: {fileId}")
+    return file["content"] if file["content"] is not None else _history_content(backend, file)
+
+
+def _permissions_create(backend, fileId, body, **_):
+    return {"id": "anyoneWithLink", "type": body.get("type"), "role": body.get("role")}
+
+
+def build_fake_services(
+    orders=10,
+    latency=0.0,
+    history_files=14,
+    json_folder_id="fake-json-folder",
+    ledger_sheet="출하예정리스트(TEST)",
+    nan_rate=0.1,
+    seed=0,
+    base_date=None,
+    worksheet_rows=None,
+):
+    """
+    (sheets_service, drive_service) 대역 생성
+    orders: 원장 시트에 하이퍼링크로 연결된 주문 스프레드시트 수
+    latency: 요청(execute) 1회당 지연 시간 (초)
+    history_files: JSON 폴더에 미리 존재하는 과거 결과 파일 수 (하루 간격)
+    worksheet_rows: 주문별 WORKSHEET 작업 행 수 (기본값: FAKE_TASKS 수)
+    """
+    base = base_date or datetime.now()
+    backend = {
+        "latency": latency,
+        "order_count": orders,
+        "ledger_sheet": ledger_sheet,
+        "nan_rate": nan_rate,
+        "worksheet_rows": worksheet_rows,
+        "seed": seed,
+        "base_date": datetime(base.year, base.month, base.day),
+        "orders": {},
+        "files": [],
+        "lock": threading.Lock(),
+    }
+    backend["files"] = _history_files(backend, json_folder_id, history_files)
+
+    def bind(handler):
+        return lambda **kwargs: handler(backend, **kwargs)
+
+    values = _Resource(
+        backend,
+        "sheets",
+        "spreadsheets.values.",
+        {"get": bind(_values_get), "batchGet": bind(_values_batch_get)},
+    )
+    spreadsheets = _Resource(
+        backend,
+        "sheets",
+        "spreadsheets.",
+        {"get": bind(_spreadsheet_get), "batchUpdate": bind(_batch_update)},
+        children={"values": values},
+    )
+    files = _Resource(
+        backend,
+        "drive",
+        "files.",
+        {
+            "list": bind(_files_list),
+            "get": bind(_files_get),
+            "create": bind(_files_create),
+            "get_media": bind(_files_get_media),
+        },
+    )
+    permissions = _Resource(
+        backend, "drive", "permissions.", {"create": bind(_permissions_create)}
+    )
+    sheets_service = _Service(
+        {"spreadsheets": spreadsheets},
+        batch_factory=lambda callback=None, **_: FakeBatchRequest(backend, callback),
+    )
+    drive_service = _Service(
+        {"files": files, "permissions": permissions},
+        batch_factory=lambda callback=None, **_: FakeBatchRequest(backend, callback, "drive"),
+    )
+    return sheets_service, drive_service
@@ -5,19 +5,20 @@
 """
 
 import os
-import sys
-import json
-import re
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import matplotlib.font_manager as fm
-import numpy as np
-from datetime import datetime, timedelta
-import pytz
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 
+from nan_history import (
+    aggregate_records,
+    compute_heatmap_matrices,
+    iter_history_downloads,
+    iter_history_records,
+    monthly_variant,
+)
+
 # .env 파일에서 환경변수 로드
 from dotenv import load_dotenv
 load_dotenv()
@@ -84,7 +85,7 @@ def setup_font():
 
 # 월별 JSON 파일 로드 (3월~7월 트렌드)
 def load_monthly_json_files(drive_service, start_month=3, end_month=7):
-    """2025년 3월~7월 금요일 JSON 파일 로드 (트렌드 분석용)"""
+    """2025년 3월~7월 금요일 JSON 결과 레코드 이터레이터 (트렌드 분석용)"""
     JSON_DRIVE_FOLDER_ID = os.getenv("JSON_DRIVE_FOLDER_ID")
     
     all_files = []
@@ -101,146 +102,20 @@ def load_monthly_json_files(drive_service, start_month=3, end_month=7):
     for file in all_files:
         print(f"   - {file['name']}")
     
-    data_list = []
-    
-    for file in all_files:
-        file_name = file["name"]
-        print(f"📂 로딩 중: {file_name}")
-        
-        file_id = file["id"]
-        request = drive_service.files().get_media(fileId=file_id)
-        content = request.execute().decode("utf-8")
-        data = json.loads(content)
-        
-        # execution_time을 각 결과에 추가
-        for result in data["results"]:
-            result["execution_time"] = data["execution_time"]
-        
-        data_list.extend(data["results"])
-    
-    print(f"📊 총 {len(data_list)}개의 월별 데이터 로드 완료")
-    return data_list
-
-# ratio_calc 함수 (PDA_partner.py와 동일)
-def ratio_calc(stats):
-    """NaN 비율 계산"""
-    total = stats.get("total_count", 0)
-    nan_count = stats.get("nan_count", 0)
-    return (nan_count / total * 100) if total > 0 else 0.0
+    # 파일을 하나씩 내려받아 레코드를 스트리밍으로 반환 (기존 JSON / gzip NDJSON 자동 감지)
+    return iter_history_records(iter_history_downloads(drive_service, all_files))
 
 # 월별 트렌드 히트맵 생성 (3월~7월)
-def generate_monthly_trend_heatmap(data_list, group_by="partner"):
-    """3월~7월 데이터로 월별 트렌드 히트맵 생성 (PDA_partner.py 로직 기반)"""
-    
-    if not data_list:
-        print("❌ 월별 데이터가 없습니다.")
-        return None
-    
-    # DataFrame 생성 (PDA_partner.py와 동일한 로직)
-    df_data = []
-    for d in data_list:
-        execution_time = d["execution_time"]
-        occurrence_stats = d.get("occurrence_stats", {})
-        mech_partner = d.get("mech_partner", "").strip().upper()
-        elec_partner = d.get("elec_partner", "").strip().upper()
-
-        entry = {
-            "date": execution_time,
-            "model_name": d["model_name"],
-            "mech_partner": mech_partner,
-            "elec_partner": elec_partner,
-            "bat_nan_ratio": 0.0,
-            "fni_nan_ratio": 0.0,
-            "tms_m_nan_ratio": 0.0,
-            "cna_nan_ratio": 0.0,
-            "pns_nan_ratio": 0.0,
-            "tms_e_nan_ratio": 0.0,
-            "tms_semi_nan_ratio": 0.0,
-        }
-
-        # 기구 협력사별 NaN 비율 계산
-        if mech_partner == "BAT":
-            target = occurrence_stats.get("기구", {})
-            entry["bat_nan_ratio"] = ratio_calc(target)
-        elif mech_partner == "FNI":
-            target = occurrence_stats.get("기구", {})
-            entry["fni_nan_ratio"] = ratio_calc(target)
-        elif mech_partner == "TMS":
-            target = occurrence_stats.get("기구", {})
-            entry["tms_m_nan_ratio"] = ratio_calc(target)
-
-        # 전장 협력사별 NaN 비율 계산
-        if elec_partner == "C&A":
-            target = occurrence_stats.get("전장", {})
-            entry["cna_nan_ratio"] = ratio_calc(target)
-        elif elec_partner == "P&S":
-            target = occurrence_stats.get("전장", {})
-            entry["pns_nan_ratio"] = ratio_calc(target)
-        elif elec_partner == "TMS":
-            target = occurrence_stats.get("전장", {})
-            entry["tms_e_nan_ratio"] = ratio_calc(target)
-
-        # TMS 반제품 NaN 비율
-        tms_semi_stats = occurrence_stats.get("TMS_반제품", {})
-        entry["tms_semi_nan_ratio"] = ratio_calc(tms_semi_stats)
-
-        df_data.append(entry)
-
-    df = pd.DataFrame(df_data)
-    # execution_time 포맷: "20250725_223100" -> "2025-07-25"
-    df["date"] = pd.to_datetime(df["date"], format="%Y%m%d_%H%M%S", errors="coerce")
-    df = df.dropna(subset=["date"])
-
-    # 협력사 카테고리 정의 (PDA_partner.py와 동일)
-    partner_categories = [
-        ("bat_nan_ratio", "BAT", "blue"),
-        ("fni_nan_ratio", "FNI", "cyan"),
-        ("tms_m_nan_ratio", "TMS(m)", "orange"),
-        ("cna_nan_ratio", "C&A", "green"),
-        ("pns_nan_ratio", "P&S", "red"),
-        ("tms_e_nan_ratio", "TMS(e)", "purple"),
-        ("tms_semi_nan_ratio", "TMS_반제품", "magenta"),
-    ]
-
+def render_monthly_trend_heatmap(matrix):
+    """compute_heatmap_matrices 결과로 월별 트렌드 히트맵 저장"""
+    group_by = matrix["group_by"]
+    heatmap_data = matrix["data"]
+    labels = matrix["labels"]
+    y_label = matrix["y_label"]
     if group_by == "partner":
-        # 월별 그룹화 (3월~7월 트렌드)
-        df_grouped = df.groupby(df["date"].dt.to_period("M")).mean(numeric_only=True)
-        df_grouped.index = df_grouped.index.to_timestamp()
-        
-        categories = partner_categories
-        labels = [d.strftime("%Y-%m") for d in df_grouped.index]
         title = "월간 협력사별 NaN 비율 추이 (금요일 기준)"
-        y_label = "협력사"
-        
-        # 히트맵 데이터 준비
-        heatmap_data = df_grouped[[cat[0] for cat in partner_categories]].T
-        heatmap_data.index = [cat[1] for cat in partner_categories]
-        
-    elif group_by == "model":
-        # 모델별 그룹화 (PDA_partner.py와 동일한 로직)
-        df_grouped = df.groupby([df["date"].dt.to_period("M"), "model_name"]).mean(numeric_only=True).reset_index()
-        df_grouped["date"] = df_grouped["date"].apply(lambda x: x.to_timestamp())
-
-        # 모델명 리스트 생성
-        categories = [
-            (row["model_name"], row["model_name"], "blue")
-            for _, row in df_grouped[["model_name"]].drop_duplicates().iterrows()
-        ]
-
-        # Pivot 테이블 생성: 모든 협력사 비율 컬럼 유지
-        df_grouped = df_grouped.pivot(
-            index="date", columns="model_name", values=[col[0] for col in partner_categories]
-        )
-
-        # 컬럼명 단순화
-        df_grouped.columns = [col[1] for col in df_grouped.columns]
-
-        labels = [d.strftime("%Y-%m") for d in df_grouped.index]
+    else:
         title = "월간 NaN 비율 추이 (금요일 기준)"
-        y_label = "모델"
-        
-        # 모델별 히트맵: 기존 방식과 동일하게 groupby로 평균 계산 후 transpose
-        heatmap_data = df_grouped.groupby(axis=1, level=0).mean().T
 
     # 히트맵 생성
     plt.figure(figsize=(12, max(6, len(heatmap_data.index) * 0.6)))
@@ -272,18 +147,20 @@ def main():
     # Drive 서비스 초기화
     drive_service = init_drive_service()
     
-    # 3월~7월 JSON 데이터 로드
-    monthly_data = load_monthly_json_files(drive_service, start_month=3, end_month=7)
+    # 3월~7월 JSON 데이터를 스트리밍으로 한 번만 읽어 협력사별/모델별 부분합을 함께 누적
+    variants = [monthly_variant("partner"), monthly_variant("model")]
+    monthly_records = load_monthly_json_files(drive_service, start_month=3, end_month=7)
+    matrices = compute_heatmap_matrices(aggregate_records(monthly_records, variants), variants)
     
-    if not monthly_data:
+    if not any(matrices.values()):
         print("❌ 월별 데이터를 찾을 수 없습니다.")
         return
     
     # 협력사별 히트맵 생성 (완전한 카테고리)
-    partner_heatmap = generate_monthly_trend_heatmap(monthly_data, group_by="partner")
+    partner_heatmap = render_monthly_trend_heatmap(matrices["monthly_partner"])
     
     # 모델별 히트맵 생성  
-    model_heatmap = generate_monthly_trend_heatmap(monthly_data, group_by="model")
+    model_heatmap = render_monthly_trend_heatmap(matrices["monthly_model"])
     
     print("\n🎉 월별 트렌드 히트맵 생성 완료!")
     if partner_heatmap:
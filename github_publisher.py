@@ -0,0 +1,160 @@
+"""
+GitHub 단일 커밋 배포
+git blob SHA를 로컬에서 계산해 변경되지 않은 파일은 건너뛰고,
+변경된 파일들은 git data(trees) API로 한 번의 커밋에 모아 올립니다.
+변경이 없으면 커밋을 만들지 않습니다.
+"""
+
+import base64
+import hashlib
+import os
+
+import requests
+
+GITHUB_API = "https://api.github.com"
+
+
+def git_blob_sha(content):
+    """git hash-object와 동일한 blob SHA-1 ("blob <크기>\\0" + 내용)"""
+    header = f"blob {len(content)}\0".encode()
+    return hashlib.sha1(header + content).hexdigest()
+
+
+def _check(response, action):
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f"GitHub {action} 실패 ({response.status_code}): {response.text[:200]}"
+        )
+    return response.json()
+
+
+def _remote_blob_shas(session, headers, repo_url, tree_sha, prefix):
+    """기준 트리에서 prefix 하위 파일의 경로 -> blob SHA (트리가 잘린 경우 일부만 반환될 수 있음)"""
+    tree = _check(
+        session.get(
+            f"{repo_url}/git/trees/{tree_sha}",
+            params={"recursive": "1"},
+            headers=headers,
+        ),
+        "트리 조회",
+    )
+    if tree.get("truncated"):
+        print("⚠️ GitHub 트리 응답이 잘려 일부 파일은 변경 여부와 무관하게 업로드됩니다.")
+    return {
+        entry["path"]: entry["sha"]
+        for entry in tree.get("tree", [])
+        if entry["type"] == "blob" and entry["path"].startswith(prefix)
+    }
+
+
+def _tree_entry(session, headers, repo_url, path, content):
+    # UTF-8 텍스트는 트리 요청에 직접 포함, 바이너리(이미지 등)만 blob을 따로 생성
+    try:
+        text = content.decode("utf-8")
+        return {"path": path, "mode": "100644", "type": "blob", "content": text}
+    except UnicodeDecodeError:
+        blob = _check(
+            session.post(
+                f"{repo_url}/git/blobs",
+                json={
+                    "content": base64.b64encode(content).decode("ascii"),
+                    "encoding": "base64",
+                },
+                headers=headers,
+            ),
+            f"blob 생성 ({path})",
+        )
+        return {"path": path, "mode": "100644", "type": "blob", "sha": blob["sha"]}
+
+
+def publish_files(
+    file_paths,
+    owner,
+    repo,
+    branch,
+    token,
+    prefix="public",
+    message=None,
+    session=None,
+):
+    """
+    여러 파일을 prefix 폴더에 한 번의 커밋으로 배포합니다.
+    session: 공유 requests.Session (인증 헤더는 세션이 아닌 요청마다 지정)
+    반환: 생성된 커밋 SHA (변경 없음이면 None)
+    """
+    session = session or requests.Session()
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github.v3+json",
+    }
+    repo_url = f"{GITHUB_API}/repos/{owner}/{repo}"
+
+    files = {}
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            files[f"{prefix}/{os.path.basename(file_path)}"] = f.read()
+
+    # 다른 커밋과 경합해 ref 업데이트가 거부되면 최신 기준으로 한 번 더 시도
+    for attempt in range(2):
+        ref = _check(
+            session.get(f"{repo_url}/git/ref/heads/{branch}", headers=headers),
+            "ref 조회",
+        )
+        head_sha = ref["object"]["sha"]
+        head = _check(
+            session.get(f"{repo_url}/git/commits/{head_sha}", headers=headers),
+            "커밋 조회",
+        )
+        remote = _remote_blob_shas(
+            session, headers, repo_url, head["tree"]["sha"], f"{prefix}/"
+        )
+
+        changed = {
+            path: content
+            for path, content in files.items()
+            if remote.get(path) != git_blob_sha(content)
+        }
+        for path in sorted(files.keys() - changed.keys()):
+            print(f"⏭️ 변경 없음, 업로드 생략: {path}")
+        if not changed:
+            print("ℹ️ GitHub에 반영할 변경 사항이 없어 커밋을 생성하지 않습니다.")
+            return None
+
+        tree = _check(
+            session.post(
+                f"{repo_url}/git/trees",
+                json={
+                    "base_tree": head["tree"]["sha"],
+                    "tree": [
+                        _tree_entry(session, headers, repo_url, path, content)
+                        for path, content in sorted(changed.items())
+                    ],
+                },
+                headers=headers,
+            ),
+            "트리 생성",
+        )
+        names = ", ".join(os.path.basename(path) for path in sorted(changed))
+        commit = _check(
+            session.post(
+                f"{repo_url}/git/commits",
+                json={
+                    "message": message or f"자동 업로드: {names}",
+                    "tree": tree["sha"],
+                    "parents": [head_sha],
+                },
+                headers=headers,
+            ),
+            "커밋 생성",
+        )
+        response = session.patch(
+            f"{repo_url}/git/refs/heads/{branch}",
+            json={"sha": commit["sha"], "force": False},
+            headers=headers,
+        )
+        if response.status_code == 422 and attempt == 0:
+            print("⚠️ 브랜치가 그 사이 갱신되어 최신 커밋 기준으로 다시 시도합니다.")
+            continue
+        _check(response, "ref 업데이트")
+        print(f"✅ GitHub 업로드 성공! ({names}, 커밋 {commit['sha'][:7]})")
+        return commit["sha"]
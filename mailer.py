@@ -0,0 +1,204 @@
+"""
+경량 이메일 발송
+그래프 이미지를 축소/최적화해 CID로 본문에 인라인 삽입하고, 전체 메시지 크기 예산을
+넘으면 큰 이미지부터, 그래도 넘으면 첨부파일을 링크로 대체합니다.
+본문만으로도 예산을 넘으면 반송될 메일을 만들지 않고 EmailTooLargeError를 발생시킵니다.
+한 번의 실행에서 여러 메일을 보내도 SMTP 세션은 하나만 열어 재사용합니다.
+"""
+
+import atexit
+import io
+import os
+import smtplib
+import ssl
+from email.mime.application import MIMEApplication
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import make_msgid
+
+from PIL import Image
+
+# base64 인코딩 시 약 4/3배로 커짐
+BASE64_OVERHEAD = 4 / 3
+
+
+class EmailTooLargeError(ValueError):
+    """이미지/첨부를 모두 링크로 바꿔도 크기 예산을 넘는 메일"""
+
+
+def optimize_image(path, max_width=1200):
+    """
+    이미지를 max_width 이하로 축소하고 팔레트 PNG로 최적화한 bytes를 반환합니다.
+    (그래프는 색상 수가 적어 팔레트 변환 시 화질 손실 없이 크게 줄어듦)
+    최적화 결과가 원본보다 크면 원본을 그대로 사용합니다.
+    """
+    with open(path, "rb") as f:
+        original = f.read()
+    try:
+        with Image.open(io.BytesIO(original)) as img:
+            img = img.convert("RGB")
+            if img.width > max_width:
+                height = round(img.height * max_width / img.width)
+                img = img.resize((max_width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            img.quantize(colors=256).save(buffer, format="PNG", optimize=True)
+    except Exception as e:
+        print(f"⚠️ 이미지 최적화 실패, 원본 사용: {path} ({e})")
+        return original
+    optimized = buffer.getvalue()
+    return optimized if len(optimized) < len(original) else original
+
+
+def build_email(
+    subject,
+    html_body,
+    sender,
+    receiver,
+    images=None,
+    attachments=None,
+    image_links=None,
+    attachment_links=None,
+    max_bytes=10 * 1024 * 1024,
+    max_width=1200,
+):
+    """
+    HTML 본문 + 인라인(CID) 이미지 + 첨부파일로 메시지를 구성합니다.
+    images: 본문 하단에 인라인으로 삽입할 이미지 경로 목록
+    attachments: 그대로 첨부할 파일 경로 목록 (예: HTML 대시보드)
+    image_links: {이미지 경로: URL} 예산 초과로 제외된 이미지 대신 넣을 링크
+    attachment_links: {첨부파일 경로: URL} 예산 초과로 제외된 첨부파일 대신 넣을 링크
+    max_bytes: 전송 크기 예산 (base64 인코딩 후 기준)
+    """
+    image_links = image_links or {}
+    attachment_links = attachment_links or {}
+    inline = []
+    for path in images or []:
+        try:
+            inline.append((path, optimize_image(path, max_width)))
+        except Exception as e:
+            print(f"❌ [첨부 오류] 그래프 파일 {path} 첨부 실패: {e}")
+
+    files = []
+    for path in attachments or []:
+        try:
+            with open(path, "rb") as f:
+                files.append((path, f.read()))
+        except Exception as e:
+            print(f"❌ [이메일 첨부 오류] 파일 {path} 추가 실패: {e}")
+
+    def estimated_size():
+        payload = len(html_body.encode("utf-8"))
+        payload += sum(len(data) for _, data in inline + files)
+        return payload * BASE64_OVERHEAD
+
+    # 예산을 넘으면 큰 이미지부터, 그다음 큰 첨부파일부터 링크로 대체
+    dropped = []
+    dropped_files = []
+    for items, removed in ((inline, dropped), (files, dropped_files)):
+        while items and estimated_size() > max_bytes:
+            largest = max(items, key=lambda item: len(item[1]))
+            items.remove(largest)
+            removed.append(largest[0])
+    if estimated_size() > max_bytes:
+        raise EmailTooLargeError(
+            f"이메일 크기 예산 초과: 본문만 약 {estimated_size() / 1024 / 1024:.1f}MB "
+            f"(예산 {max_bytes / 1024 / 1024:.1f}MB)"
+        )
+
+    sections = []
+    cids = []
+    for path, _ in inline:
+        cid = make_msgid(domain="pda.local")
+        cids.append(cid)
+        sections.append(
+            f'<p><img src="cid:{cid[1:-1]}" alt="{os.path.basename(path)}" '
+            f'style="max-width: 100%;"></p>'
+        )
+    for path in dropped:
+        name = os.path.basename(path)
+        url = image_links.get(path)
+        if url:
+            sections.append(f'<p>📎 {name}: <a href="{url}">그래프 보기</a></p>')
+        else:
+            sections.append(f"<p>📎 {name}: 메일 용량 제한으로 생략되었습니다.</p>")
+        print(f"⚠️ 메일 용량 예산 초과로 이미지 제외: {name}")
+    for path in dropped_files:
+        name = os.path.basename(path)
+        url = attachment_links.get(path)
+        if url:
+            sections.append(f'<p>📎 {name}: <a href="{url}">첨부파일 보기</a></p>')
+        else:
+            sections.append(f"<p>📎 {name}: 메일 용량 제한으로 첨부하지 않았습니다.</p>")
+        print(f"⚠️ 메일 용량 예산 초과로 첨부파일 제외: {name}")
+
+    related = MIMEMultipart("related")
+    related.attach(MIMEText(html_body + "\n".join(sections), "html", _charset="utf-8"))
+    for (path, data), cid in zip(inline, cids):
+        img = MIMEImage(data, _subtype="png")
+        img.add_header("Content-ID", cid)
+        img.add_header(
+            "Content-Disposition", "inline", filename=os.path.basename(path)
+        )
+        related.attach(img)
+
+    msg = MIMEMultipart("mixed")
+    msg["From"] = sender
+    msg["To"] = receiver
+    msg["Subject"] = subject
+    msg.attach(related)
+    for path, data in files:
+        subtype = "html" if path.endswith(".html") else "octet-stream"
+        part = MIMEApplication(data, _subtype=subtype)
+        part.add_header(
+            "Content-Disposition", "attachment", filename=os.path.basename(path)
+        )
+        msg.attach(part)
+    return msg
+
+
+# 실행 단위로 재사용하는 SMTP 세션 (종료 시 자동 close)
+_smtp_session = {"server": None, "key": None}
+
+
+def _close_smtp_session():
+    server = _smtp_session["server"]
+    _smtp_session["server"] = None
+    if server is not None:
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+
+atexit.register(_close_smtp_session)
+
+
+def get_smtp_session(host, port, user, password):
+    """열린 SMTP 세션을 재사용하고, 끊겼거나 처음이면 새로 연결합니다."""
+    key = (host, port, user)
+    server = _smtp_session["server"]
+    if server is not None and _smtp_session["key"] == key:
+        try:
+            if server.noop()[0] == 250:
+                return server
+        except smtplib.SMTPException:
+            pass
+        _close_smtp_session()
+    elif server is not None:
+        _close_smtp_session()
+
+    server = smtplib.SMTP(host, port)
+    server.starttls(context=ssl.create_default_context())
+    server.login(user, password)
+    _smtp_session.update(server=server, key=key)
+    return server
+
+
+def send_email(msg, host, port, user, password):
+    """공유 SMTP 세션으로 메시지를 보냅니다. (연결이 끊긴 경우 한 번 재연결)"""
+    try:
+        get_smtp_session(host, port, user, password).send_message(msg)
+    except smtplib.SMTPServerDisconnected:
+        _close_smtp_session()
+        get_smtp_session(host, port, user, password).send_message(msg)
@@ -0,0 +1,547 @@
+"""
+NaN 히스토리 히트맵 엔진
+Drive의 nan_ot_results 히스토리를 파일 목록 -> 다운로드 -> 레코드 -> 부분합 누적의
+스트리밍 파이프라인으로 한 번만 읽고, 요청된 모든 히트맵 매트릭스
+(주간/월간 × 협력사/모델)를 한 번에 계산합니다.
+렌더링은 계산된 매트릭스를 받아 별도 단계에서 수행합니다.
+"""
+
+import gzip
+import io
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from itertools import chain, islice
+
+import matplotlib
+
+# 히트맵은 파이프라인 작업 스레드에서 렌더링되므로 GUI 백엔드 대신 항상 Agg 사용
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from tracing import traced
+
+# 협력사 슬롯 정의: (컬럼, 라벨, 협력사 필드, 협력사 값, occurrence_stats 카테고리)
+# 협력사 필드가 None이면 협력사와 무관하게 해당 카테고리 비율을 사용합니다.
+# 새 협력사는 이 표에 한 줄 추가하면 모든 히트맵에 반영됩니다.
+PARTNER_SLOTS = [
+    ("bat_nan_ratio", "BAT", "mech_partner", "BAT", "기구"),
+    ("fni_nan_ratio", "FNI", "mech_partner", "FNI", "기구"),
+    ("tms_m_nan_ratio", "TMS(m)", "mech_partner", "TMS", "기구"),
+    ("cna_nan_ratio", "C&A", "elec_partner", "C&A", "전장"),
+    ("pns_nan_ratio", "P&S", "elec_partner", "P&S", "전장"),
+    ("tms_e_nan_ratio", "TMS(e)", "elec_partner", "TMS", "전장"),
+    ("tms_semi_nan_ratio", "TMS_반제품", None, None, "TMS_반제품"),
+]
+PARTNER_CATEGORIES = [(col, label) for col, label, _, _, _ in PARTNER_SLOTS]
+RATIO_COLUMNS = [col for col, _ in PARTNER_CATEGORIES]
+
+
+def parse_execution_time(execution_time):
+    """execution_time 파싱 (기존 형식: 20250616_132845, 새 형식: 2025-06-18 23:12:07)"""
+    try:
+        if isinstance(execution_time, str) and "_" in execution_time:
+            return pd.to_datetime(execution_time, format="%Y%m%d_%H%M%S")
+        return pd.to_datetime(execution_time)
+    except (ValueError, TypeError):
+        return pd.NaT
+
+
+# ====================================
+# Variant 정의
+# ====================================
+def weekly_variant(group_by, now):
+    """이번 주(월~금) 파일/데이터 기준 주간 히트맵 정의"""
+    start_of_week = (now - timedelta(days=now.weekday())).date()
+    return {
+        "name": f"weekly_{group_by}",
+        "period": "weekly",
+        "group_by": group_by,
+        "week_number": now.isocalendar()[1],
+        "target_day": None,
+        "date_range": (start_of_week, start_of_week + timedelta(days=4)),
+    }
+
+
+def monthly_variant(group_by, target_day=None):
+    """월간 히트맵 정의 (target_day=None이면 32주 이전=금요일, 33주 이후=일요일 혼합)"""
+    return {
+        "name": f"monthly_{group_by}",
+        "period": "monthly",
+        "group_by": group_by,
+        "week_number": None,
+        "target_day": target_day or "mixed",
+        "date_range": None,
+    }
+
+
+# ====================================
+# nan_ot_results 파일 포맷
+# ====================================
+# "json": 기존 indent=2 JSON ({"execution_time", "results": [...]})
+# "ndjson.gz": gzip 압축 NDJSON, 한 줄에 결과 하나 (execution_time 포함)
+RESULTS_FORMATS = {
+    "json": (".json", "application/json"),
+    "ndjson.gz": (".ndjson.gz", "application/gzip"),
+}
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def write_results_file(base_path, json_data, fmt="json"):
+    """
+    결과 데이터를 지정한 포맷으로 저장합니다.
+    base_path: 확장자를 제외한 경로 (예: output/nan_ot_results_20250618_231207_수_3회차)
+    반환: (파일 경로, mimetype)
+    """
+    if fmt not in RESULTS_FORMATS:
+        raise ValueError(f"지원하지 않는 결과 포맷입니다: {fmt}")
+    extension, mime_type = RESULTS_FORMATS[fmt]
+    filename = base_path + extension
+
+    if fmt == "json":
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(json_data, f, ensure_ascii=False, indent=2, default=str)
+    else:
+        execution_time = json_data["execution_time"]
+        with gzip.open(filename, "wt", encoding="utf-8") as f:
+            for result in json_data["results"]:
+                line = {**result, "execution_time": execution_time}
+                f.write(
+                    json.dumps(line, ensure_ascii=False, separators=(",", ":"), default=str)
+                )
+                f.write("\n")
+    return filename, mime_type
+
+
+def _iter_ndjson(lines, batch_size=500):
+    # 줄 단위 json.loads 대신 batch_size 줄씩 배열로 묶어 한 번에 파싱
+    batch = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield from json.loads(b"[" + b",".join(batch) + b"]")
+            batch = []
+    if batch:
+        yield from json.loads(b"[" + b",".join(batch) + b"]")
+
+
+def iter_result_records(content):
+    """
+    nan_ot_results 파일 내용(bytes)에서 결과 레코드를 하나씩 반환합니다.
+    gzip NDJSON / 평문 NDJSON / 기존 indent JSON을 자동 감지하며,
+    모든 레코드에는 execution_time이 포함됩니다.
+    """
+    if content[:2] == GZIP_MAGIC:
+        with gzip.GzipFile(fileobj=io.BytesIO(content)) as stream:
+            yield from _iter_ndjson(stream)
+        return
+
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        # 평문 NDJSON
+        yield from _iter_ndjson(content.splitlines())
+        return
+
+    if isinstance(data, dict) and "results" in data:
+        # 기존 형식: execution_time을 각 결과에 추가
+        for result in data["results"]:
+            result["execution_time"] = data["execution_time"]
+            yield result
+    else:
+        # 한 줄짜리 NDJSON
+        yield data
+
+
+# ====================================
+# 히스토리 로드
+# ====================================
+def list_history_files(drive_service, folder_id):
+    """JSON 폴더의 nan_ot_results 파일 목록을 (페이지 단위로) 한 번에 조회"""
+    query = f"'{folder_id}' in parents and name contains 'nan_ot_results_'"
+    files = []
+    page_token = None
+    while True:
+        response = (
+            drive_service.files()
+            .list(
+                q=query,
+                fields="nextPageToken, files(id, name)",
+                pageSize=1000,
+                pageToken=page_token,
+            )
+            .execute()
+        )
+        files.extend(response.get("files", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return files
+
+
+def file_matches_variant(file_name, variant):
+    """
+    variant의 week_number/target_day 기준 파일명 필터
+    (target_day: "friday", "sunday", "mixed"=32주 이전 금요일/33주 이후 일요일, None=모든 요일)
+    """
+    match = re.search(r"nan_ot_results_(\d{8})", file_name)
+    if not match:
+        return False
+    try:
+        file_week = datetime.strptime(match.group(1), "%Y%m%d").isocalendar()[1]
+    except ValueError:
+        return False
+
+    if variant["week_number"] is not None and file_week != variant["week_number"]:
+        return False
+
+    target_day = variant["target_day"]
+    if target_day == "friday":
+        return "_금_" in file_name
+    if target_day == "sunday":
+        return "_일_" in file_name
+    if target_day == "mixed":
+        return ("_금_" in file_name) if file_week < 33 else ("_일_" in file_name)
+    return True
+
+
+def _normalized_column(flat, name, default):
+    if name in flat.columns:
+        return flat[name].fillna(default)
+    return pd.Series(default, index=flat.index)
+
+
+def build_ratio_frame(records):
+    """
+    결과 레코드를 json_normalize로 한 번에 평탄화하고
+    PARTNER_SLOTS 표에 따라 협력사 슬롯별 NaN 비율을 벡터 연산으로 계산합니다.
+    """
+    flat = pd.json_normalize(records)
+    columns = ["date", "file_name", "model_name", "mech_partner", "elec_partner"]
+    if flat.empty:
+        return pd.DataFrame(columns=columns + RATIO_COLUMNS)
+
+    frame = pd.DataFrame(
+        {
+            "date": pd.to_datetime(
+                _normalized_column(flat, "execution_time", "").map(
+                    parse_execution_time
+                )
+            ),
+            "file_name": _normalized_column(flat, "file_name", ""),
+            "model_name": _normalized_column(flat, "model_name", ""),
+        }
+    )
+    for field in ["mech_partner", "elec_partner"]:
+        frame[field] = (
+            _normalized_column(flat, field, "").astype(str).str.strip().str.upper()
+        )
+
+    # 카테고리별 NaN 비율 (total_count가 0이면 0)
+    category_ratios = {}
+    for category in {slot[4] for slot in PARTNER_SLOTS}:
+        total = _normalized_column(
+            flat, f"occurrence_stats.{category}.total_count", 0
+        ).astype(float)
+        nan_count = _normalized_column(
+            flat, f"occurrence_stats.{category}.nan_count", 0
+        ).astype(float)
+        category_ratios[category] = (
+            (nan_count / total.where(total > 0) * 100).fillna(0.0).to_numpy()
+        )
+
+    for col, _, partner_field, partner_value, category in PARTNER_SLOTS:
+        ratio = category_ratios[category]
+        if partner_field is None:
+            frame[col] = ratio
+        else:
+            frame[col] = np.where(frame[partner_field] == partner_value, ratio, 0.0)
+    return frame
+
+
+def _cache_path(cache_dir, file):
+    # Drive 파일 ID를 포함해 같은 이름으로 재업로드된 파일과 구분
+    return os.path.join(cache_dir, f"{file['id']}_{file['name']}")
+
+
+def iter_history_downloads(drive_service, files, cache_dir=None):
+    """
+    파일 목록을 하나씩 내려받아 (파일명, 내용 bytes)로 반환 (동시에 하나만 메모리에 유지)
+    cache_dir: 지정 시 과거 결과 파일을 로컬에 캐시 (히스토리 파일은 업로드 후 변경되지 않음)
+    """
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    for file in files:
+        path = _cache_path(cache_dir, file) if cache_dir else None
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                yield file["name"], f.read()
+            continue
+
+        print(f"📁 JSON 파일 로드 중: {file['name']}")
+        content = drive_service.files().get_media(fileId=file["id"]).execute()
+        if path:
+            # 중단 시 깨진 캐시가 남지 않도록 임시 파일에 쓴 뒤 교체
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        yield file["name"], content
+
+
+def iter_history_records(downloads):
+    """다운로드 스트림에서 결과 레코드를 하나씩 반환 (file_name 포함)"""
+    for file_name, content in downloads:
+        for record in iter_result_records(content):
+            record["file_name"] = file_name
+            yield record
+
+
+def iter_current_run_records(current_run):
+    """
+    이번 실행 결과(메모리)를 히스토리 레코드와 같은 형태로 반환합니다.
+    current_run: {"name": Drive 파일명, "data": {"execution_time", "results"}}
+    """
+    data = current_run["data"]
+    for result in data["results"]:
+        yield {
+            **result,
+            "execution_time": data["execution_time"],
+            "file_name": current_run["name"],
+        }
+
+
+def iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def aggregate_records(records, variants, files_by_variant=None, chunk_size=1000):
+    """
+    레코드 스트림을 chunk_size개씩 비율 프레임으로 변환해 variant별 부분합에 누적합니다.
+    files_by_variant: {variant 이름: 파일명 set} (None이면 모든 레코드 사용)
+    반환: {variant 이름: 부분합 DataFrame 또는 None}
+    """
+    sums = {variant["name"]: None for variant in variants}
+    total = 0
+    for chunk in iter_chunks(records, chunk_size):
+        total += len(chunk)
+        frame = build_ratio_frame(chunk).dropna(subset=["date"])
+        for variant in variants:
+            name = variant["name"]
+            mask = pd.Series(True, index=frame.index)
+            if files_by_variant is not None:
+                mask &= frame["file_name"].isin(files_by_variant[name])
+            if variant.get("date_range") is not None:
+                start, end = variant["date_range"]
+                days = frame["date"].dt.date
+                mask &= (days >= start) & (days <= end)
+            if not mask.any():
+                continue
+            partial = partial_heatmap_sums(
+                frame[mask], variant["period"], variant["group_by"]
+            )
+            sums[name] = (
+                partial if sums[name] is None else sums[name].add(partial, fill_value=0)
+            )
+    print(f"📂 총 {total}개의 로그 데이터를 로드했습니다.")
+    return sums
+
+
+def aggregate_history(
+    drive_service,
+    folder_id,
+    variants,
+    chunk_size=1000,
+    current_run=None,
+    cache_dir=None,
+):
+    """
+    파일 목록 -> 다운로드 이터레이터 -> 레코드 이터레이터 -> 부분합 누적 파이프라인.
+    모든 variant에 필요한 파일을 한 번씩만 내려받으며, 메모리는 히스토리 파일 수와 무관합니다.
+    current_run: 이번 실행 결과 (Drive에 이미 올라갔더라도 다시 내려받지 않고 메모리 값을 사용)
+    cache_dir: 과거 결과 파일의 로컬 캐시 폴더
+    """
+    current_name = current_run["name"] if current_run else None
+    files_by_variant = {variant["name"]: set() for variant in variants}
+    selected = []
+    for file in list_history_files(drive_service, folder_id):
+        if file["name"] == current_name:
+            continue
+        names = [v["name"] for v in variants if file_matches_variant(file["name"], v)]
+        for name in names:
+            files_by_variant[name].add(file["name"])
+        if names:
+            selected.append(file)
+
+    current_used = False
+    if current_name:
+        for variant in variants:
+            if file_matches_variant(current_name, variant):
+                files_by_variant[variant["name"]].add(current_name)
+                current_used = True
+
+    if not selected and not current_used:
+        print("⚠️ 로드할 JSON 파일이 없습니다.")
+        return {variant["name"]: None for variant in variants}
+
+    selected.sort(key=lambda f: f["name"])
+    records = iter_history_records(
+        iter_history_downloads(drive_service, selected, cache_dir)
+    )
+    if current_used:
+        records = chain(records, iter_current_run_records(current_run))
+    return aggregate_records(records, variants, files_by_variant, chunk_size)
+
+
+# ====================================
+# 매트릭스 계산
+# ====================================
+def partial_heatmap_sums(df, period, group_by):
+    """
+    (기간[, 모델])별 협력사 슬롯 비율 합계와 건수.
+    모든 히트맵 매트릭스는 이 부분합만으로 계산되므로 청크 단위로 더해 나갈 수 있습니다.
+    """
+    if period == "weekly":
+        bucket = df["date"].dt.strftime("%m월%d일").rename("day")
+    else:
+        bucket = df["date"].dt.to_period("M").rename("date")
+    keys = [bucket] if group_by == "partner" else [bucket, df["model_name"]]
+    grouped = df.groupby(keys)
+    sums = grouped[RATIO_COLUMNS].sum()
+    sums["count"] = grouped.size()
+    return sums
+
+
+def finalize_heatmap_matrix(sums, period, group_by):
+    """
+    부분합에서 히트맵 매트릭스 하나를 계산합니다.
+    반환: {"data", "labels", "title", "y_label", "period", "group_by"}
+    """
+    sums = sums.sort_index()
+    means = sums[RATIO_COLUMNS].div(sums["count"], axis=0)
+    if period == "weekly":
+        if group_by == "partner":
+            data = means.T
+            data.index = [label for _, label in PARTNER_CATEGORIES]
+            title, y_label = "주간 NaN 비율 추이 (mixed)", "협력사"
+        else:
+            # (날짜, 모델)별로 NaN이 발생한 협력사 컬럼의 평균만 다시 평균
+            avg = means.where(sums[RATIO_COLUMNS] > 0).mean(axis=1).fillna(0)
+            data = avg.unstack("day").fillna(0)
+            title, y_label = "주간 모델별 NaN 비율 히트맵", "모델"
+        labels = list(data.columns)
+    else:
+        if group_by == "partner":
+            means.index = means.index.to_timestamp()
+            data = means.T
+            data.index = [label for _, label in PARTNER_CATEGORIES]
+            title, y_label = "월간 협력사별 NaN 비율 히트맵 (금요일 기준)", "협력사"
+        else:
+            # 월/모델별 협력사 컬럼 평균을 모델 단위로 다시 평균 (기존 pivot 방식과 동일)
+            data = means.mean(axis=1).unstack("model_name")
+            data.index = data.index.to_timestamp()
+            data = data.T
+            title, y_label = "월간 NaN 비율 추이 (금요일 기준)", "모델"
+        labels = [d.strftime("%Y-%m") for d in data.columns]
+
+    return {
+        "data": data,
+        "labels": labels,
+        "title": title,
+        "y_label": y_label,
+        "period": period,
+        "group_by": group_by,
+    }
+
+
+def compute_heatmap_matrices(sums, variants):
+    """
+    aggregate_history/aggregate_records 결과에서 모든 variant의 히트맵 매트릭스를 계산합니다.
+    반환: {variant 이름: finalize_heatmap_matrix 결과 또는 None}
+    """
+    matrices = {}
+    for variant in variants:
+        name = variant["name"]
+        if sums.get(name) is None:
+            print(f"⚠️ {name} 히트맵용 데이터가 없습니다.")
+            matrices[name] = None
+            continue
+        matrices[name] = finalize_heatmap_matrix(
+            sums[name], variant["period"], variant["group_by"]
+        )
+    return matrices
+
+
+# ====================================
+# 렌더링
+# ====================================
+@traced("render")
+def render_heatmap(matrix, output_path, font_prop=None):
+    """compute_heatmap_matrices가 만든 매트릭스 하나를 PNG로 저장"""
+    data, labels = matrix["data"], matrix["labels"]
+    font_kwargs = {"fontproperties": font_prop} if font_prop else {}
+
+    if matrix["period"] == "weekly" and matrix["group_by"] == "partner":
+        # 주간 리포트용 히트맵 (협력사 x 날짜)
+        plt.figure(figsize=(max(8, len(labels) * 1.5), max(6, len(data.index) * 0.8)))
+        sns.heatmap(
+            data.to_numpy(),
+            annot=True,
+            fmt=".1f",
+            cmap="Reds",
+            linewidths=0.5,
+            xticklabels=labels,
+            yticklabels=list(data.index),
+            cbar_kws={"label": "NaN 비율 (%)"},
+        )
+        plt.xticks(rotation=0, **font_kwargs)
+    else:
+        plt.figure(figsize=(12, max(6, len(data.index) * 0.6)))
+        sns.heatmap(
+            data,
+            annot=True,
+            fmt=".1f",
+            cmap="YlOrRd",
+            cbar_kws={"label": "NaN 비율 (%)"},
+            linewidths=0.5,
+        )
+        plt.xticks(
+            ticks=np.arange(len(labels)) + 0.5,
+            labels=labels,
+            rotation=45,
+            ha="right",
+            **font_kwargs,
+        )
+
+    plt.title(matrix["title"], fontsize=16, **font_kwargs)
+    plt.xlabel("측정 날짜", **font_kwargs)
+    plt.ylabel(matrix["y_label"], **font_kwargs)
+    plt.yticks(rotation=0, **font_kwargs)
+    plt.tight_layout()
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    plt.savefig(output_path, bbox_inches="tight")
+    plt.close()
+    print(f"✅ {matrix['title']} 생성 완료: {output_path}")
+    return output_path
+
+
+def render_heatmaps(matrices, font_prop=None, output_dir="output"):
+    """계산된 모든 매트릭스를 렌더링하고 {variant 이름: 파일 경로}를 반환"""
+    today = datetime.now().strftime("%Y%m%d")
+    files = {}
+    for name, matrix in matrices.items():
+        if matrix is None:
+            files[name] = None
+            continue
+        output_path = os.path.join(output_dir, f"{name}_nan_heatmap_{today}.png")
+        files[name] = render_heatmap(matrix, output_path, font_prop)
+    return files
@@ -0,0 +1,233 @@
+"""
+주문별 처리 결과 레코드
+collect_and_process_data가 만드는 주문 1건의 결과를 고정 크기 배열로 보관합니다.
+  - 카테고리별 전체/NaN/OT 건수: CATEGORIES 순서의 정수 배열
+  - 협력사별(mech/elec) NaN/OT 건수: PARTNER_TYPES 순서의 정수 배열
+  - NaN/OT 작업명: 프로세스 전역 작업명 테이블의 id (같은 작업명은 문자열 하나만 보관)
+주문마다 카테고리 dict 6개와 작업명 리스트를 들고 있던 9-튜플보다 메모리가 작고,
+여러 주문의 합계는 같은 위치의 배열 값끼리 더하면 됩니다.
+저널/샤드 부분 결과에는 to_json/from_json 형식(작업명은 문자열)으로 저장합니다.
+"""
+
+import threading
+from array import array
+
+CATEGORIES = ("기구", "TMS_반제품", "전장", "검사", "마무리", "기타")
+CATEGORY_INDEX = {category: index for index, category in enumerate(CATEGORIES)}
+PARTNER_TYPES = ("mech", "elec")
+PROGRESS_CATEGORIES = ("기구", "전장", "TMS_반제품")
+LINK_KEYS = ("working_hours", "legend", "wd")
+
+MECH, TMS, ELEC = CATEGORY_INDEX["기구"], CATEGORY_INDEX["TMS_반제품"], CATEGORY_INDEX["전장"]
+
+_EMPTY = ()
+_task_names = []
+_task_ids = {}
+_intern_lock = threading.Lock()
+
+
+def intern_task(name):
+    """작업명 -> 정수 id (처음 보는 작업명이면 테이블에 추가, 수집 스레드에서 동시 호출 가능)"""
+    task_id = _task_ids.get(name)
+    if task_id is None:
+        with _intern_lock:
+            task_id = _task_ids.get(name)
+            if task_id is None:
+                _task_names.append(name)
+                task_id = _task_ids[name] = len(_task_names) - 1
+    return task_id
+
+
+def task_name(task_id):
+    return _task_names[task_id]
+
+
+def _counts(values):
+    return array("i", values)
+
+
+class OrderResult:
+    __slots__ = (
+        "order_no",
+        "model_name",
+        "mech_partner",
+        "elec_partner",
+        "total_counts",
+        "nan_counts",
+        "ot_counts",
+        "partner_nan",
+        "partner_ot",
+        "nan_task_ids",
+        "ot_tasks",
+        "links",
+        "spreadsheet_url",
+        "progress",
+    )
+
+    def __init__(
+        self,
+        order_no,
+        model_name,
+        mech_partner,
+        elec_partner,
+        total_counts,
+        nan_counts,
+        ot_counts,
+        partner_nan,
+        partner_ot,
+        nan_task_ids,
+        ot_tasks,
+        links,
+        spreadsheet_url,
+        progress,
+    ):
+        self.order_no = order_no
+        self.model_name = model_name
+        self.mech_partner = mech_partner
+        self.elec_partner = elec_partner
+        self.total_counts = total_counts
+        self.nan_counts = nan_counts
+        self.ot_counts = ot_counts
+        self.partner_nan = partner_nan
+        self.partner_ot = partner_ot
+        # 카테고리별 (작업명 id, ...) / ((작업명 id, 시간), ...)
+        self.nan_task_ids = nan_task_ids
+        self.ot_tasks = ot_tasks
+        # LINK_KEYS 순서의 그래프 링크
+        self.links = links
+        self.spreadsheet_url = spreadsheet_url
+        # PROGRESS_CATEGORIES 순서의 진행률(%)
+        self.progress = progress
+
+    @classmethod
+    def from_stats(
+        cls,
+        order_no,
+        model_name,
+        mech_partner,
+        elec_partner,
+        occurrence_stats,
+        partner_stats,
+        links,
+        spreadsheet_url,
+        progress_summary,
+    ):
+        """compute_occurrence_rates 결과(dict)와 주문 정보로 레코드 생성"""
+        stats = [occurrence_stats.get(category, {}) for category in CATEGORIES]
+        partners = [partner_stats.get(partner, {}) for partner in PARTNER_TYPES]
+        progress_summary = progress_summary or {}
+        links = links or {}
+        return cls(
+            order_no,
+            model_name,
+            mech_partner,
+            elec_partner,
+            _counts(s.get("total_count", 0) for s in stats),
+            _counts(s.get("nan_count", 0) for s in stats),
+            _counts(s.get("ot_count", 0) for s in stats),
+            _counts(p.get("nan_count", 0) for p in partners),
+            _counts(p.get("ot_count", 0) for p in partners),
+            tuple(
+                tuple(intern_task(task) for task in s.get("nan_tasks", ())) or _EMPTY
+                for s in stats
+            ),
+            tuple(
+                tuple(
+                    (intern_task(task), float(hours))
+                    for task, hours in s.get("ot_task_details", ())
+                )
+                or _EMPTY
+                for s in stats
+            ),
+            tuple(links.get(key) for key in LINK_KEYS),
+            spreadsheet_url,
+            array("d", (progress_summary.get(c, 0) for c in PROGRESS_CATEGORIES)),
+        )
+
+    @property
+    def total_tasks(self):
+        return sum(self.total_counts)
+
+    def has_issues(self):
+        """NaN 또는 OT가 하나라도 있는지 (없으면 결과에 포함하지 않음)"""
+        return any(self.nan_counts) or any(self.ot_counts)
+
+    def nan_tasks(self, category):
+        return [_task_names[i] for i in self.nan_task_ids[CATEGORY_INDEX[category]]]
+
+    def ot_task_details(self, category):
+        return [(_task_names[i], hours) for i, hours in self.ot_tasks[CATEGORY_INDEX[category]]]
+
+    def progress_of(self, category):
+        return self.progress[PROGRESS_CATEGORIES.index(category)]
+
+    def link(self, key):
+        return self.links[LINK_KEYS.index(key)]
+
+    def to_json(self):
+        """JSON 호환 dict (작업명은 문자열, 작업이 있는 카테고리만 기록)"""
+        return {
+            "order_no": self.order_no,
+            "model_name": self.model_name,
+            "mech_partner": self.mech_partner,
+            "elec_partner": self.elec_partner,
+            "counts": [
+                self.total_counts.tolist(),
+                self.nan_counts.tolist(),
+                self.ot_counts.tolist(),
+            ],
+            "partner_counts": [self.partner_nan.tolist(), self.partner_ot.tolist()],
+            "nan_tasks": {
+                CATEGORIES[i]: [_task_names[t] for t in ids]
+                for i, ids in enumerate(self.nan_task_ids)
+                if ids
+            },
+            "ot_tasks": {
+                CATEGORIES[i]: [[_task_names[t], hours] for t, hours in tasks]
+                for i, tasks in enumerate(self.ot_tasks)
+                if tasks
+            },
+            "links": list(self.links),
+            "spreadsheet_url": self.spreadsheet_url,
+            "progress": self.progress.tolist(),
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        """to_json의 역변환"""
+        totals, nans, ots = data["counts"]
+        partner_nan, partner_ot = data["partner_counts"]
+        nan_tasks = data.get("nan_tasks", {})
+        ot_tasks = data.get("ot_tasks", {})
+        return cls(
+            data["order_no"],
+            data["model_name"],
+            data["mech_partner"],
+            data["elec_partner"],
+            _counts(totals),
+            _counts(nans),
+            _counts(ots),
+            _counts(partner_nan),
+            _counts(partner_ot),
+            tuple(
+                tuple(intern_task(task) for task in nan_tasks.get(category, ())) or _EMPTY
+                for category in CATEGORIES
+            ),
+            tuple(
+                tuple(
+                    (intern_task(task), hours) for task, hours in ot_tasks.get(category, ())
+                )
+                or _EMPTY
+                for category in CATEGORIES
+            ),
+            tuple(data["links"]),
+            data["spreadsheet_url"],
+            array("d", data["progress"]),
+        )
+
+
+def sum_counts(results, field):
+    """여러 주문의 같은 배열 필드를 위치별로 합산 (예: sum_counts(all_results, "nan_counts"))"""
+    size = len(PARTNER_TYPES) if field.startswith("partner_") else len(CATEGORIES)
+    columns = zip(*(getattr(result, field) for result in results))
+    return [sum(column) for column in columns] or [0] * size
@@ -0,0 +1,153 @@
+"""
+스테이지 DAG 스케줄러
+메인 파이프라인을 입력/출력이 선언된 이름 있는 스테이지로 표현하고,
+입력이 모두 준비된 스테이지부터 병렬로 실행합니다. (고정 대기 대신 데이터 준비 여부로 시작)
+스레드에 안전하지 않은 자원(matplotlib pyplot, googleapiclient 서비스)은
+resources로 선언해 같은 자원을 쓰는 스테이지끼리만 직렬화합니다.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from tracing import span
+
+
+def stage(name, func, inputs=(), outputs=(), resources=()):
+    """
+    스테이지 정의
+    func: inputs 순서대로 값을 받아 outputs를 반환 (출력이 2개 이상이면 튜플)
+    resources: 동시에 하나의 스테이지만 사용할 수 있는 자원 이름 (예: "plot", "drive")
+    """
+    return {
+        "name": name,
+        "func": func,
+        "inputs": list(inputs),
+        "outputs": list(outputs),
+        "resources": sorted(resources),
+    }
+
+
+def validate_stages(stages, initial=()):
+    """모든 입력이 초기값 또는 다른 스테이지 출력으로 제공되는지, 순환이 없는지 확인"""
+    producers = {}
+    for s in stages:
+        for output in s["outputs"]:
+            if output in producers or output in initial:
+                raise ValueError(f"출력 '{output}'을 여러 곳에서 생성합니다.")
+            producers[output] = s["name"]
+
+    for s in stages:
+        missing = [i for i in s["inputs"] if i not in producers and i not in initial]
+        if missing:
+            raise ValueError(f"스테이지 '{s['name']}'의 입력 {missing}을 생성하는 스테이지가 없습니다.")
+
+    # 위상 정렬로 순환 검사
+    available = set(initial)
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if all(i in available for i in s["inputs"])]
+        if not ready:
+            names = [s["name"] for s in remaining]
+            raise ValueError(f"스테이지 의존성에 순환이 있습니다: {names}")
+        for s in ready:
+            available.update(s["outputs"])
+            remaining.remove(s)
+
+
+def _run_stage(s, args, locks):
+    # 자원 잠금은 이름 순으로 획득해 교착 상태 방지
+    for resource in s["resources"]:
+        locks[resource].acquire()
+    start = time.perf_counter()
+    try:
+        with span(s["name"], "stage"):
+            return s["func"](*args), time.perf_counter() - start
+    finally:
+        for resource in reversed(s["resources"]):
+            locks[resource].release()
+
+
+def run_pipeline(stages, initial=None, max_workers=4):
+    """
+    입력이 준비된 스테이지부터 병렬 실행합니다.
+    실패한 스테이지에 의존하는 스테이지는 건너뛰고, 나머지 독립 스테이지는 계속 실행합니다.
+    반환: (출력 값 dict, 스테이지별 보고 dict)
+    """
+    context = dict(initial or {})
+    validate_stages(stages, context)
+    locks = {
+        resource: threading.Lock() for s in stages for resource in s["resources"]
+    }
+    report = {}
+    pending = list(stages)
+    running = {}
+    wall_start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for s in list(pending):
+                blocked = [
+                    i
+                    for i in s["inputs"]
+                    if i not in context
+                    and any(
+                        report.get(p["name"], {}).get("status") in ("failed", "skipped")
+                        for p in stages
+                        if i in p["outputs"]
+                    )
+                ]
+                if blocked:
+                    pending.remove(s)
+                    report[s["name"]] = {"status": "skipped", "seconds": 0.0, "error": None}
+                    print(f"⏭️ [{s['name']}] 선행 스테이지 실패로 건너뜀 (입력: {blocked})")
+                elif all(i in context for i in s["inputs"]):
+                    pending.remove(s)
+                    args = [context[i] for i in s["inputs"]]
+                    running[executor.submit(_run_stage, s, args, locks)] = s
+
+            if not running:
+                # 실행 중인 스테이지 없이 남은 스테이지는 입력이 만들어지지 않아 영원히 시작할 수 없음
+                for s in pending:
+                    missing = [i for i in s["inputs"] if i not in context]
+                    report[s["name"]] = {"status": "skipped", "seconds": 0.0, "error": None}
+                    print(f"⏭️ [{s['name']}] 입력이 생성되지 않아 건너뜀 (입력: {missing})")
+                pending.clear()
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                s = running.pop(future)
+                try:
+                    result, seconds = future.result()
+                    if len(s["outputs"]) == 1:
+                        result = (result,)
+                    elif not s["outputs"]:
+                        result = ()
+                    elif result is None or len(result) != len(s["outputs"]):
+                        raise ValueError(
+                            f"출력 {len(s['outputs'])}개 {s['outputs']}를 선언했지만 "
+                            f"반환 값은 {'None' if result is None else f'{len(result)}개'}입니다."
+                        )
+                except Exception as e:
+                    report[s["name"]] = {"status": "failed", "seconds": 0.0, "error": str(e)}
+                    print(f"❌ [{s['name']}] 스테이지 실패: {e}")
+                    continue
+                context.update(zip(s["outputs"], result))
+                report[s["name"]] = {"status": "ok", "seconds": seconds, "error": None}
+
+    wall = time.perf_counter() - wall_start
+    print_pipeline_report(report, wall)
+    return context, report
+
+
+def print_pipeline_report(report, wall):
+    """스테이지별 소요 시간과 순차 실행 대비 절약된 시간 출력"""
+    sequential = sum(r["seconds"] for r in report.values())
+    print("🧭 파이프라인 스테이지 결과:")
+    for name, r in report.items():
+        status = {"ok": "✅", "failed": "❌", "skipped": "⏭️"}[r["status"]]
+        print(f"   {status} {name}: {r['seconds']:.2f}초")
+    print(
+        f"⏱️ 총 소요 {wall:.2f}초 (순차 실행 시 {sequential:.2f}초, "
+        f"병렬 스케줄링으로 {max(sequential - wall, 0):.2f}초 절약)"
+    )
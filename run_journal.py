@@ -0,0 +1,83 @@
+"""
+주문 처리 체크포인트 저널
+주문 하나가 끝날 때마다 결과를 실행 ID별 추가 전용(append-only) NDJSON 파일에 기록합니다.
+같은 실행 ID로 다시 실행하면 이미 끝난 주문은 건너뛰고 기록된 결과를 다시 불러오므로,
+CI 타임아웃/네트워크 장애/할당량 초과로 중단된 실행을 남은 주문만 처리해 이어갈 수 있습니다.
+오류가 난 주문은 기록하지 않아 재실행 시 다시 처리됩니다.
+"""
+
+import json
+import os
+import re
+
+from order_result import OrderResult
+
+
+def journal_path(journal_dir, run_id):
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(run_id))
+    return os.path.join(journal_dir, f"orders_{safe_id}.ndjson")
+
+
+def _json_default(value):
+    # numpy 스칼라(np.float64 등)는 파이썬 기본 타입으로 변환
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def encode_result(result):
+    """OrderResult -> JSON 호환 dict (이상 없는 주문은 None)"""
+    return None if result is None else result.to_json()
+
+
+def decode_result(encoded):
+    """encode_result의 역변환 (이전 형식의 9-튜플 리스트도 읽어 이어서 실행 가능)"""
+    if encoded is None:
+        return None
+    if isinstance(encoded, list):
+        return OrderResult.from_stats(*encoded)
+    return OrderResult.from_json(encoded)
+
+
+def load_journal(path):
+    """
+    기록된 주문 결과 {스프레드시트 ID: OrderResult 또는 None}
+    강제 종료로 마지막 줄이 잘린 경우 그 줄은 버리고 파일도 잘라내 이후 기록이 이어 붙지 않게 합니다.
+    """
+    completed = {}
+    if not os.path.exists(path):
+        return completed
+    with open(path, "rb") as f:
+        content = f.read()
+    valid_end = 0
+    for line in content.splitlines(keepends=True):
+        if not line.endswith(b"\n"):
+            print(f"⚠️ 저널 {path}의 마지막 줄이 잘려 있어 무시합니다.")
+            break
+        valid_end += len(line)
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            print(f"⚠️ 저널 {path}의 손상된 줄을 무시합니다.")
+            continue
+        completed[entry["spreadsheet_id"]] = decode_result(entry["result"])
+    if valid_end < len(content):
+        with open(path, "r+b") as f:
+            f.truncate(valid_end)
+    return completed
+
+
+def append_journal(path, spreadsheet_id, result):
+    """주문 결과 한 줄 추가 (프로세스가 죽어도 남도록 즉시 fsync)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    line = json.dumps(
+        {"spreadsheet_id": spreadsheet_id, "result": encode_result(result)},
+        ensure_ascii=False,
+        default=_json_default,
+    )
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,56 @@
+"""
+샤드 실행 / 병합
+연결된 스프레드시트 ID를 SHARD_COUNT개 샤드로 결정적으로 나누어 여러 러너에서 동시에 수집하고,
+각 샤드는 부분 결과 파일(run_journal 형식 NDJSON)을 남깁니다.
+병합 실행은 부분 결과를 원래 ID 순서대로 합쳐 all_results와 같은 데이터로 만든 뒤
+결과 JSON 저장, 히트맵, HTML, 알림을 한 번만 실행합니다.
+"""
+
+import os
+import zlib
+
+from run_journal import load_journal
+
+
+def shard_of(spreadsheet_id, shard_count):
+    """ID 해시 기반 샤드 번호 (목록 순서가 바뀌어도 같은 ID는 항상 같은 샤드)"""
+    return zlib.crc32(spreadsheet_id.encode("utf-8")) % shard_count
+
+
+def select_shard(spreadsheet_ids, shard_index, shard_count):
+    return [sid for sid in spreadsheet_ids if shard_of(sid, shard_count) == shard_index]
+
+
+def partial_path(shard_dir, shard_index, shard_count):
+    return os.path.join(shard_dir, f"partial_{shard_index}_of_{shard_count}.ndjson")
+
+
+def merge_partials(shard_dir, shard_count, ordered_ids):
+    """
+    모든 샤드의 부분 결과를 ordered_ids 순서로 합쳐 all_results 목록을 반환합니다.
+    부분 결과 파일이 하나라도 없으면 불완전한 알림을 막기 위해 예외를 발생시킵니다.
+    """
+    missing_files = [
+        partial_path(shard_dir, index, shard_count)
+        for index in range(shard_count)
+        if not os.path.exists(partial_path(shard_dir, index, shard_count))
+    ]
+    if missing_files:
+        raise FileNotFoundError(f"샤드 부분 결과 파일이 없습니다: {missing_files}")
+
+    completed = {}
+    for index in range(shard_count):
+        completed.update(load_journal(partial_path(shard_dir, index, shard_count)))
+
+    unprocessed = [sid for sid in ordered_ids if sid not in completed]
+    if unprocessed:
+        print(
+            f"⚠️ 샤드에서 처리되지 않은 주문 {len(unprocessed)}건 (오류 등): "
+            f"{unprocessed[:5]}{'...' if len(unprocessed) > 5 else ''}"
+        )
+    all_results = [completed[sid] for sid in ordered_ids if completed.get(sid) is not None]
+    print(
+        f"🧩 샤드 {shard_count}개 병합 완료: 처리 {len(ordered_ids) - len(unprocessed)}건, "
+        f"이상 발견 {len(all_results)}건"
+    )
+    return all_results
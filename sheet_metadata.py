@@ -0,0 +1,91 @@
+"""
+스프레드시트 메타데이터 캐시
+주문 스프레드시트의 제목(Order No)과 시트 이름별 sheetId/행 수를 실행 간 SHEET_CACHE_DIR에 저장합니다.
+실행 시작 시 Drive modifiedTime을 배치 요청으로 한 번에 확인해, 수정 시각이 기록과 같고
+TTL 안에 조회한 항목만 재사용하므로 변경되지 않은 주문은 spreadsheets.get 호출이 없습니다.
+스프레드시트가 수정됐으면 행 수가 바뀌었을 수 있으므로 항목을 버리고 다시 조회합니다.
+"""
+
+import json
+import os
+import time
+
+METADATA_CACHE_VERSION = 1
+
+
+def _cache_file(cache_dir):
+    return os.path.join(cache_dir, "spreadsheet_metadata.json")
+
+
+def load_metadata(cache_dir):
+    """{스프레드시트 ID: 항목} (캐시가 없거나 손상되면 빈 dict)"""
+    if not cache_dir:
+        return {}
+    try:
+        with open(_cache_file(cache_dir), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != METADATA_CACHE_VERSION:
+        return {}
+    return data.get("spreadsheets", {})
+
+
+def save_metadata(cache_dir, entries):
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_file(cache_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": METADATA_CACHE_VERSION, "spreadsheets": entries},
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    os.replace(tmp_path, path)
+
+
+def make_entry(metadata, modified_time, now=None):
+    """
+    spreadsheets.get 응답(properties.title, sheets.properties(sheetId,title,gridProperties.rowCount))
+    -> 캐시 항목 {"title", "sheets": {시트 이름: {"sheetId", "rowCount"}}, "modified_time", "fetched_at"}
+    """
+    sheets = {}
+    for sheet in metadata.get("sheets", []):
+        properties = sheet.get("properties", {})
+        sheets[properties.get("title")] = {
+            "sheetId": properties.get("sheetId"),
+            "rowCount": properties.get("gridProperties", {}).get("rowCount", 0),
+        }
+    return {
+        "title": metadata["properties"]["title"],
+        "sheets": sheets,
+        "modified_time": modified_time,
+        "fetched_at": time.time() if now is None else now,
+    }
+
+
+def revalidate(entries, modified_times, ttl_seconds, now=None):
+    """
+    modified_times({ID: Drive modifiedTime 또는 None})에 있는 ID의 항목 중
+    수정 시각이 달라졌거나 조회 후 ttl_seconds가 지난 항목을 제거합니다.
+    반환: (재사용 건수, 제거 건수)
+    """
+    now = time.time() if now is None else now
+    kept = dropped = 0
+    for spreadsheet_id, modified_time in modified_times.items():
+        entry = entries.get(spreadsheet_id)
+        if entry is None:
+            continue
+        if (
+            modified_time is not None
+            and entry.get("modified_time") == modified_time
+            and now - entry.get("fetched_at", 0) < ttl_seconds
+        ):
+            kept += 1
+        else:
+            del entries[spreadsheet_id]
+            dropped += 1
+    return kept, dropped
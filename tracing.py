@@ -0,0 +1,193 @@
+"""
+경량 트레이싱
+API 호출, 차트 렌더링, 업로드, 대기(sleep), 파이프라인 스테이지를 중첩 span으로 기록하고
+실행 종료 시 Chrome Trace Event 형식 JSON(chrome://tracing, Perfetto에서 열기)과
+카테고리/이름별 요약 표를 출력합니다.
+하위 span은 상위 span의 속성(order_no, model 등)을 물려받습니다.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from googleapiclient.http import HttpRequest
+
+_lock = threading.Lock()
+_local = threading.local()
+_spans = []
+_next_id = [0]
+_origin = time.perf_counter()
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(name, cat="app", **attrs):
+    """이름/카테고리/속성을 가진 구간을 기록합니다. (중첩 가능, 스레드별 스택)"""
+    stack = _stack()
+    with _lock:
+        _next_id[0] += 1
+        span_id = _next_id[0]
+    record = {
+        "id": span_id,
+        "parent": stack[-1]["id"] if stack else None,
+        "name": name,
+        "cat": cat,
+        "attrs": dict(attrs),
+        "thread": threading.current_thread().name,
+        "start": time.perf_counter(),
+        "end": None,
+    }
+    stack.append(record)
+    try:
+        yield record
+    except BaseException as e:
+        record["attrs"]["error"] = repr(e)
+        raise
+    finally:
+        record["end"] = time.perf_counter()
+        stack.pop()
+        with _lock:
+            _spans.append(record)
+
+
+def set_attributes(**attrs):
+    """현재 span에 속성 추가 (예: 처리 도중 알게 된 order_no, model)"""
+    stack = _stack()
+    if stack:
+        stack[-1]["attrs"].update(attrs)
+
+
+def traced(cat="app", name=None):
+    """함수 전체를 span으로 감싸는 데코레이터"""
+
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, cat):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_sleep(seconds, reason=""):
+    """대기 시간도 별도 카테고리로 집계되도록 span으로 감싼 sleep"""
+    with span("sleep", "sleep", seconds=seconds, reason=reason):
+        time.sleep(seconds)
+
+
+class TracedHttpRequest(HttpRequest):
+    """
+    googleapiclient 요청 실행을 span으로 기록하는 requestBuilder.
+    build(..., requestBuilder=TracedHttpRequest)로 지정하면 모든 execute()가 기록됩니다.
+    """
+
+    def execute(self, *args, **kwargs):
+        with span(self.methodId or self.method, "api", method=self.method):
+            return super().execute(*args, **kwargs)
+
+
+def _inherited_attrs(by_id, record):
+    # 상위 span 속성을 먼저, 자신의 속성으로 덮어씀
+    chain = []
+    while record is not None:
+        chain.append(record["attrs"])
+        record = by_id.get(record["parent"])
+    merged = {}
+    for attrs in reversed(chain):
+        merged.update(attrs)
+    return merged
+
+
+def write_trace(path):
+    """기록된 span을 Chrome Trace Event 형식 JSON으로 저장"""
+    with _lock:
+        spans = list(_spans)
+    by_id = {s["id"]: s for s in spans}
+    threads = {name: tid for tid, name in enumerate(sorted({s["thread"] for s in spans}), 1)}
+    pid = os.getpid()
+    events = [
+        {"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}}
+        for name, tid in threads.items()
+    ]
+    for s in spans:
+        events.append(
+            {
+                "ph": "X",
+                "name": s["name"],
+                "cat": s["cat"],
+                "ts": round((s["start"] - _origin) * 1e6),
+                "dur": round((s["end"] - s["start"]) * 1e6),
+                "pid": pid,
+                "tid": threads[s["thread"]],
+                "args": {
+                    key: value if isinstance(value, (int, float, bool)) else str(value)
+                    for key, value in _inherited_attrs(by_id, s).items()
+                },
+            }
+        )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+    print(f"🧵 트레이스 저장 완료: {path} ({len(spans)}개 span)")
+    return path
+
+
+def summarize_spans():
+    """
+    span 이름별 (카테고리, 횟수, 총 시간, 자기 시간, 최대) 집계.
+    자기 시간은 하위 span 시간을 뺀 값이라 카테고리별로 더해도 중복되지 않습니다.
+    """
+    with _lock:
+        spans = list(_spans)
+    child_time = {}
+    for s in spans:
+        if s["parent"] is not None:
+            child_time[s["parent"]] = child_time.get(s["parent"], 0.0) + (s["end"] - s["start"])
+
+    summary = {}
+    for s in spans:
+        duration = s["end"] - s["start"]
+        row = summary.setdefault(
+            s["name"], {"cat": s["cat"], "count": 0, "total": 0.0, "self": 0.0, "max": 0.0}
+        )
+        row["count"] += 1
+        row["total"] += duration
+        row["self"] += max(duration - child_time.get(s["id"], 0.0), 0.0)
+        row["max"] = max(row["max"], duration)
+    return summary
+
+
+def print_trace_summary(top_n=20):
+    """카테고리별 자기 시간과 이름별 상위 span 표 출력"""
+    summary = summarize_spans()
+    if not summary:
+        return
+    by_cat = {}
+    for row in summary.values():
+        by_cat[row["cat"]] = by_cat.get(row["cat"], 0.0) + row["self"]
+    total_self = sum(by_cat.values()) or 1.0
+
+    print("📊 카테고리별 소요 시간 (자기 시간 기준):")
+    for cat, seconds in sorted(by_cat.items(), key=lambda item: -item[1]):
+        print(f"   {cat:<10} {seconds:9.2f}초 ({seconds / total_self * 100:5.1f}%)")
+
+    print(f"📊 span별 상위 {top_n}개 (총 시간 기준):")
+    print(f"   {'이름':<40} {'분류':<8} {'횟수':>6} {'총(초)':>9} {'자기(초)':>9} {'최대(초)':>9}")
+    rows = sorted(summary.items(), key=lambda item: -item[1]["total"])[:top_n]
+    for name, row in rows:
+        print(
+            f"   {name[:40]:<40} {row['cat']:<8} {row['count']:>6} "
+            f"{row['total']:>9.2f} {row['self']:>9.2f} {row['max']:>9.2f}"
+        )
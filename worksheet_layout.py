@@ -0,0 +1,75 @@
+"""
+WORKSHEET 컬럼 위치 캐시
+주문 스프레드시트는 템플릿(모델)별로 WORKSHEET 탭의 컬럼 배치가 같으므로,
+헤더 행에서 찾은 필요한 컬럼의 열 문자(예: 내용 -> "B")를 템플릿별로 저장해 두고
+다음 주문/다음 실행부터는 헤더를 다시 읽지 않고 해당 열만 요청합니다.
+요청한 열의 첫 칸(헤더)이 기대한 컬럼명과 다르면 호출부에서 헤더를 다시 찾아 갱신합니다.
+"""
+
+import json
+import os
+
+LAYOUT_CACHE_VERSION = 1
+
+
+def sheet_name_of(a1_range):
+    """A1 범위의 시트 이름 ('WORKSHEET'!A1:Z100 -> WORKSHEET)"""
+    sheet, _, _ = a1_range.rpartition("!")
+    return (sheet or a1_range).strip("'")
+
+
+def column_letter(index):
+    """0부터 시작하는 열 번호 -> A1 표기 열 문자 (0 -> A, 26 -> AA)"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def resolve_columns(header, needed_columns):
+    """헤더 행에서 필요한 컬럼의 열 문자 목록 (없는 컬럼이 있으면 None)"""
+    try:
+        return [column_letter(header.index(name)) for name in needed_columns]
+    except ValueError:
+        return None
+
+
+def column_ranges(sheet_name, letters, first_row, last_row):
+    """first_row~last_row 행의 열별 범위 (batchGet ranges)"""
+    return [f"'{sheet_name}'!{letter}{first_row}:{letter}{last_row}" for letter in letters]
+
+
+def _cache_file(cache_dir):
+    return os.path.join(cache_dir, "worksheet_layout.json")
+
+
+def load_layouts(cache_dir):
+    """{템플릿 키: [열 문자, ...]} (캐시가 없거나 손상되면 빈 dict)"""
+    if not cache_dir:
+        return {}
+    try:
+        with open(_cache_file(cache_dir), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != LAYOUT_CACHE_VERSION:
+        return {}
+    return data.get("layouts", {})
+
+
+def save_layouts(cache_dir, layouts):
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_file(cache_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": LAYOUT_CACHE_VERSION, "layouts": layouts},
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    os.replace(tmp_path, path)